@@ -0,0 +1,84 @@
+"""
+⏳ King Bot Pro - Uyarlanabilir Geri Çekilme
+Sürekli başarısız olan sequence/görevler için jitter'lı üstel bekleme hesaplar
+"""
+
+import random
+import time
+from typing import Dict, Optional
+
+
+# Saatlik başarı oranının kullanılması için gereken en az deneme sayısı
+MIN_HOURLY_SAMPLES = 5
+
+
+def backoff_delay(base_delay: float, attempt: int, multiplier: float = 2.0,
+                  max_delay: Optional[float] = None, jitter: float = 0.2,
+                  rng: Optional[random.Random] = None) -> float:
+    """attempt. başarısızlıktan sonraki bekleme (1. deneme = base_delay)
+
+    Süre her başarısızlıkta multiplier ile büyür, max_delay ile sınırlanır ve
+    aynı anda açılan görevler senkron kalmasın diye ±jitter oranında dağıtılır.
+    """
+    delay = base_delay * (multiplier ** max(0, attempt - 1))
+    if max_delay is not None:
+        delay = min(delay, max_delay)
+    if jitter:
+        delay *= (rng or random).uniform(1.0 - jitter, 1.0 + jitter)
+    return max(0.0, delay)
+
+
+def hourly_success_rate(stats: Dict, hour: Optional[int] = None) -> Optional[float]:
+    """Sequence istatistiklerindeki saatlik kayıttan başarı oranı (yetersiz veri: None)"""
+    hour = time.localtime().tm_hour if hour is None else hour
+    runs, successes = stats.get('hourly', {}).get(str(hour), (0, 0))
+    if runs < MIN_HOURLY_SAMPLES:
+        return None
+    return successes / runs
+
+
+def record_hourly_result(stats: Dict, success: bool, hour: Optional[int] = None):
+    """Sonucu sequence istatistiklerinin saatlik kaydına ekle"""
+    hour = time.localtime().tm_hour if hour is None else hour
+    runs, successes = stats.setdefault('hourly', {}).get(str(hour), (0, 0))
+    stats['hourly'][str(hour)] = [runs + 1, successes + (1 if success else 0)]
+
+
+class BackoffPolicy:
+    """Başarı geçmişine göre uyarlanan geri çekilme politikası
+
+    Ardışık başarısızlıkta bekleme üstel büyür. Süre, sequence'in bu saatteki
+    (yeterli veri yoksa genel) başarı oranıyla ölçeklenir: nadiren başarılı olan
+    sequence'ler daha uzun, genelde başarılı olanlar daha kısa bekler. Başarılı
+    bir çalıştırma ardışık başarısızlık sayacını sıfırladığı için görsel tekrar
+    bulunmaya başlayınca normal aralığa otomatik dönülür.
+    """
+
+    def __init__(self, base_delay: float = 300.0, max_delay: float = 3600.0,
+                 multiplier: float = 2.0, jitter: float = 0.2, rng: Optional[random.Random] = None):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.rng = rng
+
+    def success_factor(self, stats: Dict, hour: Optional[int] = None) -> float:
+        """Başarı oranına göre çarpan (oran 1.0 -> 0.5, oran 0.0 -> 1.5)"""
+        rate = hourly_success_rate(stats, hour)
+        if rate is None:
+            total_runs = stats.get('total_runs', 0)
+            if not total_runs:
+                return 1.0
+            rate = stats.get('successful_runs', 0) / total_runs
+        return 1.5 - rate
+
+    def next_delay(self, failures: int, stats: Optional[Dict] = None, hour: Optional[int] = None) -> float:
+        """failures ardışık başarısızlıktan sonra bir sonraki denemeye kadar bekleme"""
+        if failures <= 0:
+            return 0.0
+        delay = backoff_delay(self.base_delay, failures, self.multiplier, self.max_delay,
+                              jitter=0.0) * self.success_factor(stats or {}, hour)
+        delay = min(delay, self.max_delay)
+        if self.jitter:
+            delay *= (self.rng or random).uniform(1.0 - self.jitter, 1.0 + self.jitter)
+        return delay
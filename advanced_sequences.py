@@ -5,15 +5,20 @@ import pyautogui
 import logging
 import json
 from typing import Dict, List, Tuple, Optional
-from utils import try_click, find_image_location, click_sequence, get_resource_path
+from utils import try_click, find_image_location, click_sequence, get_resource_path, safe_click, iter_found_images
+from adaptive_backoff import BackoffPolicy, record_hourly_result
 
 class AdvancedSequenceManager:
     """Gelişmiş bot sequence yöneticisi"""
     
-    def __init__(self):
+    def __init__(self, backoff_policy: Optional[BackoffPolicy] = None):
         self.sequence_stats = {}
         self.failed_attempts = {}
         self.last_execution_times = {}
+        
+        # Başarısız sequence'ler için hesaplanan bekleme süreleri (saniye)
+        self.backoff_policy = backoff_policy or BackoffPolicy()
+        self.backoff_delays = {}
         self.setup_logging()
         
     def setup_logging(self):
@@ -25,6 +30,7 @@ class AdvancedSequenceManager:
         self.sequence_stats.clear()
         self.failed_attempts.clear()
         self.last_execution_times.clear()
+        self.backoff_delays.clear()
         
     def get_sequence_stats(self, sequence_name: str) -> Dict:
         """Sequence istatistiklerini al"""
@@ -54,25 +60,35 @@ class AdvancedSequenceManager:
         stats['total_duration'] += duration
         stats['average_duration'] = stats['total_duration'] / stats['total_runs']
         
+        record_hourly_result(stats, success)
+        
         if success:
             stats['successful_runs'] += 1
-            # Başarılı olursa failed attempts'i sıfırla
+            # Başarılı olursa failed attempts'i ve geri çekilmeyi sıfırla
             self.failed_attempts[sequence_name] = 0
+            self.backoff_delays.pop(sequence_name, None)
         else:
             stats['failed_runs'] += 1
-            # Başarısız attempts'i artır
-            self.failed_attempts[sequence_name] = self.failed_attempts.get(sequence_name, 0) + 1
+            # Başarısız attempts'i artır ve bir sonraki denemeyi geciktir
+            failures = self.failed_attempts.get(sequence_name, 0) + 1
+            self.failed_attempts[sequence_name] = failures
+            self.backoff_delays[sequence_name] = self.backoff_policy.next_delay(failures, stats)
             
     def should_skip_sequence(self, sequence_name: str, cooldown_minutes: int = 5) -> bool:
         """Sequence'in skip edilip edilmeyeceğini kontrol et"""
-        # Çok fazla başarısız deneme varsa skip et
-        if self.failed_attempts.get(sequence_name, 0) >= 3:
-            self.logger.warning(f"{sequence_name} çok fazla başarısız deneme nedeniyle skip ediliyor")
+        last_run = self.last_execution_times.get(sequence_name, 0)
+        elapsed = time.time() - last_run
+        
+        # Başarısız sequence'ler için uyarlanabilir geri çekilme (cooldown'dan kısa olamaz)
+        cooldown = cooldown_minutes * 60
+        backoff = self.backoff_delays.get(sequence_name)
+        if backoff is not None and elapsed < max(cooldown, backoff):
+            self.logger.debug(f"{sequence_name} geri çekilmede: {max(cooldown, backoff) - elapsed:.0f}s kaldı "
+                              f"({self.failed_attempts.get(sequence_name, 0)} ardışık başarısızlık)")
             return True
             
         # Cooldown kontrolü
-        last_run = self.last_execution_times.get(sequence_name, 0)
-        if time.time() - last_run < cooldown_minutes * 60:
+        if elapsed < cooldown:
             return True
             
         return False
@@ -250,8 +266,8 @@ def perform_recovery_sequence(game_area_region, image_paths, confidence=0.7):
         # Geri dönüş butonları öncelik sırasına göre
         back_buttons = ['b1', 'b2', 'b3', 'b4', 'b5', 'b6', 'b7', 'back']
         
-        for btn in back_buttons:
-            if btn in image_paths and try_click(image_paths[btn], game_area_region, max_attempts=1, confidence=confidence):
+        for btn, (x, y, _) in iter_found_images(back_buttons, image_paths, game_area_region, confidence):
+            if safe_click(x, y):
                 logging.info(f"[{log_prefix}] {btn} ile geri dönüş başarılı")
                 time.sleep(0.5)
                 return True
@@ -269,8 +285,8 @@ def perform_mesaj_sequence(game_area_region, image_paths, confidence=0.8):
         # Mesaj görselleri sıralı olarak
         message_images = ['mesaj1', 'mesaj2', 'mesaj3', 'mesaj4', 'mesaj5']
         
-        for msg_img in message_images:
-            if msg_img in image_paths and try_click(image_paths[msg_img], game_area_region, max_attempts=1, confidence=confidence):
+        for msg_img, (x, y, _) in iter_found_images(message_images, image_paths, game_area_region, confidence):
+            if safe_click(x, y):
                 logging.info(f"[{log_prefix}] {msg_img} gönderildi")
                 sent_messages += 1
                 time.sleep(1)
@@ -292,8 +308,8 @@ def perform_savas_sequence(game_area_region, image_paths, confidence=0.8):
         # Savaş görselleri
         battle_images = ['savas1', 'savas2', 'savas3', 'savas4', 'savas5', 'savas6', 'savas7', 'savas8']
         
-        for battle_img in battle_images:
-            if battle_img in image_paths and try_click(image_paths[battle_img], game_area_region, max_attempts=1, confidence=confidence):
+        for battle_img, (x, y, _) in iter_found_images(battle_images, image_paths, game_area_region, confidence):
+            if safe_click(x, y):
                 logging.info(f"[{log_prefix}] {battle_img} savaşı başlatıldı")
                 battles_fought += 1
                 time.sleep(2)  # Savaş için daha uzun bekleme
@@ -315,8 +331,8 @@ def perform_ittifak_sequence(game_area_region, image_paths, confidence=0.8):
         # İttifak görselleri
         alliance_images = ['ittifak1', 'ittifak2', 'ittifak3', 'ittifak4', 'ittifak5', 'ittifak6', 'ittifak7', 'ittifak8']
         
-        for alliance_img in alliance_images:
-            if alliance_img in image_paths and try_click(image_paths[alliance_img], game_area_region, max_attempts=1, confidence=confidence):
+        for alliance_img, (x, y, _) in iter_found_images(alliance_images, image_paths, game_area_region, confidence):
+            if safe_click(x, y):
                 logging.info(f"[{log_prefix}] {alliance_img} etkileşimi")
                 alliance_actions += 1
                 time.sleep(1)
@@ -338,8 +354,8 @@ def perform_suadasi_sequence(game_area_region, image_paths, confidence=0.8):
         # Su adası görselleri
         island_images = ['su1', 'su2', 'su3', 'su4', 'su5']
         
-        for island_img in island_images:
-            if island_img in image_paths and try_click(image_paths[island_img], game_area_region, max_attempts=1, confidence=confidence):
+        for island_img, (x, y, _) in iter_found_images(island_images, image_paths, game_area_region, confidence):
+            if safe_click(x, y):
                 logging.info(f"[{log_prefix}] {island_img} etkileşimi")
                 island_actions += 1
                 time.sleep(1.5)
@@ -361,8 +377,8 @@ def perform_bekcikulesi_sequence(game_area_region, image_paths, confidence=0.8):
         # Bekçi kulesi görselleri
         tower_images = ['bekci1', 'bekci2', 'bekci3', 'bekci4', 'bekci5', 'bekci6', 'bekci7', 'bekci8', 'bekci9']
         
-        for tower_img in tower_images:
-            if tower_img in image_paths and try_click(image_paths[tower_img], game_area_region, max_attempts=1, confidence=confidence):
+        for tower_img, (x, y, _) in iter_found_images(tower_images, image_paths, game_area_region, confidence):
+            if safe_click(x, y):
                 logging.info(f"[{log_prefix}] {tower_img} etkileşimi")
                 tower_actions += 1
                 time.sleep(1)
@@ -13,6 +13,8 @@ import threading
 from datetime import datetime
 from typing import List, Tuple, Dict, Optional, Any
 import logging
+from template_matcher import DEFAULT_SCALES, match_scales
+from template_store import template_store
 
 class AIVisionSystem:
     """Gelişmiş AI tabanlı görüntü tanıma sistemi"""
@@ -221,7 +223,7 @@ class AIVisionSystem:
             if os.path.exists(template_path):
                 for template_file in os.listdir(template_path):
                     if template_file.endswith(('.png', '.jpg', '.jpeg')):
-                        template = cv2.imread(os.path.join(template_path, template_file), 0)
+                        template = template_store.gray(os.path.join(template_path, template_file))
                         if template is not None:
                             matches = self.template_match(image, template)
                             for match in matches:
@@ -236,39 +238,28 @@ class AIVisionSystem:
     
     def template_match(self, image: np.ndarray, template: np.ndarray) -> List[Dict]:
         """Template matching ile nesne bulma"""
-        matches = []
-        
         try:
-            # Multi-scale template matching
-            scales = [0.5, 0.75, 1.0, 1.25, 1.5] if self.config["advanced_features"]["multi_scale_detection"] else [1.0]
-            
-            for scale in scales:
-                resized_template = cv2.resize(template, None, fx=scale, fy=scale)
-                
-                if resized_template.shape[0] > image.shape[0] or resized_template.shape[1] > image.shape[1]:
-                    continue
-                
-                # Template matching
-                result = cv2.matchTemplate(image, resized_template, cv2.TM_CCOEFF_NORMED)
-                
-                # Eşleşmeleri bul
-                locations = np.where(result >= self.config["template_matching_threshold"])
-                
-                for pt in zip(*locations[::-1]):
-                    matches.append({
-                        "x": pt[0],
-                        "y": pt[1],
-                        "width": resized_template.shape[1],
-                        "height": resized_template.shape[0],
-                        "confidence": result[pt[1], pt[0]],
-                        "scale": scale,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
+            # Multi-scale template matching (tepe çıkarma ve NMS NumPy'da)
+            scales = DEFAULT_SCALES if self.config["advanced_features"]["multi_scale_detection"] else (1.0,)
+            found = match_scales(image, template, scales, self.config["template_matching_threshold"])
         except Exception as e:
             logging.error(f"Template matching hatası: {e}")
+            return []
         
-        return matches
+        # Sözlüğe çevirme sadece API sınırında yapılır
+        timestamp = datetime.now().isoformat()
+        return [
+            {
+                "x": int(match["x"]),
+                "y": int(match["y"]),
+                "width": int(match["w"]),
+                "height": int(match["h"]),
+                "confidence": float(match["score"]),
+                "scale": float(match["scale"]),
+                "timestamp": timestamp
+            }
+            for match in found
+        ]
     
     def detect_game_objects(self, image: np.ndarray) -> List[Dict]:
         """Oyun nesnelerini tespit et"""
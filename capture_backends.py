@@ -0,0 +1,231 @@
+"""
+📸 King Bot Pro - Ekran Yakalama Arka Uçları
+Frame bus'ın kullandığı değiştirilebilir yakalama arka uçları
+"""
+
+import os
+import threading
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+Region = Tuple[int, int, int, int]
+
+
+class CaptureBackend(ABC):
+    """Yakalama arka ucu arayüzü
+
+    grab(region) mutlak (left, top, width, height) bölgesini (None = tam ekran)
+    BGR NumPy dizisi olarak döndürür.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        """Bölgeyi BGR(A) NumPy dizisi olarak yakala"""
+
+    def close(self):
+        """Arka ucun kaynaklarını bırak"""
+        pass
+
+    def __call__(self, region: Optional[Region] = None) -> np.ndarray:
+        return self.grab(region)
+
+
+class PyAutoGUIBackend(CaptureBackend):
+    """pyautogui ile yakalama (PIL görüntüsü -> NumPy -> BGR)"""
+
+    name = "pyautogui"
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        import pyautogui
+
+        if region:
+            screenshot = pyautogui.screenshot(region=region)
+        else:
+            screenshot = pyautogui.screenshot()
+        return cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+
+
+class MSSBackend(CaptureBackend):
+    """mss ile yakalama (isteğe bağlı bağımlılık)
+
+    Ham BGRA tampon kopyalanmadan NumPy görünümüne sarılır. output="bgr" ise tek
+    bir cvtColor ile BGR'ye çevrilir, "bgra" ise görünüm olduğu gibi döner.
+    mss örnekleri thread'e özel olduğu için her thread kendi örneğini açar;
+    sonlanan thread'lerin örnekleri yeni örnek açılırken kapatılır.
+    """
+
+    name = "mss"
+
+    def __init__(self, output: str = "bgr"):
+        import mss  # noqa: F401 - bağımlılık yoksa burada ImportError verilir
+
+        self.output = output
+        self._local = threading.local()
+        self._instances: Dict[threading.Thread, object] = {}
+        self._instances_lock = threading.Lock()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            import mss
+
+            sct = mss.mss()
+            self._local.sct = sct
+            with self._instances_lock:
+                self._close_dead_instances()
+                self._instances[threading.current_thread()] = sct
+        return sct
+
+    @staticmethod
+    def _close_instance(sct):
+        try:
+            sct.close()
+        except Exception:
+            pass
+
+    def _close_dead_instances(self):
+        """Sonlanmış thread'lerin mss örneklerini kapat (kilit tutulurken çağrılır)"""
+        for thread in [thread for thread in self._instances if not thread.is_alive()]:
+            self._close_instance(self._instances.pop(thread))
+
+    @property
+    def open_instances(self) -> int:
+        """Açık mss örneği sayısı"""
+        with self._instances_lock:
+            return len(self._instances)
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        sct = self._sct()
+        if region:
+            left, top, width, height = region
+            monitor = {"left": left, "top": top, "width": width, "height": height}
+        else:
+            monitor = sct.monitors[1]
+
+        shot = sct.grab(monitor)
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        if self.output == "bgra":
+            return bgra
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)
+
+    def close(self):
+        with self._instances_lock:
+            for sct in self._instances.values():
+                self._close_instance(sct)
+            self._instances.clear()
+        self._local = threading.local()
+
+
+class ReplayBackend(CaptureBackend):
+    """Kayıtlı görüntü/videodan yakalama (ekransız test ve ölçüm için)
+
+    Kaynak bir görüntü klasörü, tek görüntü, video dosyası veya NumPy dizisi
+    listesi olabilir. Her grab bir sonraki kareyi verir; bölge, karenin sol üst
+    köşesi ekranın (0, 0) noktası kabul edilerek kopyasız kesilir.
+    """
+
+    name = "replay"
+
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+    def __init__(self, source: Union[str, Sequence[np.ndarray]], loop: bool = True):
+        self.source = source
+        self.loop = loop
+        self._lock = threading.Lock()
+        self._frames: List[np.ndarray] = []
+        self._index = 0
+        self._video = None
+
+        if isinstance(source, str) and os.path.isdir(source):
+            for file in sorted(os.listdir(source)):
+                if file.lower().endswith(self.IMAGE_EXTENSIONS):
+                    image = cv2.imread(os.path.join(source, file), cv2.IMREAD_COLOR)
+                    if image is not None:
+                        self._frames.append(image)
+        elif isinstance(source, str) and source.lower().endswith(self.IMAGE_EXTENSIONS):
+            image = cv2.imread(source, cv2.IMREAD_COLOR)
+            if image is not None:
+                self._frames.append(image)
+        elif isinstance(source, str):
+            self._video = cv2.VideoCapture(source)
+            if not self._video.isOpened():
+                raise ValueError(f"Video açılamadı: {source}")
+        else:
+            self._frames = [np.ascontiguousarray(frame) for frame in source]
+
+        if self._video is None and not self._frames:
+            raise ValueError(f"Tekrar oynatılacak kare bulunamadı: {source}")
+
+    def _next_frame(self) -> np.ndarray:
+        if self._video is not None:
+            ok, frame = self._video.read()
+            if not ok and self.loop:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = self._video.read()
+            if not ok:
+                raise RuntimeError("Video kaynağında kare kalmadı")
+            return frame
+
+        if self._index >= len(self._frames):
+            if not self.loop:
+                raise RuntimeError("Tekrar oynatma kaynağında kare kalmadı")
+            self._index = 0
+        frame = self._frames[self._index]
+        self._index += 1
+        return frame
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        with self._lock:
+            frame = self._next_frame()
+
+        if region:
+            left, top, width, height = region
+            return frame[top:top + height, left:left + width]
+        return frame
+
+    def close(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGUIBackend,
+    "mss": MSSBackend,
+    "replay": ReplayBackend,
+}
+
+
+def available_backends() -> List[str]:
+    """Bu ortamda kullanılabilen canlı yakalama arka uçları"""
+    names = ["pyautogui"]
+    try:
+        import mss  # noqa: F401
+        names.insert(0, "mss")
+    except ImportError:
+        pass
+    return names
+
+
+def create_backend(name: str = "auto", **kwargs) -> CaptureBackend:
+    """İsme göre yakalama arka ucu oluştur ("auto" = en hızlı kullanılabilir)"""
+    if name == "auto":
+        name = available_backends()[0]
+
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Bilinmeyen yakalama arka ucu: {name}")
+
+    try:
+        return backend_class(**kwargs)
+    except ImportError as e:
+        logging.warning(f"{name} yakalama arka ucu kullanılamıyor ({e}), pyautogui kullanılacak")
+        return PyAutoGUIBackend()
+
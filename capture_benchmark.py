@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📸 King Bot Pro - Ekran Yakalama Ölçümü
+Yakalama arka uçlarının saniyedeki yakalama sayısını ve gecikme yüzdeliklerini ölçer
+
+Kullanım:
+    python capture_benchmark.py                       # Kullanılabilen canlı arka uçlar
+    python capture_benchmark.py --backends mss pyautogui --count 200
+    python capture_benchmark.py --backends replay --replay kayitlar/   # Ekransız ortam
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from capture_backends import available_backends, create_backend
+from frame_bus import game_area_to_region, load_game_area_region
+
+
+def benchmark_backend(name: str, count: int, region, warmup: int = 5,
+                      replay_source: Optional[str] = None) -> Dict[str, float]:
+    """Tek arka ucu ölç"""
+    kwargs = {"source": replay_source} if name == "replay" else {}
+    backend = create_backend(name, **kwargs)
+
+    try:
+        for _ in range(warmup):
+            backend.grab(region)
+
+        latencies: List[float] = []
+        started = time.perf_counter()
+        for _ in range(count):
+            begin = time.perf_counter()
+            image = backend.grab(region)
+            latencies.append(time.perf_counter() - begin)
+        elapsed = time.perf_counter() - started
+    finally:
+        backend.close()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "captures_per_sec": count / elapsed if elapsed > 0 else float("inf"),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p90_ms": float(np.percentile(latencies_ms, 90)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+        "shape": "x".join(str(value) for value in image.shape)
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ekran yakalama arka uçlarını ölç")
+    parser.add_argument("--backends", nargs="+", help="Ölçülecek arka uçlar (mss, pyautogui, replay)")
+    parser.add_argument("--count", type=int, default=100, help="Arka uç başına yakalama sayısı")
+    parser.add_argument("--region", type=int, nargs=4, metavar=("X1", "Y1", "X2", "Y2"),
+                        help="Oyun alanı (varsayılan: config.json game_area_region)")
+    parser.add_argument("--full-screen", action="store_true", help="Bölge yerine tam ekran yakala")
+    parser.add_argument("--replay", help="replay arka ucu için görüntü klasörü, görüntü veya video")
+    args = parser.parse_args()
+
+    if args.full_screen:
+        region = None
+    elif args.region:
+        region = game_area_to_region(args.region)
+    else:
+        region = load_game_area_region()
+
+    backends = args.backends or available_backends() + (["replay"] if args.replay else [])
+
+    print("📸 King Bot Pro - Ekran Yakalama Ölçümü")
+    print("=" * 78)
+    print(f"Bölge: {region or 'tam ekran'} | Yakalama sayısı: {args.count}")
+    print("-" * 78)
+    print(f"{'Arka uç':<12}{'yakalama/sn':>12}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}  boyut")
+
+    failed = False
+    for name in backends:
+        if name == "replay" and not args.replay:
+            print(f"{name:<12}❌ --replay kaynağı gerekli")
+            failed = True
+            continue
+
+        try:
+            result = benchmark_backend(name, args.count, region, replay_source=args.replay)
+        except Exception as e:
+            print(f"{name:<12}❌ {e}")
+            failed = True
+            continue
+
+        print(f"{name:<12}{result['captures_per_sec']:>12.1f}{result['p50_ms']:>10.2f}"
+              f"{result['p90_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}  {result['shape']}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,13 +9,18 @@ import logging
 import sys
 import webbrowser
 import subprocess
+import threading
 import shutil
 import winreg
 import psutil
+from collections import OrderedDict
 from typing import Dict, List, Tuple, Optional, Any
 import cv2
 import numpy as np
 from PIL import Image
+from frame_bus import Frame, frame_bus, frame_changed, game_area_to_region, region_tiles
+from template_matcher import PYRAMID_MAX_LEVEL, find_peaks, match_many, match_pyramid
+from template_store import template_store
 
 # --- Loglama Yapılandırması ---
 if not logging.getLogger().handlers:
@@ -55,103 +60,201 @@ MODERN_COLORS = {
 pyautogui.FAILSAFE = True
 pyautogui.PAUSE = 0.1
 
+# Değişmeyen ekranda yeniden kullanılacak eşleşme sonucu sayısı
+MATCH_CACHE_SIZE = 256
+
 class ImageRecognition:
     """Gelişmiş görüntü tanıma sınıfı"""
     
-    def __init__(self):
-        self.template_cache = {}
-        self.last_screenshot = None
-        self.screenshot_time = 0
+    def __init__(self, match_mode: str = "exact"):
+        self.match_mode = match_mode  # "exact" veya "pyramid"
+        
+        # Eşleşme önbelleği: anahtar -> (karo imzası, kare sürümü, eşleşmeler)
+        self.match_cache: "OrderedDict[tuple, Tuple[np.ndarray, int, List[Tuple[int, int, float]]]]" = OrderedDict()
+        self.match_cache_stats = {"hits": 0, "misses": 0}
+        self._match_cache_lock = threading.Lock()
         
     def load_template(self, image_path: str) -> Optional[np.ndarray]:
-        """Template görselini yükle ve cache'le"""
-        if image_path in self.template_cache:
-            return self.template_cache[image_path]
-            
+        """Template görselini ortak template deposundan yükle"""
         if not os.path.exists(image_path):
             logging.warning(f"Template bulunamadı: {image_path}")
             return None
             
-        try:
-            template = cv2.imread(image_path, cv2.IMREAD_COLOR)
-            if template is not None:
-                self.template_cache[image_path] = template
-                return template
-        except Exception as e:
-            logging.error(f"Template yüklenemedi {image_path}: {e}")
-            
-        return None
+        return template_store.get(image_path)
+    
+    def load_template_pyramid(self, image_path: str) -> List[Optional[np.ndarray]]:
+        """Template piramidini (önceden hesaplanmış varyantlarla) al"""
+        return [template_store.pyramid(image_path, level) for level in range(PYRAMID_MAX_LEVEL + 1)]
     
     def get_fresh_screenshot(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
-        """Güncel ekran görüntüsü al"""
+        """Güncel ekran görüntüsü al
+        
+        Yeniden kullanım frame bus'ın bölge anahtarlı önbelleğinden gelir; farklı
+        bir bölge asla başka bölgenin karesini almaz ve tıklamalar önbelleği
+        geçersiz kılar.
+        """
+        frame = self.get_fresh_frame(region)
+        return frame.image if frame is not None else None
+    
+    def get_fresh_frame(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Frame]:
+        """Güncel kareyi (sürüm ve karo imzasıyla) al"""
         try:
-            current_time = time.time()
-            
-            # Çok yakın zamanda alınmış screenshot varsa onu kullan
-            if (self.last_screenshot is not None and 
-                current_time - self.screenshot_time < 0.5):
-                return self.last_screenshot
-                
-            if region:
-                screenshot = pyautogui.screenshot(region=region)
-            else:
-                screenshot = pyautogui.screenshot()
-                
-            # PIL'den OpenCV formatına çevir
-            screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-            
-            self.last_screenshot = screenshot_cv
-            self.screenshot_time = current_time
-            
-            return screenshot_cv
-            
+            return frame_bus.get_frame(region)
         except Exception as e:
             logging.error(f"Screenshot alınamadı: {e}")
             return None
     
+    def _cached_matches(self, key: tuple, frame: Frame,
+                        search_region: Optional[Tuple[int, int, int, int]] = None) -> Optional[List[Tuple[int, int, float]]]:
+        """Arama bölgesinin karoları değişmediyse önceki eşleşme sonucunu döndür
+        
+        Sadece search_region'ı kapsayan karolar karşılaştırılır (None = tüm kare);
+        bölge dışındaki animasyonlar önbelleği geçersiz kılmaz.
+        """
+        with self._match_cache_lock:
+            entry = self.match_cache.get(key)
+            if entry is not None:
+                signature, version, matches = entry
+                if version == frame.version or not frame_changed(signature, frame.signature,
+                                                                 region_tiles(frame, search_region)):
+                    self.match_cache.move_to_end(key)
+                    self.match_cache_stats["hits"] += 1
+                    return list(matches)
+            
+            self.match_cache_stats["misses"] += 1
+            return None
+    
+    def _store_matches(self, key: tuple, frame: Frame, matches: List[Tuple[int, int, float]]):
+        """Eşleşme sonucunu karenin imzasıyla önbelleğe yaz"""
+        with self._match_cache_lock:
+            self.match_cache[key] = (frame.signature, frame.version, list(matches))
+            self.match_cache.move_to_end(key)
+            while len(self.match_cache) > MATCH_CACHE_SIZE:
+                self.match_cache.popitem(last=False)
+    
+    def get_match_cache_stats(self) -> Dict[str, Any]:
+        """Eşleşme önbelleği isabet/ıska sayaçları"""
+        with self._match_cache_lock:
+            hits = self.match_cache_stats["hits"]
+            misses = self.match_cache_stats["misses"]
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "size": len(self.match_cache)
+            }
+    
+    def clear_match_cache(self):
+        """Eşleşme önbelleğini temizle"""
+        with self._match_cache_lock:
+            self.match_cache.clear()
+    
+    @staticmethod
+    def _search_area(frame: Frame, search_region: Optional[Tuple[int, int, int, int]]) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """Karenin arama bölgesi görüntüsü ve mutlak offset'i (None = tüm kare)"""
+        if search_region is None:
+            return frame.image, frame.origin
+        left = max(search_region[0], frame.origin[0])
+        top = max(search_region[1], frame.origin[1])
+        right = search_region[0] + search_region[2]
+        bottom = search_region[1] + search_region[3]
+        return frame.crop((left, top, max(0, right - left), max(0, bottom - top))), (left, top)
+    
     def find_template_matches(self, template_path: str, region: Optional[Tuple[int, int, int, int]] = None, 
-                            confidence: float = 0.8, max_matches: int = 1) -> List[Tuple[int, int, float]]:
-        """Template matching ile çoklu eşleşme bul"""
+                            confidence: float = 0.8, max_matches: int = 1,
+                            match_mode: Optional[str] = None,
+                            search_region: Optional[Tuple[int, int, int, int]] = None) -> List[Tuple[int, int, float]]:
+        """Template matching ile çoklu eşleşme bul
+        
+        region, config.json'daki (x1, y1, x2, y2) oyun alanıdır; sadece bu
+        dikdörtgen yakalanır ve eşleşmeler mutlak ekran koordinatında döner.
+        search_region (left, top, width, height) verilirse arama yakalanan
+        karenin bu parçasıyla sınırlanır. match_mode "pyramid" ise kabadan inceye
+        arama yapılır; dönüş biçimi ve güven değeri tam çözünürlük aramasıyla
+        aynıdır. Arama bölgesinin karoları son eşleştirmeden beri değişmediyse
+        önbellekteki sonuç döndürülür.
+        """
         template = self.load_template(template_path)
         if template is None:
             return []
             
-        screenshot = self.get_fresh_screenshot(region)
-        if screenshot is None:
+        region = game_area_to_region(region)
+        frame = self.get_fresh_frame(region)
+        if frame is None:
             return []
             
-        try:
-            # Template matching
-            result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            
-            matches = []
-            h, w = template.shape[:2]
+        mode = match_mode or self.match_mode
+        cache_key = (template_path, region, search_region, confidence, max_matches, mode)
+        cached = self._cached_matches(cache_key, frame, search_region)
+        if cached is not None:
+            return cached
             
-            # Çoklu eşleşme için
-            for _ in range(max_matches):
-                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        try:
+            # Arama bölgesi offset'i ile çoklu eşleşme
+            screenshot, offset = self._search_area(frame, search_region)
+            if template.shape[0] > screenshot.shape[0] or template.shape[1] > screenshot.shape[1]:
+                self._store_matches(cache_key, frame, [])
+                return []
+            
+            if mode == "pyramid":
+                matches = match_pyramid(screenshot, template, confidence, max_matches, offset,
+                                        template_pyramid=self.load_template_pyramid(template_path))
+            else:
+                # Template matching
+                result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
                 
-                if max_val >= confidence:
-                    x, y = max_loc
-                    
-                    # Region offset'i ekle
-                    if region:
-                        x += region[0]
-                        y += region[1]
-                        
-                    matches.append((x + w//2, y + h//2, max_val))
-                    
-                    # Bu alanı maskele ki tekrar bulunmasın
-                    cv2.rectangle(result, (max_loc[0] - w//2, max_loc[1] - h//2), 
-                                (max_loc[0] + w//2, max_loc[1] + h//2), 0, -1)
-                else:
-                    break
-                    
+                h, w = template.shape[:2]
+                matches = find_peaks(result, (w, h), confidence, max_matches, offset)
+            
+            self._store_matches(cache_key, frame, matches)
             return matches
             
         except Exception as e:
             logging.error(f"Template matching hatası: {e}")
             return []
+    
+    def find_many(self, template_paths: List[str], region: Optional[Tuple[int, int, int, int]] = None,
+                  confidence: float = 0.8, max_matches: int = 1,
+                  match_mode: Optional[str] = None,
+                  search_region: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, List[Tuple[int, int, float]]]:
+        """Birden fazla template'i tek yakalama ve tek toplu eşleştirme ile bul
+        
+        Arama bölgesinin karoları değişmemiş template'ler önbellekten döner;
+        sadece kalanlar toplu eşleştirilir.
+        """
+        region = game_area_to_region(region)
+        frame = self.get_fresh_frame(region)
+        if frame is None:
+            return {}
+            
+        mode = match_mode or self.match_mode
+        results = {}
+        templates = {}
+        for template_path in template_paths:
+            cached = self._cached_matches((template_path, region, search_region, confidence, max_matches, mode),
+                                          frame, search_region)
+            if cached is not None:
+                results[template_path] = cached
+                continue
+            
+            template = self.load_template(template_path)
+            if template is not None:
+                templates[template_path] = template
+                
+        if not templates:
+            return results
+            
+        template_pyramids = None
+        if mode == "pyramid":
+            template_pyramids = {path: self.load_template_pyramid(path) for path in templates}
+        screenshot, offset = self._search_area(frame, search_region)
+        found = match_many(screenshot, templates, confidence, max_matches, offset, mode=mode,
+                           template_pyramids=template_pyramids)
+        
+        for template_path, matches in found.items():
+            self._store_matches((template_path, region, search_region, confidence, max_matches, mode), frame, matches)
+        results.update(found)
+        return results
 
 # Global image recognition instance
 image_recognition = ImageRecognition()
@@ -192,6 +295,9 @@ def safe_click(x: int, y: int, duration: float = 0.1, double_click: bool = False
         else:
             pyautogui.click()
             
+        # Ekran değişecek; sonraki eşleştirme yeni kare yakalasın
+        frame_bus.invalidate()
+            
         logging.debug(f"Tıklama başarılı: ({x}, {y})")
         return True
         
@@ -272,20 +378,54 @@ def find_multiple_images(image_paths: List[str], game_area_region: Tuple[int, in
     """Birden fazla görseli aynı anda ara"""
     found_images = []
     
-    for image_path in image_paths:
-        if os.path.exists(image_path):
-            matches = image_recognition.find_template_matches(
-                image_path, game_area_region, confidence, max_matches=1
-            )
-            
-            if matches:
-                x, y, match_confidence = matches[0]
-                found_images.append((image_path, x, y, match_confidence))
+    existing_paths = [image_path for image_path in image_paths if os.path.exists(image_path)]
+    all_matches = image_recognition.find_many(existing_paths, game_area_region, confidence, max_matches=1)
+    
+    for image_path in existing_paths:
+        matches = all_matches.get(image_path)
+        if matches:
+            x, y, match_confidence = matches[0]
+            found_images.append((image_path, x, y, match_confidence))
                 
     # Güven skoruna göre sırala
     found_images.sort(key=lambda x: x[3], reverse=True)
     return found_images
 
+def find_images_batch(image_names: List[str], image_paths: Dict[str, str], 
+                      game_area_region: Tuple[int, int, int, int], 
+                      confidence: float = 0.8) -> Dict[str, Tuple[int, int, float]]:
+    """İsimleri verilen görselleri tek yakalama ve tek toplu eşleştirmeyle ara"""
+    paths = [image_paths[name] for name in image_names if name in image_paths]
+    all_matches = image_recognition.find_many(paths, game_area_region, confidence, max_matches=1)
+    
+    found = {}
+    for name in image_names:
+        matches = all_matches.get(image_paths.get(name))
+        if matches:
+            found[name] = matches[0]
+            
+    return found
+
+def iter_found_images(image_names: List[str], image_paths: Dict[str, str], 
+                      game_area_region: Tuple[int, int, int, int], confidence: float = 0.8):
+    """Sıralı görsel listesinde ekranda bulunanları sırayla döndür
+    
+    Kalan görseller her adımda tek toplu geçişte taranır; çağıran taraf bir
+    görsele tıkladıktan sonra sonraki adım yeni ekran üzerinden yapılır.
+    """
+    remaining = [name for name in image_names if name in image_paths]
+    
+    while remaining:
+        found = find_images_batch(remaining, image_paths, game_area_region, confidence)
+        
+        for index, name in enumerate(remaining):
+            if name in found:
+                remaining = remaining[index + 1:]
+                yield name, found[name]
+                break
+        else:
+            return
+
 # --- Yapılandırma Yönetimi ---
 def load_config(config_file: str = "config.json") -> Dict[str, Any]:
     """Yapılandırma dosyasını yükle"""
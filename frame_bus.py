@@ -0,0 +1,405 @@
+"""
+🖼️ King Bot Pro - Ortak Ekran Karesi Veriyolu
+Her tick'te tek bir ekran görüntüsü alır ve tüm eşleyicilerle paylaşır
+"""
+
+import json
+import os
+import time
+import threading
+import logging
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from capture_backends import CaptureBackend, PyAutoGUIBackend, create_backend
+
+
+# Varsayılan tick süresi (saniye) - bu süre içinde gelen istekler aynı kareyi paylaşır.
+# Girdiler önbelleği geçersiz kıldığı için sabit bir "taze" tahminine gerek yoktur.
+DEFAULT_FRAME_TICK = 0.25
+
+# Varsayılan yakalama arka ucu ("auto" = mss kuruluysa mss, değilse pyautogui)
+DEFAULT_CAPTURE_BACKEND = "auto"
+
+Region = Tuple[int, int, int, int]
+
+# Değişiklik tespiti: kare TILE_SIZE piksellik karolara bölünür, her karo
+# SIGNATURE_CELLS x SIGNATURE_CELLS gri ortalamayla özetlenir
+TILE_SIZE = 32
+SIGNATURE_CELLS = 4
+CHANGE_TOLERANCE = 8  # Gri seviye farkı (animasyon/sıkıştırma gürültüsü için)
+
+# FrameScope karesinin girdi olmasa da yenileneceği en büyük yaş (saniye)
+DEFAULT_SCOPE_MAX_AGE = 1.0
+
+
+def game_area_to_region(game_area: Optional[Sequence[int]]) -> Optional[Region]:
+    """config.json'daki (x1, y1, x2, y2) oyun alanını (left, top, width, height) bölgesine çevir"""
+    if not game_area or len(game_area) != 4:
+        return None
+
+    x1, y1, x2, y2 = (int(value) for value in game_area)
+    if x2 > x1 and y2 > y1:
+        return (x1, y1, x2 - x1, y2 - y1)
+
+    # Köşe formatında değilse zaten (left, top, width, height) kabul et
+    return (x1, y1, x2, y2)
+
+
+def load_game_area_region(config_file: str = "config.json") -> Optional[Region]:
+    """Yapılandırmadaki oyun alanını yakalama bölgesi olarak yükle"""
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                return game_area_to_region(json.load(f).get("game_area_region"))
+    except Exception as e:
+        logging.error(f"Oyun alanı yüklenemedi: {e}")
+
+    return None
+
+
+def load_capture_backend_name(config_file: str = "config.json") -> str:
+    """Yapılandırmadaki yakalama arka ucu adını yükle ("capture_backend")"""
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get("capture_backend", DEFAULT_CAPTURE_BACKEND)
+    except Exception as e:
+        logging.error(f"Yakalama arka ucu ayarı yüklenemedi: {e}")
+
+    return DEFAULT_CAPTURE_BACKEND
+
+
+@dataclass(frozen=True)
+class Frame:
+    """Değiştirilemez, sürümlü BGR ekran karesi"""
+    image: np.ndarray
+    version: int
+    timestamp: float
+    origin: Tuple[int, int] = (0, 0)
+
+    @property
+    def age(self) -> float:
+        """Karenin yaşı (saniye)"""
+        return time.time() - self.timestamp
+
+    def crop(self, region: Region) -> np.ndarray:
+        """Mutlak (left, top, width, height) bölgesini kopyalamadan kes"""
+        left, top, width, height = region
+        left -= self.origin[0]
+        top -= self.origin[1]
+        return self.image[top:top + height, left:left + width]
+
+    def to_screen(self, x: int, y: int) -> Tuple[int, int]:
+        """Kare içi koordinatı mutlak ekran koordinatına çevir"""
+        return (x + self.origin[0], y + self.origin[1])
+
+    @cached_property
+    def signature(self) -> np.ndarray:
+        """Değişiklik tespiti için karo imzası (ilk erişimde hesaplanır)"""
+        return frame_signature(self.image)
+
+
+def frame_signature(image: np.ndarray) -> np.ndarray:
+    """Karenin karo imzası: (satır, sütun, hücre, hücre) boyutlu küçük gri dizi"""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+
+    rows = max(1, -(-image.shape[0] // TILE_SIZE))
+    cols = max(1, -(-image.shape[1] // TILE_SIZE))
+
+    # Karolar piksel sınırlarına tam otursun diye kenarları TILE_SIZE katına tamamla
+    pad_bottom = rows * TILE_SIZE - image.shape[0]
+    pad_right = cols * TILE_SIZE - image.shape[1]
+    if pad_bottom or pad_right:
+        image = cv2.copyMakeBorder(image, 0, pad_bottom, 0, pad_right, cv2.BORDER_REPLICATE)
+
+    small = cv2.resize(image, (cols * SIGNATURE_CELLS, rows * SIGNATURE_CELLS), interpolation=cv2.INTER_AREA)
+    return small.reshape(rows, SIGNATURE_CELLS, cols, SIGNATURE_CELLS).swapaxes(1, 2).astype(np.int16)
+
+
+def changed_tiles(previous: np.ndarray, current: np.ndarray,
+                  tolerance: int = CHANGE_TOLERANCE) -> Optional[np.ndarray]:
+    """İki imza arasında değişen karoların (satır, sütun) maskesi; boyut farklıysa None"""
+    if previous.shape != current.shape:
+        return None
+    return (np.abs(current - previous) > tolerance).any(axis=(2, 3))
+
+
+def frame_changed(previous: np.ndarray, current: np.ndarray,
+                  tiles: Optional[Tuple[slice, slice]] = None) -> bool:
+    """Kare (veya verilen karo dilimi) değişmiş mi"""
+    mask = changed_tiles(previous, current)
+    if mask is None:
+        return True
+    if tiles is not None:
+        mask = mask[tiles]
+    return bool(mask.any())
+
+
+def region_tiles(frame: "Frame", region: Optional[Region]) -> Optional[Tuple[slice, slice]]:
+    """Mutlak bölgeyi kapsayan karoların imza dilimi (None = tüm kare)"""
+    if region is None:
+        return None
+
+    left, top, width, height = region
+    frame_h, frame_w = frame.image.shape[:2]
+    x0 = min(max(0, left - frame.origin[0]), frame_w)
+    y0 = min(max(0, top - frame.origin[1]), frame_h)
+    x1 = min(max(x0, left - frame.origin[0] + width), frame_w)
+    y1 = min(max(y0, top - frame.origin[1] + height), frame_h)
+    return (slice(y0 // TILE_SIZE, -(-y1 // TILE_SIZE)), slice(x0 // TILE_SIZE, -(-x1 // TILE_SIZE)))
+
+
+def grab_screen_bgr(region: Optional[Region] = None) -> np.ndarray:
+    """Ekran görüntüsünü (isteğe bağlı bölge ile) BGR formatında al"""
+    return PyAutoGUIBackend().grab(region)
+
+
+class FrameBus:
+    """Süreç genelinde paylaşılan ekran karesi veriyolu
+
+    Aynı tick içinde gelen tüm istekler tek bir yakalamayı paylaşır; eşzamanlı
+    istekler yakalama kilidinde bekler ve ilk isteğin yayınladığı kareyi alır.
+    Bölge verilirse sadece o dikdörtgen yakalanır ve kare, mutlak koordinatlar
+    için bölgenin sol üst köşesini origin olarak taşır.
+
+    Kareler bölgeye göre önbelleklenir; alt bölge istekleri taze ve daha büyük
+    bir kareden kopyasız kesilerek karşılanır. Tıklama/klavye girdisinden sonra
+    invalidate() çağrılır ve sonraki istek yeni kare yakalar; girdi sırasında
+    sürmekte olan bir yakalama önbelleğe yazılmaz.
+    """
+
+    def __init__(self, tick: float = DEFAULT_FRAME_TICK,
+                 grab_func: Optional[Callable[[Optional[Region]], np.ndarray]] = None,
+                 ttls: Optional[Dict[Optional[Region], float]] = None,
+                 backend: Optional[CaptureBackend] = None):
+        self.tick = tick
+        self.ttls: Dict[Optional[Region], float] = {
+            self._key(region): ttl for region, ttl in (ttls or {}).items()
+        }
+        self.backend = backend
+        self._grab_func = grab_func or self._grab_with_backend
+        self._capture_lock = threading.Lock()
+        # Önbellek yazmaları ve epoch artışı bu kilitle sıralanır: invalidate()
+        # sonrasında eski bir kare (yakalama veya kesit) önbelleğe yazılamaz
+        self._cache_lock = threading.Lock()
+        self._latest: Dict[Optional[Region], Frame] = {}
+        self._version = 0
+        self._epoch = 0
+
+        # İstatistikler
+        self.stats = {
+            "captures": 0,
+            "reuses": 0,
+            "crops": 0,
+            "invalidations": 0,
+            "errors": 0
+        }
+
+    def _grab_with_backend(self, region: Optional[Region] = None) -> np.ndarray:
+        """Yakalama arka ucuyla kare al (arka uç ilk kullanımda seçilir)"""
+        if self.backend is None:
+            self.backend = create_backend(load_capture_backend_name())
+        return self.backend.grab(region)
+
+    def set_backend(self, backend: CaptureBackend):
+        """Yakalama arka ucunu değiştir (önbellek temizlenir)"""
+        with self._capture_lock:
+            previous = self.backend
+            self.backend = backend
+            self._grab_func = self._grab_with_backend
+            self.invalidate()
+        if previous is not None and previous is not backend:
+            previous.close()
+
+    @staticmethod
+    def _key(region: Optional[Sequence[int]]) -> Optional[Region]:
+        return tuple(int(value) for value in region) if region else None
+
+    def _is_fresh(self, frame: Optional[Frame], max_age: float) -> bool:
+        return frame is not None and time.time() - frame.timestamp < max_age
+
+    def set_ttl(self, region: Optional[Region], ttl: float):
+        """Bölgeye özel yeniden kullanım süresi ayarla (None = tam ekran)"""
+        self.ttls[self._key(region)] = ttl
+
+    def ttl_for(self, region: Optional[Region]) -> float:
+        """Bölgenin yeniden kullanım süresi"""
+        return self.ttls.get(self._key(region), self.tick)
+
+    def _lookup(self, region: Optional[Region], max_age: float) -> Optional[Frame]:
+        """Önbellekte taze kare ara (birebir bölge veya onu kapsayan büyük kare)"""
+        frame = self._latest.get(region)
+        if self._is_fresh(frame, max_age):
+            self.stats["reuses"] += 1
+            return frame
+
+        if region is None:
+            return None
+
+        epoch = self._epoch
+        left, top, width, height = region
+        for key, candidate in list(self._latest.items()):
+            if key == region or not self._is_fresh(candidate, max_age):
+                continue
+
+            origin_x, origin_y = candidate.origin
+            frame_h, frame_w = candidate.image.shape[:2]
+            if (origin_x <= left and origin_y <= top and
+                    left + width <= origin_x + frame_w and top + height <= origin_y + frame_h):
+                frame = Frame(image=candidate.crop(region), version=candidate.version,
+                              timestamp=candidate.timestamp, origin=(left, top))
+                with self._cache_lock:
+                    # Kesit alınırken girdi olduysa kaynak kare eskimiştir; önbelleğe yazma
+                    if self._epoch == epoch:
+                        self._latest[region] = frame
+                self.stats["crops"] += 1
+                return frame
+
+        return None
+
+    def get_frame(self, region: Optional[Region] = None,
+                  max_age: Optional[float] = None) -> Optional[Frame]:
+        """Güncel kareyi al (TTL içinde ise önbellekteki kareyi döndür)"""
+        region = self._key(region)
+        if max_age is None:
+            max_age = self.ttl_for(region)
+
+        frame = self._lookup(region, max_age)
+        if frame is not None:
+            return frame
+
+        with self._capture_lock:
+            # Kilidi beklerken başka bir thread yakalamış olabilir
+            frame = self._lookup(region, max_age)
+            if frame is not None:
+                return frame
+
+            return self._capture(region)
+
+    def get_image(self, region: Optional[Region] = None,
+                  max_age: Optional[float] = None) -> Optional[np.ndarray]:
+        """Güncel karenin BGR görüntüsünü al"""
+        frame = self.get_frame(region, max_age)
+        return frame.image if frame is not None else None
+
+    def publish(self, image: np.ndarray, region: Optional[Region] = None, cache: bool = True,
+                epoch: Optional[int] = None) -> Frame:
+        """Dışarıdan alınmış bir görüntüyü yeni kare olarak yayınla
+
+        epoch verilirse kare sadece o andan beri invalidate() çağrılmadıysa önbelleğe yazılır.
+        """
+        image = np.ascontiguousarray(image)
+        image.setflags(write=False)
+        region = self._key(region)
+        origin = (region[0], region[1]) if region else (0, 0)
+
+        with self._cache_lock:
+            self._version += 1
+            frame = Frame(image=image, version=self._version, timestamp=time.time(), origin=origin)
+            if cache and (epoch is None or epoch == self._epoch):
+                self._latest[region] = frame
+        return frame
+
+    @property
+    def epoch(self) -> int:
+        """invalidate() her çağrıldığında artan girdi sayacı"""
+        return self._epoch
+
+    def invalidate(self):
+        """Önbellekteki tüm kareleri geçersiz kıl (girdi sonrası çağrılır)"""
+        with self._cache_lock:
+            self._epoch += 1
+            self._latest.clear()
+        self.stats["invalidations"] += 1
+
+    def _capture(self, region: Optional[Region] = None) -> Optional[Frame]:
+        """Yeni kare yakala ve yayınla"""
+        epoch = self._epoch
+        try:
+            image = self._grab_func(region)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logging.error(f"Frame bus yakalama hatası: {e}")
+            return None
+
+        self.stats["captures"] += 1
+        # Yakalama sırasında girdi olduysa kare eskimiş olabilir; önbelleğe yazma
+        return self.publish(image, region, epoch=epoch)
+
+    def latest(self, region: Optional[Region] = None) -> Optional[Frame]:
+        """Bölge için son yayınlanan kare (yaşından bağımsız)"""
+        return self._latest.get(self._key(region))
+
+
+class FrameScope:
+    """Bir iş akışının (ör. makro çalıştırmasının) kullandığı güncel kare
+
+    Koşullar, aramalar ve tıklamalar aynı kareyi ve aynı kare üzerindeki
+    eşleşme sonuçlarını paylaşır. Veriyolunda invalidate() (girdi) olunca,
+    release() çağrılınca veya kare max_age'i aşınca yeni kare alınır.
+    """
+
+    def __init__(self, bus: FrameBus, region: Optional[Region] = None,
+                 max_age: float = DEFAULT_SCOPE_MAX_AGE):
+        self.bus = bus
+        self.region = region
+        self.max_age = max_age
+        self._frame: Optional[Frame] = None
+        self._epoch = -1
+        self._results: Dict[object, object] = {}
+
+        self.stats = {
+            "frames": 0,
+            "frame_reuses": 0,
+            "matches": 0,
+            "match_reuses": 0
+        }
+
+    def _is_current(self) -> bool:
+        return (self._frame is not None and self._epoch == self.bus.epoch
+                and self._frame.age < self.max_age)
+
+    def frame(self) -> Optional[Frame]:
+        """Kapsamın güncel karesi (gerekirse veriyolundan yenisi alınır)"""
+        if self._is_current():
+            self.stats["frame_reuses"] += 1
+            return self._frame
+
+        # Epoch yakalamadan önce okunur; yakalama sırasında girdi olursa kare bir sonraki istekte yenilenir
+        epoch = self.bus.epoch
+        self._frame = self.bus.get_frame(self.region)
+        self._epoch = epoch
+        self._results = {}
+        if self._frame is not None:
+            self.stats["frames"] += 1
+        return self._frame
+
+    def match(self, key, matcher: Callable[[Frame], object]):
+        """Güncel karede matcher(frame) sonucunu key ile önbellekle (kare yoksa None)"""
+        frame = self.frame()
+        if frame is None:
+            return None
+
+        if key in self._results:
+            self.stats["match_reuses"] += 1
+            return self._results[key]
+
+        result = matcher(frame)
+        self._results[key] = result
+        self.stats["matches"] += 1
+        return result
+
+    def release(self):
+        """Kareyi bırak (bekleme gibi ekranın değişmesi beklenen adımlardan sonra)"""
+        self._frame = None
+        self._results = {}
+
+
+# Global frame bus instance
+frame_bus = FrameBus()
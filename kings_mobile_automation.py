@@ -15,6 +15,9 @@ from typing import Dict, List, Tuple, Optional, Any
 import pyautogui
 from dataclasses import dataclass
 from enum import Enum
+from frame_bus import Frame, frame_bus, load_game_area_region
+from template_matcher import MAX_TEMPLATE_MATCHES, MatchResult
+from template_store import template_store
 
 
 class BuildingType(Enum):
@@ -101,6 +104,9 @@ class KingsMobileAutomation:
         self.templates_dir = "kings_mobile_templates"
         self.ensure_templates_directory()
         
+        # Sadece oyun alanı yakalanır (eşleşmeler mutlak koordinatta döner)
+        self.capture_region = load_game_area_region()
+        
         # Monitoring
         self.monitoring_active = False
         self.monitoring_thread = None
@@ -239,9 +245,10 @@ class KingsMobileAutomation:
     def update_game_state(self):
         """Oyun durumunu güncelle"""
         try:
-            # Ekran görüntüsü al
-            screenshot = pyautogui.screenshot()
-            screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+            # Oyun alanının karesini al (tam ekran yerine; eşleşmeler mutlak koordinatta)
+            screenshot = frame_bus.get_frame(self.capture_region)
+            if screenshot is None:
+                return
             
             # Kale seviyesini tespit et
             castle_level = self.detect_castle_level(screenshot)
@@ -278,14 +285,15 @@ class KingsMobileAutomation:
         try:
             # AI vision kullan
             if self.ai_vision:
-                result = self.ai_vision.analyze_game_state(screenshot, "castle_level")
+                image = screenshot.image if isinstance(screenshot, Frame) else screenshot
+                result = self.ai_vision.analyze_game_state(image, "castle_level")
                 if result and "level" in result:
                     return result["level"]
             
             # Template matching fallback
             template_path = os.path.join(self.templates_dir, "castle_info.png")
             if os.path.exists(template_path):
-                template = cv2.imread(template_path)
+                template = template_store.get(template_path)
                 locations = self.find_template(screenshot, template)
                 if locations:
                     # OCR ile seviye oku
@@ -314,7 +322,7 @@ class KingsMobileAutomation:
             for resource_type, template_file in resource_templates.items():
                 template_path = os.path.join(self.templates_dir, template_file)
                 if os.path.exists(template_path):
-                    template = cv2.imread(template_path)
+                    template = template_store.get(template_path)
                     locations = self.find_template(screenshot, template)
                     
                     if locations:
@@ -338,12 +346,11 @@ class KingsMobileAutomation:
                 time.sleep(2)
                 
                 # Hero listesini oku
-                hero_screenshot = pyautogui.screenshot()
-                hero_screenshot = cv2.cvtColor(np.array(hero_screenshot), cv2.COLOR_RGB2BGR)
+                hero_screenshot = frame_bus.get_frame(self.capture_region)
                 
                 # AI vision ile hero analizi
-                if self.ai_vision:
-                    hero_data = self.ai_vision.analyze_game_state(hero_screenshot, "heroes")
+                if self.ai_vision and hero_screenshot is not None:
+                    hero_data = self.ai_vision.analyze_game_state(hero_screenshot.image, "heroes")
                     if hero_data and "heroes" in hero_data:
                         for hero_info in hero_data["heroes"]:
                             hero = Hero(
@@ -373,8 +380,7 @@ class KingsMobileAutomation:
             if self.click_template("barracks_button.png", screenshot):
                 time.sleep(2)
                 
-                troop_screenshot = pyautogui.screenshot()
-                troop_screenshot = cv2.cvtColor(np.array(troop_screenshot), cv2.COLOR_RGB2BGR)
+                troop_screenshot = frame_bus.get_frame(self.capture_region)
                 
                 # Her asker tipi için sayıları oku
                 troop_templates = {
@@ -387,7 +393,7 @@ class KingsMobileAutomation:
                 for troop_type, template_file in troop_templates.items():
                     template_path = os.path.join(self.templates_dir, template_file)
                     if os.path.exists(template_path):
-                        template = cv2.imread(template_path)
+                        template = template_store.get(template_path)
                         locations = self.find_template(troop_screenshot, template)
                         
                         if locations:
@@ -459,8 +465,7 @@ class KingsMobileAutomation:
     def check_emergency_situations(self):
         """Acil durumları kontrol et"""
         try:
-            screenshot = pyautogui.screenshot()
-            screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+            screenshot = frame_bus.get_frame(self.capture_region)
             
             # Saldırı uyarısı
             if self.find_template(screenshot, "attack_warning.png"):
@@ -710,37 +715,43 @@ class KingsMobileAutomation:
         threading.Thread(target=hero_development_loop, daemon=True).start()
     
     # Utility methods
-    def find_template(self, screenshot, template_name, threshold=0.8):
-        """Template matching"""
+    def find_template(self, screenshot, template_name, threshold=0.8, max_results=MAX_TEMPLATE_MATCHES):
+        """Template matching
+        
+        screenshot bir Frame ise eşleşmeler mutlak ekran koordinatında döner.
+        Sonuç NMS uygulanmış, skora göre sıralı ve max_results ile sınırlı bir
+        MatchResult'tır; matches[0] en iyi eşleşmenin (x, y, w, h) değeridir.
+        """
         try:
+            origin_x, origin_y = 0, 0
+            if isinstance(screenshot, Frame):
+                origin_x, origin_y = screenshot.origin
+                screenshot = screenshot.image
+            
             if isinstance(template_name, str):
                 template_path = os.path.join(self.templates_dir, template_name)
                 if not os.path.exists(template_path):
-                    return []
-                template = cv2.imread(template_path)
+                    return MatchResult()
+                template = template_store.get(template_path)
+                if template is None:
+                    return MatchResult()
             else:
                 template = template_name
             
             result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            locations = np.where(result >= threshold)
-            
-            if len(locations[0]) > 0:
-                matches = []
-                for pt in zip(*locations[::-1]):
-                    matches.append((pt[0], pt[1], template.shape[1], template.shape[0]))
-                return matches
+            return MatchResult.from_result(result, (template.shape[1], template.shape[0]), threshold,
+                                           (origin_x, origin_y), max_results)
             
         except Exception as e:
             print(f"Template matching hatası: {e}")
         
-        return []
+        return MatchResult()
     
     def click_template(self, template_name, screenshot=None, confidence=0.8):
         """Template'e tıkla"""
         try:
             if screenshot is None:
-                screenshot = pyautogui.screenshot()
-                screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+                screenshot = frame_bus.get_frame(self.capture_region)
             
             matches = self.find_template(screenshot, template_name, confidence)
             if matches:
@@ -770,6 +781,7 @@ class KingsMobileAutomation:
             
             # Tıklama
             pyautogui.click()
+            frame_bus.invalidate()
             
             # Random delay
             time.sleep(random.uniform(0.1, 0.5))
@@ -781,7 +793,11 @@ class KingsMobileAutomation:
         """Bölgeden sayı çıkar (OCR)"""
         try:
             x, y, w, h = region
-            roi = screenshot[y:y+h, x:x+w]
+            if isinstance(screenshot, Frame):
+                # Eşleşmeler mutlak koordinatta; kare içine çevirerek kes
+                roi = screenshot.crop(region)
+            else:
+                roi = screenshot[y:y+h, x:x+w]
             
             # OCR ile sayı oku
             # Bu kısım Tesseract OCR veya custom number recognition gerektirir
@@ -797,8 +813,7 @@ class KingsMobileAutomation:
         try:
             # AI vision kullanarak march sayısını tespit et
             if self.ai_vision:
-                screenshot = pyautogui.screenshot()
-                screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+                screenshot = frame_bus.get_frame(self.capture_region)
                 # March bilgilerini AI ile analiz et
                 return []  # Şimdilik boş liste döndür
             return []
@@ -810,8 +825,7 @@ class KingsMobileAutomation:
         """Kaynak march'ı başlat"""
         try:
             # World map'e git ve resource tile seç
-            screenshot = pyautogui.screenshot()
-            screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+            screenshot = frame_bus.get_frame(self.capture_region)
             
             # Template'lerle march başlatma işlemi
             if self.click_template("world_map.png", screenshot):
@@ -830,8 +844,7 @@ class KingsMobileAutomation:
     def help_all_alliance(self):
         """Tüm alliance üyelerine yardım et"""
         try:
-            screenshot = pyautogui.screenshot()
-            screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+            screenshot = frame_bus.get_frame(self.capture_region)
             
             # Alliance paneline git
             if self.click_template("alliance_button.png", screenshot):
@@ -12,6 +12,7 @@ import time
 import threading
 import random
 from datetime import datetime
+from frame_bus import frame_bus, load_game_area_region
 
 class KingshotMobileAutomation:
     """Kingshot Mobile oyunu için özel otomasyon sistemi"""
@@ -65,17 +66,19 @@ class KingshotMobileAutomation:
         self.task_queue = []
         self.task_history = []
         
+        # Yakalama bölgesi: sadece oyun alanı (tanımlı değilse tam ekran)
+        self.capture_region = load_game_area_region()
+        
         print("🎮 Kingshot Mobile Automation System başlatıldı!")
     
     def update_game_state(self):
         """Oyun durumunu güncelle"""
         try:
             if self.ai_vision:
-                screenshot = pyautogui.screenshot()
-                screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+                screenshot = frame_bus.get_frame(self.capture_region)
                 
                 # AI ile oyun durumunu analiz et
-                game_analysis = self.ai_vision.analyze_game_state(screenshot)
+                game_analysis = self.ai_vision.analyze_game_state(screenshot.image) if screenshot is not None else None
                 if game_analysis:
                     self.game_state.update(game_analysis)
             
@@ -88,13 +91,13 @@ class KingshotMobileAutomation:
         """Template'i bul ve tıkla"""
         try:
             if screenshot is None:
-                screenshot = pyautogui.screenshot()
-                screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+                screenshot = frame_bus.get_frame(self.capture_region)
             
             # Template matching logic burada olacak
             # Şimdilik random konum döndür
             x, y = random.randint(100, 800), random.randint(100, 600)
             pyautogui.click(x, y)
+            frame_bus.invalidate()
             time.sleep(0.5)
             return True
             
@@ -144,8 +147,7 @@ class KingshotMobileAutomation:
             wait_time = 0
             
             while wait_time < max_wait:
-                screenshot = pyautogui.screenshot()
-                screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+                screenshot = frame_bus.get_frame(self.capture_region)
                 
                 # Victory/Defeat ekranını kontrol et
                 if self.check_battle_result(screenshot):
@@ -207,6 +209,7 @@ class KingshotMobileAutomation:
                 
                 for pos in hero_positions:
                     pyautogui.click(pos)
+                    frame_bus.invalidate()
                     time.sleep(1)
                     
                     # Upgrade butonunu kontrol et
@@ -445,6 +448,7 @@ class KingshotMobileAutomation:
                         pyautogui.click(400, 300)  # Input field pozisyonu
                         time.sleep(0.5)
                         pyautogui.typewrite(code)
+                        frame_bus.invalidate()
                         time.sleep(0.5)
                         
                         # Claim butonuna tıkla
@@ -455,6 +459,7 @@ class KingshotMobileAutomation:
                         # Input'u temizle
                         pyautogui.hotkey('ctrl', 'a')
                         pyautogui.press('delete')
+                        frame_bus.invalidate()
                         time.sleep(0.5)
                 
                 return True
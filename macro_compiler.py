@@ -0,0 +1,423 @@
+"""
+⚙️ King Bot Pro - Makro Derleyici
+Makro aksiyonlarını atlama hedefleri çözülmüş, önceden doğrulanmış düz bir komut listesine çevirir
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+
+# Komutlar
+OP_ACTION = "action"            # Yaprak aksiyon (tıklama, bekleme, template...)
+OP_LOOP_START = "loop_start"    # Döngü sayacını hazırla
+OP_LOOP_TEST = "loop_test"      # Sayaç/koşul kontrolü; bitti ise target'a atla
+OP_LOOP_NEXT = "loop_next"      # Sayacı artır, teste dön
+OP_LOOP_FAIL = "loop_fail"      # Gövdede kritik hata: break_on_error ise başarısız bitir
+OP_CONDITION = "condition"      # Koşul yanlışsa target'a (false dalı) atla
+OP_JUMP = "jump"
+OP_END_OK = "end_ok"            # Bileşik aksiyon başarılı
+OP_END_FAIL = "end_fail"        # Bileşik aksiyon başarısız (kritikse üst bloğun hata hedefine)
+OP_HALT = "halt"                # Makro sonu (target: 1 başarılı, 0 başarısız)
+
+LOOP_TYPES = ("count", "while")
+
+
+class MacroCompileError(ValueError):
+    """Makro derlenemedi (bilinmeyen aksiyon/koşul/döngü tipi)"""
+
+
+def has_placeholder(value: Any) -> bool:
+    """Parametrede {değişken} yer tutucusu var mı"""
+    if isinstance(value, str):
+        return "{" in value and PLACEHOLDER_PATTERN.search(value) is not None
+    if isinstance(value, dict):
+        return any(has_placeholder(item) for item in value.values())
+    if isinstance(value, list):
+        return any(has_placeholder(item) for item in value)
+    return False
+
+
+def substitute(value: Any, variables: Dict[str, Any]) -> Any:
+    """{değişken} yer tutucularını değerleriyle değiştir (tanımsız olanlar kalır)"""
+    if isinstance(value, str):
+        if "{" not in value:
+            return value
+        return PLACEHOLDER_PATTERN.sub(
+            lambda match: str(variables[match.group(1)]) if match.group(1) in variables else match.group(0),
+            value
+        )
+    if isinstance(value, dict):
+        return {key: substitute(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, variables) for item in value]
+    return value
+
+
+class ParamTemplate:
+    """Derlenmiş parametreler
+
+    Yer tutucu içermeyen parametreler her çalıştırmada aynı sözlük olarak döner
+    (kopyalama/gezinme yok); sadece yer tutuculu olanlar değişkenlerle çözülür.
+    """
+
+    __slots__ = ("params", "is_static")
+
+    def __init__(self, params: Any):
+        self.params = params
+        self.is_static = not has_placeholder(params)
+
+    def resolve(self, variables: Dict[str, Any]) -> Any:
+        if self.is_static:
+            return self.params
+        return substitute(self.params, variables)
+
+
+@dataclass
+class ActionInfo:
+    """Sözlükten okunan aksiyon (MacroAction ile aynı alanlar)"""
+    id: str
+    action_type: str
+    parameters: Dict[str, Any]
+    description: str = ""
+    enabled: bool = True
+    retry_count: int = 0
+    max_retries: int = 3
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        return cls(
+            id=data.get('id', ''),
+            action_type=data['action_type'],
+            parameters=data.get('parameters', {}),
+            description=data.get('description', ''),
+            enabled=data.get('enabled', True),
+            retry_count=data.get('retry_count', 0),
+            max_retries=data.get('max_retries', 3)
+        )
+
+
+class _Label:
+    """Derleme sırasında çözülecek atlama hedefi"""
+    __slots__ = ("index",)
+
+    def __init__(self):
+        self.index = -1
+
+
+@dataclass
+class Instruction:
+    """Düz komut listesindeki tek komut"""
+    op: str
+    action: Any = None
+    action_type: str = ""
+    params: Optional[ParamTemplate] = None
+    target: Any = -1
+    fail_target: Any = -1
+    slot: int = -1
+    critical: bool = False
+    retries: int = 0
+
+
+class _Program:
+    """Tek bir derlemenin komut listesi ve döngü sayacı yuvaları
+
+    Her compile() çağrısı kendi nesnesini kullanır; paylaşılan derleyici
+    farklı thread'lerden aynı anda çağrılabilir.
+    """
+
+    def __init__(self):
+        self.code: List[Instruction] = []
+        self.slots = 0
+
+    def emit(self, instruction: Instruction) -> Instruction:
+        self.code.append(instruction)
+        return instruction
+
+    def mark(self, label: _Label):
+        label.index = len(self.code)
+
+    def new_slot(self) -> int:
+        slot = self.slots
+        self.slots += 1
+        return slot
+
+
+def action_type_name(action: Any) -> str:
+    """MacroAction/ActionInfo aksiyon tipini metin olarak al"""
+    return getattr(action.action_type, "value", action.action_type)
+
+
+class CompiledMacro:
+    """Derlenmiş makro: düz komut listesi ve küçük bir yürütücü"""
+
+    def __init__(self, name: str, instructions: List[Instruction], slot_count: int):
+        self.name = name
+        self.instructions = instructions
+        self.slot_count = slot_count
+
+    def __len__(self) -> int:
+        return len(self.instructions)
+
+    def run(self, context, run_action: Callable[[str, Dict, Any], bool],
+            check_condition: Callable[[Dict, Any], bool],
+            on_action: Optional[Callable[[Any], None]] = None,
+            should_continue: Optional[Callable[[], bool]] = None,
+            on_loop_test: Optional[Callable[[Any], None]] = None) -> bool:
+        """Makroyu context üzerinde çalıştır
+
+        run_action(aksiyon_tipi, parametreler, context) yaprak aksiyonu, check_condition
+        koşulu değerlendirir. should_continue False dönerse makro durdurulur.
+        on_loop_test her while koşulu değerlendirmesinden önce çağrılır (ör. kareyi yenilemek için).
+        """
+        code = self.instructions
+        variables = context.variables
+        counters = [0] * self.slot_count
+        limits = [0] * self.slot_count
+        conditions: List[Optional[ParamTemplate]] = [None] * self.slot_count
+        pc = 0
+
+        while True:
+            if should_continue is not None and not should_continue():
+                return False
+
+            instruction = code[pc]
+            op = instruction.op
+
+            if op == OP_ACTION:
+                context.current_action = instruction.action
+                if on_action:
+                    on_action(instruction.action)
+
+                params = instruction.params.resolve(variables)
+                success = run_action(instruction.action_type, params, context)
+                if success:
+                    _record(context, instruction.action)
+                else:
+                    context.error_count += 1
+                    # Her çalıştırmada (döngü turunda) bir tekrar hakkı
+                    if instruction.retries > 0:
+                        print(f"🔄 Retry 1/{instruction.retries}")
+                        success = run_action(instruction.action_type, params, context)
+                    if not success:
+                        _log(context, instruction.action, "failed")
+                        if instruction.critical:
+                            print(f"❌ Critical aksiyon başarısız: {instruction.action.description}")
+                            pc = instruction.fail_target
+                            continue
+                    else:
+                        _record(context, instruction.action)
+                pc += 1
+
+            elif op == OP_LOOP_TEST:
+                slot = instruction.slot
+                condition = conditions[slot]
+                if condition is not None and on_loop_test is not None and counters[slot] < limits[slot]:
+                    on_loop_test(context)
+                if counters[slot] >= limits[slot] or (
+                        condition is not None and not check_condition(condition.resolve(variables), context)):
+                    pc = instruction.target
+                    continue
+                variables["loop_index"] = counters[slot]
+                if condition is None:
+                    context.loop_stack.append({"type": "count", "index": counters[slot], "count": limits[slot]})
+                else:
+                    context.loop_stack.append({"type": "while", "index": counters[slot]})
+                pc += 1
+
+            elif op == OP_LOOP_NEXT:
+                context.loop_stack.pop()
+                counters[instruction.slot] += 1
+                pc = instruction.target
+
+            elif op == OP_LOOP_START:
+                context.current_action = instruction.action
+                if on_action:
+                    on_action(instruction.action)
+
+                params = instruction.params.resolve(variables)
+                slot = instruction.slot
+                counters[slot] = 0
+                if params.get("type", "count") == "count":
+                    limits[slot] = int(params.get("count", 1))
+                    conditions[slot] = None
+                else:
+                    limits[slot] = int(params.get("max_iterations", 100))
+                    conditions[slot] = ParamTemplate(params.get("condition", {}))
+                pc += 1
+
+            elif op == OP_LOOP_FAIL:
+                context.loop_stack.pop()
+                if instruction.critical:  # break_on_error
+                    pc = instruction.fail_target
+                else:
+                    counters[instruction.slot] += 1
+                    pc = instruction.target
+
+            elif op == OP_CONDITION:
+                context.current_action = instruction.action
+                if on_action:
+                    on_action(instruction.action)
+
+                condition = instruction.params.resolve(variables)
+                pc = pc + 1 if check_condition(condition, context) else instruction.target
+
+            elif op == OP_JUMP:
+                pc = instruction.target
+
+            elif op == OP_END_OK:
+                _record(context, instruction.action)
+                pc += 1
+
+            elif op == OP_END_FAIL:
+                context.error_count += 1
+                _log(context, instruction.action, "failed")
+                pc = instruction.fail_target if instruction.critical else instruction.target
+
+            elif op == OP_HALT:
+                return bool(instruction.target)
+
+
+def _log(context, action, status: str):
+    context.execution_log.append({
+        "action_id": action.id,
+        "status": status,
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+def _record(context, action):
+    context.success_count += 1
+    _log(context, action, "success")
+
+
+class MacroCompiler:
+    """Makro aksiyon ağacını düz komut listesine derler
+
+    Döngü ve koşul gövdeleri bir kez MacroAction'a çevrilir, aksiyon/koşul/döngü
+    tipleri derlemede doğrulanır ve sabit template isimleri dosya yoluna çözülür.
+    """
+
+    def __init__(self, action_types: Iterable[str], condition_types: Iterable[str],
+                 action_factory: Callable[[Dict], Any] = ActionInfo.from_dict,
+                 resolve_template: Optional[Callable[[str], Optional[str]]] = None):
+        self.action_types = set(action_types)
+        self.condition_types = set(condition_types)
+        self.action_factory = action_factory
+        self.resolve_template = resolve_template
+
+    def compile(self, actions: List[Any], name: str = "") -> CompiledMacro:
+        """Aksiyon listesini derle"""
+        program = _Program()
+
+        fail = _Label()
+        self._compile_block(program, actions, fail)
+        program.emit(Instruction(OP_HALT, target=1))
+        program.mark(fail)
+        program.emit(Instruction(OP_HALT, target=0))
+
+        # Etiketleri indekse çevir
+        for instruction in program.code:
+            if isinstance(instruction.target, _Label):
+                instruction.target = instruction.target.index
+            if isinstance(instruction.fail_target, _Label):
+                instruction.fail_target = instruction.fail_target.index
+
+        return CompiledMacro(name, program.code, program.slots)
+
+    def _action(self, raw: Any) -> Any:
+        return self.action_factory(raw) if isinstance(raw, dict) else raw
+
+    def _compile_block(self, program: _Program, actions: List[Any], fail: _Label):
+        for raw in actions:
+            action = self._action(raw)
+            if not action.enabled:
+                continue
+
+            kind = action_type_name(action)
+            if kind == "loop":
+                self._compile_loop(program, action, fail)
+            elif kind == "condition":
+                self._compile_condition(program, action, fail)
+            elif kind in self.action_types:
+                program.emit(Instruction(
+                    OP_ACTION, action=action, action_type=kind,
+                    params=ParamTemplate(self._resolve_templates(kind, action.parameters)),
+                    fail_target=fail, critical=bool(action.parameters.get("critical", False)),
+                    retries=max(0, action.max_retries - action.retry_count)
+                ))
+            else:
+                raise MacroCompileError(f"Bilinmeyen aksiyon tipi: {kind}")
+
+    def _compile_end(self, program: _Program, action: Any, fail: _Label, end_fail: _Label, end_ok: _Label, after: _Label):
+        """Bileşik aksiyonun başarılı/başarısız bitiş komutları"""
+        program.mark(end_fail)
+        program.emit(Instruction(OP_END_FAIL, action=action, target=after, fail_target=fail,
+                               critical=bool(action.parameters.get("critical", False))))
+        program.mark(end_ok)
+        program.emit(Instruction(OP_END_OK, action=action))
+        program.mark(after)
+
+    def _compile_loop(self, program: _Program, action: Any, fail: _Label):
+        params = action.parameters
+        loop_type = params.get("type", "count")
+        if loop_type not in LOOP_TYPES:
+            raise MacroCompileError(f"Bilinmeyen döngü tipi: {loop_type}")
+        condition = self._check_condition(params.get("condition", {})) if loop_type == "while" else None
+
+        slot = program.new_slot()
+        body_fail, end_fail, end_ok, after = _Label(), _Label(), _Label(), _Label()
+
+        # Gövde ayrı derlendiği için yer tutucular sadece döngü ayarlarında çözülür
+        settings = {key: value for key, value in params.items() if key != "actions"}
+        if condition is not None:
+            settings["condition"] = condition
+        program.emit(Instruction(OP_LOOP_START, action=action, params=ParamTemplate(settings), slot=slot))
+        test_index = len(program.code)
+        program.emit(Instruction(OP_LOOP_TEST, action=action, slot=slot, target=end_ok))
+
+        self._compile_block(program, params.get("actions", []), body_fail)
+        program.emit(Instruction(OP_LOOP_NEXT, slot=slot, target=test_index))
+
+        program.mark(body_fail)
+        program.emit(Instruction(OP_LOOP_FAIL, slot=slot, target=test_index, fail_target=end_fail,
+                               critical=bool(params.get("break_on_error", False))))
+
+        self._compile_end(program, action, fail, end_fail, end_ok, after)
+
+    def _compile_condition(self, program: _Program, action: Any, fail: _Label):
+        params = action.parameters
+        condition = self._check_condition(params.get("condition", {}))
+        false_branch, end_fail, end_ok, after = _Label(), _Label(), _Label(), _Label()
+
+        program.emit(Instruction(OP_CONDITION, action=action, params=ParamTemplate(condition), target=false_branch))
+        self._compile_block(program, params.get("true_actions", []), end_fail)
+        program.emit(Instruction(OP_JUMP, target=end_ok))
+
+        program.mark(false_branch)
+        self._compile_block(program, params.get("false_actions", []), end_fail)
+        program.emit(Instruction(OP_JUMP, target=end_ok))
+
+        self._compile_end(program, action, fail, end_fail, end_ok, after)
+
+    def _check_condition(self, condition: Dict) -> Dict:
+        """Koşul tipini doğrula, template yolunu çöz"""
+        condition_type = condition.get("type")
+        if condition_type not in self.condition_types:
+            raise MacroCompileError(f"Bilinmeyen koşul tipi: {condition_type}")
+        return self._resolve_templates(condition_type, condition)
+
+    def _resolve_templates(self, kind: str, params: Dict) -> Dict:
+        """Sabit template ismini dosya yoluna çöz (template önceden yüklenir)"""
+        template = params.get("template")
+        if (self.resolve_template is None or "template" not in kind or not isinstance(template, str)
+                or has_placeholder(template)):
+            return params
+
+        path = self.resolve_template(template)
+        if path is None or path == template:
+            return params
+        return {**params, "template": path}
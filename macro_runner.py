@@ -0,0 +1,206 @@
+"""
+🏃 King Bot Pro - Makro Çalıştırıcı
+Makro çalıştırmalarını benzersiz run ID'leriyle kaydeder, sınırlı bir havuzda çalıştırır ve iptal eder
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+DEFAULT_MAX_CONCURRENT_MACROS = 2
+DEFAULT_BINDING = "screen"  # Bölge/emülatör verilmeyen çalıştırmalar aynı ekranı paylaşır
+RUN_HISTORY_LIMIT = 50  # Bitmiş çalıştırmalardan saklanacak en fazla kayıt
+
+RUN_PENDING = "pending"
+RUN_RUNNING = "running"
+RUN_COMPLETED = "completed"
+RUN_FAILED = "failed"
+RUN_CANCELLED = "cancelled"
+
+FINISHED_STATES = (RUN_COMPLETED, RUN_FAILED, RUN_CANCELLED)
+
+# Fare/klavye tüm pencerelerle paylaşılır: girdi çağrıları bu kilitle sıraya girer
+input_lock = threading.RLock()
+
+
+@dataclass
+class MacroRun:
+    """Tek bir makro çalıştırması"""
+    run_id: str
+    macro_id: str
+    name: str = ""
+    binding: Optional[Any] = None  # Emülatör adı veya yakalama bölgesi
+    region: Optional[Tuple[int, int, int, int]] = None
+    context: Any = None
+    status: str = RUN_PENDING
+    result: Optional[bool] = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "macro_id": self.macro_id,
+            "name": self.name,
+            "binding": self.binding,
+            "region": self.region,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class MacroRunner:
+    """Makro çalıştırma kaydı ve sınırlı çalıştırma havuzu
+
+    Aynı bağlamaya (emülatör/bölge) ait çalıştırmalar sırayla, farklı
+    bağlamalardakiler havuz boyutuna kadar paralel çalışır. Meşgul bir bağlamanın
+    çalıştırmaları havuz thread'i tutmadan bağlama kuyruğunda bekler ve bağlama
+    boşalınca havuza gönderilir. İptal işbirlikçidir: çalıştırma cancel_event'i
+    aksiyonlar arasında (ve beklemelerde) kontrol eder.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT_MACROS,
+                 history_limit: int = RUN_HISTORY_LIMIT):
+        self.max_concurrent = max_concurrent
+        self.history_limit = history_limit
+        self.runs: Dict[str, MacroRun] = {}
+
+        self._lock = threading.Lock()
+        self._busy_bindings: set = set()
+        self._binding_queues: Dict[Any, deque] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="macro-run")
+
+    def submit(self, macro_id: str, work: Callable[[MacroRun], bool], name: str = "",
+               binding: Optional[Any] = None, region: Optional[Tuple[int, int, int, int]] = None,
+               context: Any = None) -> MacroRun:
+        """Çalıştırmayı kaydet ve havuza gönder; work(run) sonucu run.result olur"""
+        run = MacroRun(run_id=str(uuid.uuid4()), macro_id=macro_id, name=name,
+                       binding=binding, region=region, context=context, future=Future())
+        with self._lock:
+            self.runs[run.run_id] = run
+            self._prune_history()
+
+            # Aynı pencerede başka makro çalışıyorsa bağlama kuyruğunda bekler
+            if binding is not None:
+                if binding in self._busy_bindings:
+                    self._binding_queues.setdefault(binding, deque()).append((run, work))
+                    return run
+                self._busy_bindings.add(binding)
+
+        self._executor.submit(self._execute, run, work)
+        return run
+
+    def _release_binding(self, binding: Any):
+        """Bağlamayı kuyruktaki sıradaki (iptal edilmemiş) çalıştırmaya devret"""
+        if binding is None:
+            return
+
+        with self._lock:
+            queue = self._binding_queues.get(binding)
+            while queue and queue[0][0].future.cancelled():
+                queue.popleft()
+            if not queue:
+                self._binding_queues.pop(binding, None)
+                self._busy_bindings.discard(binding)
+                return
+            run, work = queue.popleft()
+
+        self._executor.submit(self._execute, run, work)
+
+    def _execute(self, run: MacroRun, work: Callable[[MacroRun], bool]) -> Optional[bool]:
+        """Havuz thread'i: işi çalıştır, durumu yaz, bağlamayı sıradakine devret"""
+        try:
+            # Beklerken iptal edildiyse hiç başlamaz
+            if not run.future.set_running_or_notify_cancel():
+                return None
+
+            if run.cancelled:
+                run.status = RUN_CANCELLED
+                run.future.set_result(None)
+                return None
+
+            run.status = RUN_RUNNING
+            run.started_at = time.time()
+            try:
+                run.result = bool(work(run))
+                if run.cancelled:
+                    run.status = RUN_CANCELLED
+                else:
+                    run.status = RUN_COMPLETED if run.result else RUN_FAILED
+            except Exception as e:
+                run.result = False
+                run.error = str(e)
+                run.status = RUN_FAILED
+                print(f"❌ Makro çalıştırma hatası ({run.name or run.macro_id}): {e}")
+            run.future.set_result(run.result)
+            return run.result
+        finally:
+            if run.finished_at is None:
+                run.finished_at = time.time()
+            self._release_binding(run.binding)
+
+    def _prune_history(self):
+        """En eski bitmiş çalıştırmaları sil"""
+        finished = [run for run in self.runs.values() if run.finished]
+        for run in finished[:max(0, len(finished) - self.history_limit)]:
+            del self.runs[run.run_id]
+
+    def cancel(self, run_id: str) -> bool:
+        """Çalıştırmayı iptal et (bekliyorsa hiç başlamaz)"""
+        run = self.runs.get(run_id)
+        if run is None or run.finished:
+            return False
+        run.cancel_event.set()
+        if run.future is not None and run.future.cancel():
+            run.status = RUN_CANCELLED
+            run.finished_at = time.time()
+        return True
+
+    def cancel_macro(self, macro_id: str) -> int:
+        """Makronun tüm aktif çalıştırmalarını iptal et"""
+        return sum(1 for run in self.active_runs(macro_id) if self.cancel(run.run_id))
+
+    def get_run(self, run_id: str) -> Optional[MacroRun]:
+        return self.runs.get(run_id)
+
+    def active_runs(self, macro_id: Optional[str] = None) -> List[MacroRun]:
+        """Bekleyen veya çalışan çalıştırmalar"""
+        return [run for run in list(self.runs.values())
+                if not run.finished and (macro_id is None or run.macro_id == macro_id)]
+
+    def wait(self, run_id: str, timeout: Optional[float] = None) -> Optional[bool]:
+        """Çalıştırmanın bitmesini bekle ve sonucunu döndür"""
+        run = self.runs.get(run_id)
+        if run is None or run.future is None:
+            return None
+        try:
+            return run.future.result(timeout)
+        except Exception:
+            return run.result
+
+    def shutdown(self, wait: bool = True):
+        """Tüm çalıştırmaları iptal et ve havuzu kapat"""
+        for run in self.active_runs():
+            self.cancel(run.run_id)
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,309 @@
+"""
+🗂️ King Bot Pro - Makro Deposu
+Makroları ayrı dosyalarda, özet dizini ile saklar; değişiklikleri toplayıp gecikmeli ve atomik olarak yazar
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+DEFAULT_MACRO_DIR = "macros"
+INDEX_FILE_NAME = "index.json"
+INDEX_FORMAT_VERSION = 1
+DEFAULT_FLUSH_DELAY = 1.0  # Son değişiklikten sonra yazmadan önce beklenen süre (saniye)
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 4):
+    """JSON'u geçici dosyaya yazıp yeniden adlandır (yarım dosya kalmaz)"""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def macro_summary(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Listeleme için makro özeti (aksiyonlar olmadan)"""
+    return {
+        "id": data["id"],
+        "name": data.get("name", ""),
+        "description": data.get("description", ""),
+        "tags": data.get("tags", []),
+        "enabled": data.get("enabled", True),
+        "modified_at": data.get("modified_at"),
+        "action_count": len(data.get("actions", []))
+    }
+
+
+class MacroStore:
+    """Makro başına dosya + özet dizini tutan depo
+
+    Açılışta sadece dizin okunur; makro gövdeleri ilk erişimde yüklenir.
+    Düzenlemeler mark_dirty() ile işaretlenir ve son değişiklikten flush_delay
+    sonra tek seferde yazılır: sadece değişen makroların dosyaları ve dizin.
+    Yazmayı tek bir uzun ömürlü thread yapar; her değişiklik sadece son tarihi ileri alır.
+    Eski tek dosyalı macros.json ilk açılışta bir kez bu düzene taşınır.
+    """
+
+    def __init__(self, directory: str = DEFAULT_MACRO_DIR, legacy_file: Optional[str] = None,
+                 flush_delay: float = DEFAULT_FLUSH_DELAY):
+        self.directory = directory
+        self.legacy_file = legacy_file
+        self.flush_delay = flush_delay
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._deleted: set = set()
+
+        # Gecikmeli yazma: flusher thread son tarihe (monotonic) kadar uyur
+        self._wakeup = threading.Condition(self._lock)
+        self._deadline: Optional[float] = None
+        self._flusher: Optional[threading.Thread] = None
+        self._closing = False
+
+        self.stats = {
+            "loads": 0,
+            "writes": 0,
+            "flushes": 0
+        }
+
+        self.index: Dict[str, Dict[str, Any]] = self._load_index()
+
+    # --- Dosyalar ---
+
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILE_NAME)
+
+    def _macro_path(self, macro_id: str) -> str:
+        return os.path.join(self.directory, f"{macro_id}.json")
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """Özet dizinini yükle (yoksa eski dosyadan taşı veya makro dosyalarından oluştur)"""
+        try:
+            if os.path.exists(self._index_path()):
+                try:
+                    with open(self._index_path(), 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if isinstance(data, dict) and data.get("version") == INDEX_FORMAT_VERSION:
+                        return data.get("macros", {})
+                except (OSError, ValueError) as e:
+                    # Bozuk dizin: makro dosyalarından yeniden oluşturulur
+                    print(f"Makro dizini bozuk, yeniden oluşturuluyor: {e}")
+
+            if os.path.isdir(self.directory):
+                return self._rebuild_index()
+
+            if self.legacy_file and os.path.exists(self.legacy_file):
+                return self._migrate_legacy()
+        except Exception as e:
+            print(f"Makro dizini yükleme hatası: {e}")
+        return {}
+
+    def _rebuild_index(self) -> Dict[str, Dict[str, Any]]:
+        """Dizin dosyası bozuk/eksikse makro dosyalarını tarayarak yeniden oluştur"""
+        index = {}
+        for file_name in sorted(os.listdir(self.directory)):
+            if not file_name.endswith(".json") or file_name == INDEX_FILE_NAME:
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                index[data["id"]] = macro_summary(data)
+            except Exception as e:
+                print(f"Makro dosyası okunamadı ({file_name}): {e}")
+
+        self.index = index
+        self._write_index()
+        return index
+
+    def _migrate_legacy(self) -> Dict[str, Dict[str, Any]]:
+        """Tek dosyalı macros.json'u makro başına dosyalara taşı (eski dosyaya dokunulmaz)"""
+        with open(self.legacy_file, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+
+        os.makedirs(self.directory, exist_ok=True)
+        index = {}
+        for macro_id, data in legacy.items():
+            atomic_write_json(self._macro_path(macro_id), data)
+            index[macro_id] = macro_summary(data)
+
+        self.index = index
+        self._write_index()
+        print(f"✅ {len(index)} makro yeni depoya taşındı: {self.directory}")
+        return index
+
+    def _write_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write_json(self._index_path(), {"version": INDEX_FORMAT_VERSION, "macros": self.index}, indent=None)
+
+    # --- Okuma ---
+
+    def ids(self) -> List[str]:
+        return list(self.index)
+
+    def load(self, macro_id: str) -> Optional[Dict[str, Any]]:
+        """Makro gövdesini diskten oku"""
+        try:
+            with open(self._macro_path(macro_id), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.stats["loads"] += 1
+            return data
+        except Exception as e:
+            print(f"Makro yükleme hatası ({macro_id}): {e}")
+            return None
+
+    # --- Yazma ---
+
+    def mark_dirty(self, macro_id: str, serialize: Callable[[], Dict[str, Any]]):
+        """Makroyu yazılacaklara ekle; serialize() yazma anında çağrılır"""
+        with self._lock:
+            self._dirty[macro_id] = serialize
+            self._deleted.discard(macro_id)
+            self._schedule()
+
+    def delete(self, macro_id: str):
+        """Makroyu depodan sil (bir sonraki yazmada)"""
+        with self._lock:
+            self._dirty.pop(macro_id, None)
+            self._deleted.add(macro_id)
+            self._schedule()
+
+    @property
+    def pending(self) -> int:
+        """Yazılmayı bekleyen değişiklik sayısı"""
+        return len(self._dirty) + len(self._deleted)
+
+    def _schedule(self):
+        """Yazmayı son değişiklikten flush_delay sonraya ertele (kilit tutulurken çağrılır)"""
+        self._deadline = time.monotonic() + self.flush_delay
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, name="macro-flusher", daemon=True)
+            self._flusher.start()
+        self._wakeup.notify()
+
+    def _flush_loop(self):
+        """Son tarih dolunca bekleyen değişiklikleri yaz; close() çağrılana kadar çalışır"""
+        while True:
+            with self._wakeup:
+                while True:
+                    if self._closing:
+                        return
+                    if self._deadline is None:
+                        self._wakeup.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                self._deadline = None
+
+            self.flush()
+
+    def flush(self):
+        """Bekleyen değişiklikleri şimdi yaz"""
+        with self._flush_lock:
+            with self._lock:
+                self._deadline = None
+                dirty, self._dirty = self._dirty, {}
+                deleted, self._deleted = self._deleted, set()
+
+            if not dirty and not deleted:
+                return
+
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                for macro_id, serialize in dirty.items():
+                    data = serialize()
+                    atomic_write_json(self._macro_path(macro_id), data)
+                    self.index[macro_id] = macro_summary(data)
+                    self.stats["writes"] += 1
+
+                for macro_id in deleted:
+                    self.index.pop(macro_id, None)
+                    if os.path.exists(self._macro_path(macro_id)):
+                        os.remove(self._macro_path(macro_id))
+
+                self._write_index()
+                self.stats["flushes"] += 1
+            except Exception as e:
+                print(f"Makro kaydetme hatası: {e}")
+                # Yazılamayanları bir sonraki denemeye bırak
+                with self._lock:
+                    for macro_id, serialize in dirty.items():
+                        self._dirty.setdefault(macro_id, serialize)
+                    self._deleted |= deleted - set(self._dirty)
+
+    def close(self):
+        """Flusher thread'i durdur ve bekleyen değişiklikleri yaz"""
+        with self._wakeup:
+            self._closing = True
+            flusher, self._flusher = self._flusher, None
+            self._wakeup.notify()
+        if flusher is not None:
+            flusher.join(timeout=5.0)
+        with self._lock:
+            self._closing = False
+        self.flush()
+
+
+class LazyMacroDict(MutableMapping):
+    """Makro gövdelerini ilk erişimde depodan yükleyen sözlük
+
+    Anahtarlar dizinden gelir; in/len/iter gövde yüklemez. Gövdesi eksik veya
+    okunamayan makro ilk erişimde anahtarlardan çıkarılır (KeyError).
+    """
+
+    def __init__(self, store: MacroStore, factory: Callable[[Dict[str, Any]], Any]):
+        self._store = store
+        self._factory = factory
+        self._ids: Dict[str, None] = dict.fromkeys(store.ids())
+        self._loaded: Dict[str, Any] = {}
+
+    def __getitem__(self, macro_id: str):
+        if macro_id in self._loaded:
+            return self._loaded[macro_id]
+        if macro_id not in self._ids:
+            raise KeyError(macro_id)
+
+        data = self._store.load(macro_id)
+        try:
+            if data is None:
+                raise ValueError("gövde okunamadı")
+            macro = self._factory(data)
+        except Exception as e:
+            # Sonraki "in" kontrolleri de bulunamadı desin
+            print(f"Makro kullanılamıyor, listeden çıkarıldı ({macro_id}): {e}")
+            del self._ids[macro_id]
+            raise KeyError(macro_id) from e
+        self._loaded[macro_id] = macro
+        return macro
+
+    def __setitem__(self, macro_id: str, macro):
+        self._ids[macro_id] = None
+        self._loaded[macro_id] = macro
+
+    def __delitem__(self, macro_id: str):
+        if macro_id not in self._ids:
+            raise KeyError(macro_id)
+        del self._ids[macro_id]
+        self._loaded.pop(macro_id, None)
+
+    def __contains__(self, macro_id) -> bool:
+        return macro_id in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._ids))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def is_loaded(self, macro_id: str) -> bool:
+        return macro_id in self._loaded
+
+    def loaded(self) -> Dict[str, Any]:
+        """Şu ana kadar yüklenmiş makrolar"""
+        return dict(self._loaded)
@@ -3,7 +3,9 @@
 Karmaşık otomasyonlar için akıllı makro sistemi
 """
 
+import atexit
 import json
+import inspect
 import time
 import threading
 import uuid
@@ -17,6 +19,13 @@ import cv2
 import numpy as np
 import random
 import re
+from frame_bus import Frame, FrameScope, frame_bus, load_game_area_region
+from template_matcher import MAX_TEMPLATE_MATCHES, MatchResult
+from template_store import template_store
+from macro_compiler import CompiledMacro, MacroCompileError, MacroCompiler
+from macro_runner import DEFAULT_BINDING, DEFAULT_MAX_CONCURRENT_MACROS, MacroRun, MacroRunner, input_lock
+from template_waiter import DEFAULT_POLL_INTERVAL, WAIT_ANY, TemplateWaiter
+from macro_store import DEFAULT_MACRO_DIR, LazyMacroDict, MacroStore, macro_summary
 
 
 class ActionType(Enum):
@@ -48,6 +57,15 @@ class ConditionType(Enum):
     RANDOM_CHANCE = "random_chance"
 
 
+# Karenin değişmediği aksiyonlar (tıklama girdisi frame_bus'ı zaten geçersiz kılar)
+FRAME_SCOPED_ACTIONS = {
+    ActionType.TEMPLATE_FIND.value,
+    ActionType.TEMPLATE_CLICK.value,
+    ActionType.VARIABLE.value,
+    ActionType.SCREENSHOT.value,
+}
+
+
 @dataclass
 class MacroAction:
     """Makro aksiyonu"""
@@ -134,7 +152,7 @@ class MacroSequence:
 class MacroExecutionContext:
     """Makro çalıştırma bağlamı"""
     
-    def __init__(self):
+    def __init__(self, capture_region=None):
         self.variables = {}
         self.loop_stack = []
         self.execution_log = []
@@ -143,29 +161,55 @@ class MacroExecutionContext:
         self.screenshots = []
         self.error_count = 0
         self.success_count = 0
+        
+        # Koşul/arama/tıklama aynı kareyi ve eşleşmeleri paylaşır (girdiye kadar)
+        self.frame_scope = FrameScope(frame_bus, capture_region)
+        
+        # Aksiyonlar arasında ve beklemelerde kontrol edilen iptal bayrağı
+        self.cancel_event = threading.Event()
 
 
 class MacroEngine:
     """Gelişmiş makro motoru"""
     
-    def __init__(self, ai_vision_system=None):
+    def __init__(self, ai_vision_system=None, max_concurrent_macros: int = DEFAULT_MAX_CONCURRENT_MACROS):
         self.ai_vision = ai_vision_system
         self.macros = {}
-        self.execution_contexts = {}
-        self.running_macros = {}
+        self.execution_contexts = {}  # Makronun son çalıştırmasının bağlamı
         self.macro_library = {}
         
+        # Çalıştırma kaydı: her çalıştırmanın kendi run ID'si ve bağlamı vardır
+        self.runner = MacroRunner(max_concurrent_macros)
+        self.emulator_regions: Dict[str, tuple] = {}
+        
+        # Sadece oyun alanı yakalanır (eşleşmeler mutlak koordinatta döner)
+        self.capture_region = load_game_area_region()
+        
         # Dosya yolları
-        self.macros_file = "macros.json"
+        self.macros_file = "macros.json"  # Eski tek dosyalı kayıt (ilk açılışta depoya taşınır)
+        self.macros_dir = DEFAULT_MACRO_DIR
         self.library_file = "macro_library.json"
         
         # Yükleme
         self.load_macros()
         self.load_macro_library()
         
+        # Template bekleme: kare akışında ROI + değişmeyen kareleri atlama
+        self.template_waiter = TemplateWaiter(frame_bus, self.find_template)
+        
         # Custom functions
         self.custom_functions = {}
         self.register_builtin_functions()
+        
+        # Derleyici: makrolar düz komut listesine bir kez çevrilir
+        self._action_handlers = self._build_action_handlers()
+        self.compiler = MacroCompiler(
+            self._action_handlers.keys(),
+            [condition_type.value for condition_type in ConditionType],
+            action_factory=MacroAction.from_dict,
+            resolve_template=self._resolve_template_path
+        )
+        self._compiled_macros = {}
     
     def register_builtin_functions(self):
         """Yerleşik fonksiyonları kaydet"""
@@ -200,26 +244,35 @@ class MacroEngine:
                 return 0
         
         @self.register_function("wait_for_template")
-        def wait_for_template(template_name: str, timeout: int = 30):
+        def wait_for_template(template_name: str, timeout: int = 30, threshold: float = 0.8,
+                              poll_interval: float = DEFAULT_POLL_INTERVAL, region=None, cancel_event=None):
             """Template görünene kadar bekle"""
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                screenshot = pyautogui.screenshot()
-                screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-                
-                if self.find_template(screenshot, template_name):
-                    return True
-                
-                time.sleep(1)
-            
-            return False
+            return bool(self.template_waiter.wait(
+                template_name, timeout, threshold=threshold, region=region or self.capture_region,
+                poll_interval=poll_interval, cancel_event=cancel_event
+            ))
+        
+        @self.register_function("wait_for_templates")
+        def wait_for_templates(templates: List[str], mode: str = WAIT_ANY, timeout: int = 30,
+                               threshold: float = 0.8, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                               region=None, cancel_event=None):
+            """Template'lerden biri (mode="any") veya hepsi (mode="all") görünene kadar bekle
+            
+            Görünen ilk template'in adını, zaman aşımında None döndürür.
+            """
+            result = self.template_waiter.wait(
+                templates, timeout, mode, threshold=threshold, region=region or self.capture_region,
+                poll_interval=poll_interval, cancel_event=cancel_event
+            )
+            return result.first if result else None
         
         @self.register_function("get_pixel_color")
         def get_pixel_color(x: int, y: int):
             """Piksel rengini al"""
             try:
-                screenshot = pyautogui.screenshot()
-                return screenshot.getpixel((x, y))
+                screenshot = frame_bus.get_image()
+                blue, green, red = screenshot[y, x]
+                return (int(red), int(green), int(blue))
             except Exception as e:
                 print(f"Piksel rengi alma hatası: {e}")
                 return (0, 0, 0)
@@ -248,14 +301,15 @@ class MacroEngine:
         )
         
         self.macros[macro_id] = macro
-        self.save_macros()
+        self._mark_dirty(macro_id)
         
         return macro
     
     def add_action(self, macro_id: str, action_type: ActionType, 
                    parameters: Dict[str, Any], description: str = "") -> MacroAction:
         """Makroya aksiyon ekle"""
-        if macro_id not in self.macros:
+        macro = self.macros.get(macro_id)
+        if macro is None:
             raise ValueError(f"Makro bulunamadı: {macro_id}")
         
         action_id = str(uuid.uuid4())
@@ -266,183 +320,171 @@ class MacroEngine:
             description=description
         )
         
-        self.macros[macro_id].actions.append(action)
-        self.macros[macro_id].modified_at = datetime.now()
-        self.save_macros()
+        macro.actions.append(action)
+        macro.modified_at = datetime.now()
+        self._mark_dirty(macro_id)
         
         return action
     
-    def execute_macro(self, macro_id: str, variables: Dict[str, Any] = None) -> bool:
-        """Makroyu çalıştır"""
-        if macro_id not in self.macros:
+    def bind_emulator(self, emulator: str, region: tuple):
+        """Emülatör penceresinin yakalama bölgesini kaydet (left, top, width, height)"""
+        self.emulator_regions[emulator] = tuple(int(value) for value in region)
+    
+    def execute_macro(self, macro_id: str, variables: Dict[str, Any] = None,
+                      region: Optional[tuple] = None, emulator: Optional[str] = None) -> Optional[str]:
+        """Makroyu arkaplanda çalıştır, run ID döndür
+        
+        emulator verilirse bind_emulator ile kaydedilmiş pencere bölgesi kullanılır.
+        Aynı bölgeye bağlı çalıştırmalar (emülatör adıyla veya bölgesiyle başlatılmış
+        olsun) sırayla, farklı bölgeler paralel çalışır.
+        """
+        macro = self.macros.get(macro_id)
+        if macro is None:
             raise ValueError(f"Makro bulunamadı: {macro_id}")
         
-        macro = self.macros[macro_id]
         if not macro.enabled:
             print(f"Makro devre dışı: {macro.name}")
-            return False
+            return None
         
-        # Execution context oluştur
-        context = MacroExecutionContext()
-        context.variables = {**(variables or {}), **macro.variables}
-        context.start_time = time.time()
+        if emulator is not None:
+            if emulator not in self.emulator_regions:
+                raise ValueError(f"Emülatör bölgesi tanımlı değil: {emulator}")
+            region = self.emulator_regions[emulator]
+        region = tuple(int(value) for value in region) if region else self.capture_region
+        # Emülatör adı ve aynı pencerenin bölgesi aynı sıraya düşsün diye bağlama bölgeden türetilir
+        binding = tuple(region) if region else DEFAULT_BINDING
         
-        self.execution_contexts[macro_id] = context
+        try:
+            compiled = self.compile_macro(macro_id)
+        except MacroCompileError as e:
+            print(f"❌ Makro derleme hatası ({macro.name}): {e}")
+            return None
         
-        print(f"🔄 Makro başlatılıyor: {macro.name}")
+        # Execution context oluştur
+        context = MacroExecutionContext(region)
+        context.variables = {**(variables or {}), **macro.variables}
         
-        try:
-            # Thread'de çalıştır
-            def run_macro():
-                self.running_macros[macro_id] = True
-                success = self._execute_actions(macro.actions, context)
-                self.running_macros[macro_id] = False
-                
-                execution_time = time.time() - context.start_time
-                print(f"✅ Makro tamamlandı: {macro.name} ({execution_time:.1f}s)")
-                print(f"📊 Başarılı: {context.success_count}, Hatalı: {context.error_count}")
-                
-                return success
+        def run_macro(run: MacroRun) -> bool:
+            context.cancel_event = run.cancel_event
+            context.start_time = time.time()
+            print(f"🔄 Makro başlatılıyor: {macro.name} ({run.run_id[:8]})")
             
-            # Arkaplan thread'i başlat
-            thread = threading.Thread(target=run_macro, daemon=True)
-            thread.start()
+            success = self._run_compiled(compiled, context, lambda: not run.cancel_event.is_set())
             
-            return True
+            execution_time = time.time() - context.start_time
+            if run.cancel_event.is_set():
+                print(f"🛑 Makro durduruldu: {macro.name} ({execution_time:.1f}s)")
+            else:
+                print(f"✅ Makro tamamlandı: {macro.name} ({execution_time:.1f}s)")
+            print(f"📊 Başarılı: {context.success_count}, Hatalı: {context.error_count}")
             
+            return success
+        
+        try:
+            run = self.runner.submit(macro_id, run_macro, name=macro.name,
+                                     binding=binding, region=region, context=context)
         except Exception as e:
             print(f"Makro çalıştırma hatası: {e}")
-            self.running_macros[macro_id] = False
-            return False
+            return None
+        
+        self.execution_contexts[macro_id] = context
+        return run.run_id
     
-    def _execute_actions(self, actions: List[MacroAction], context: MacroExecutionContext) -> bool:
-        """Aksiyonları çalıştır"""
-        for action in actions:
-            if not action.enabled:
-                continue
-            
-            context.current_action = action
-            
-            try:
-                print(f"🎯 Aksiyon: {action.description or action.action_type.value}")
-                
-                success = self._execute_single_action(action, context)
-                
-                if success:
-                    context.success_count += 1
-                    context.execution_log.append({
-                        "action_id": action.id,
-                        "status": "success",
-                        "timestamp": datetime.now().isoformat()
-                    })
-                else:
-                    context.error_count += 1
-                    
-                    # Retry logic
-                    if action.retry_count < action.max_retries:
-                        action.retry_count += 1
-                        print(f"🔄 Retry {action.retry_count}/{action.max_retries}")
-                        success = self._execute_single_action(action, context)
-                    
-                    if not success:
-                        context.execution_log.append({
-                            "action_id": action.id,
-                            "status": "failed",
-                            "timestamp": datetime.now().isoformat()
-                        })
-                        
-                        # Critical error durumunda dur
-                        if action.parameters.get("critical", False):
-                            print(f"❌ Critical aksiyon başarısız: {action.description}")
-                            return False
-                
-            except Exception as e:
-                print(f"❌ Aksiyon hatası: {e}")
-                context.error_count += 1
-                
-                if action.parameters.get("critical", False):
-                    return False
+    def compile_macro(self, macro_id: str) -> CompiledMacro:
+        """Makroyu derle (aksiyonların içeriği değişmediği sürece önbellekten döner)"""
+        macro = self.macros[macro_id]
+        # Yerinde parametre düzenleme, sıralama ve değiştirme de anahtarı değiştirir
+        key = (macro.name, hash(json.dumps([action.to_dict() for action in macro.actions],
+                                           sort_keys=True, default=str)))
         
-        return True
+        cached = self._compiled_macros.get(macro_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        compiled = self.compiler.compile(macro.actions, macro.name)
+        self._compiled_macros[macro_id] = (key, compiled)
+        return compiled
+    
+    def invalidate_compiled(self, macro_id: Optional[str] = None):
+        """Derlenmiş makro önbelleğini temizle"""
+        if macro_id is None:
+            self._compiled_macros.clear()
+        else:
+            self._compiled_macros.pop(macro_id, None)
+    
+    def _execute_actions(self, actions: List[MacroAction], context: MacroExecutionContext) -> bool:
+        """Aksiyonları derleyip çalıştır"""
+        try:
+            compiled = self.compiler.compile(actions)
+        except MacroCompileError as e:
+            print(f"❌ Makro derleme hatası: {e}")
+            return False
+        return self._run_compiled(compiled, context)
+    
+    def _run_compiled(self, compiled: CompiledMacro, context: MacroExecutionContext,
+                      should_continue: Optional[Callable[[], bool]] = None) -> bool:
+        """Derlenmiş makroyu çalıştır"""
+        try:
+            return compiled.run(context, self._run_action, self._check_condition,
+                                self._announce_action, should_continue,
+                                on_loop_test=lambda ctx: ctx.frame_scope.release())
+        except Exception as e:
+            print(f"❌ Aksiyon hatası: {e}")
+            context.error_count += 1
+            return False
+    
+    def _build_action_handlers(self) -> Dict[str, Callable[[Dict, MacroExecutionContext], bool]]:
+        """Aksiyon tipi -> işleyici tablosu (loop/condition derleyicide çözülür)"""
+        return {
+            ActionType.CLICK.value: lambda params, context: self._execute_click(params),
+            ActionType.TYPE.value: lambda params, context: self._execute_type(params),
+            ActionType.WAIT.value: self._execute_wait,
+            ActionType.SCREENSHOT.value: self._execute_screenshot,
+            ActionType.TEMPLATE_FIND.value: self._execute_template_find,
+            ActionType.TEMPLATE_CLICK.value: self._execute_template_click,
+            ActionType.VARIABLE.value: self._execute_variable,
+            ActionType.FUNCTION.value: self._execute_function,
+            ActionType.RANDOM_DELAY.value: self._execute_random_delay,
+            ActionType.MOUSE_MOVE.value: lambda params, context: self._execute_mouse_move(params),
+            ActionType.KEY_PRESS.value: lambda params, context: self._execute_key_press(params),
+            ActionType.SCROLL.value: lambda params, context: self._execute_scroll(params),
+        }
     
-    def _execute_single_action(self, action: MacroAction, context: MacroExecutionContext) -> bool:
+    def _run_action(self, action_type: str, params: Dict, context: MacroExecutionContext) -> bool:
         """Tek aksiyonu çalıştır"""
+        success = False
         try:
-            action_type = action.action_type
-            params = action.parameters
-            
-            # Variable substitution
-            params = self._substitute_variables(params, context.variables)
-            
-            if action_type == ActionType.CLICK:
-                return self._execute_click(params)
-            
-            elif action_type == ActionType.TYPE:
-                return self._execute_type(params)
-            
-            elif action_type == ActionType.WAIT:
-                return self._execute_wait(params)
-            
-            elif action_type == ActionType.SCREENSHOT:
-                return self._execute_screenshot(params, context)
-            
-            elif action_type == ActionType.TEMPLATE_FIND:
-                return self._execute_template_find(params, context)
-            
-            elif action_type == ActionType.TEMPLATE_CLICK:
-                return self._execute_template_click(params)
-            
-            elif action_type == ActionType.LOOP:
-                return self._execute_loop(params, context)
-            
-            elif action_type == ActionType.CONDITION:
-                return self._execute_condition(params, context)
-            
-            elif action_type == ActionType.VARIABLE:
-                return self._execute_variable(params, context)
-            
-            elif action_type == ActionType.FUNCTION:
-                return self._execute_function(params, context)
-            
-            elif action_type == ActionType.RANDOM_DELAY:
-                return self._execute_random_delay(params)
-            
-            elif action_type == ActionType.MOUSE_MOVE:
-                return self._execute_mouse_move(params)
-            
-            elif action_type == ActionType.KEY_PRESS:
-                return self._execute_key_press(params)
-            
-            elif action_type == ActionType.SCROLL:
-                return self._execute_scroll(params)
-            
-            else:
-                print(f"Bilinmeyen aksiyon tipi: {action_type}")
-                return False
-                
+            success = self._action_handlers[action_type](params, context)
+            return success
         except Exception as e:
             print(f"Aksiyon çalıştırma hatası: {e}")
             return False
+        finally:
+            # Bekleme/fonksiyon gibi adımlardan sonra ekran değişmiş olabilir; başarısız
+            # arama/tıklamanın tekrarı da önbellekteki "bulunamadı" sonucunu almamalı
+            if action_type not in FRAME_SCOPED_ACTIONS or not success:
+                context.frame_scope.release()
     
-    def _substitute_variables(self, params: Any, variables: Dict[str, Any]) -> Any:
-        """Değişkenleri değiştir"""
-        if isinstance(params, str):
-            # {variable_name} formatındaki değişkenleri değiştir
-            for var_name, var_value in variables.items():
-                params = params.replace(f"{{{var_name}}}", str(var_value))
-            return params
-        
-        elif isinstance(params, dict):
-            result = {}
-            for key, value in params.items():
-                result[key] = self._substitute_variables(value, variables)
-            return result
-        
-        elif isinstance(params, list):
-            return [self._substitute_variables(item, variables) for item in params]
+    def _announce_action(self, action: MacroAction):
+        print(f"🎯 Aksiyon: {action.description or action.action_type.value}")
+    
+    def _find_in_frame(self, context: MacroExecutionContext, template_name, threshold=0.8):
+        """Makronun güncel karesinde template ara (aynı karede sonuç tekrar kullanılır)"""
+        return context.frame_scope.match(
+            ("template", template_name, threshold),
+            lambda frame: self.find_template(frame, template_name, threshold)
+        )
+    
+    def _resolve_template_path(self, template_name: str) -> Optional[str]:
+        """Template ismini dosya yoluna çöz ve önbelleğe yükle"""
+        template_path = template_name
+        if not os.path.exists(template_path):
+            template_path = os.path.join("templates", template_name)
+            if not os.path.exists(template_path):
+                return None
         
-        else:
-            return params
+        template_store.get(template_path)
+        return template_path
     
     def _execute_click(self, params: Dict) -> bool:
         """Click aksiyonu"""
@@ -452,7 +494,9 @@ class MacroEngine:
             button = params.get("button", "left")
             clicks = params.get("clicks", 1)
             
-            pyautogui.click(x, y, clicks=clicks, button=button)
+            with input_lock:
+                pyautogui.click(x, y, clicks=clicks, button=button)
+                frame_bus.invalidate()
             
             # Random delay
             delay = params.get("delay", random.uniform(0.1, 0.3))
@@ -470,31 +514,42 @@ class MacroEngine:
             text = params.get("text", "")
             interval = params.get("interval", 0.05)
             
-            pyautogui.type(text, interval=interval)
+            with input_lock:
+                pyautogui.type(text, interval=interval)
+                frame_bus.invalidate()
             return True
             
         except Exception as e:
             print(f"Type hatası: {e}")
             return False
     
-    def _execute_wait(self, params: Dict) -> bool:
+    def _execute_wait(self, params: Dict, context: Optional[MacroExecutionContext] = None) -> bool:
         """Wait aksiyonu"""
         try:
             duration = params.get("duration", 1.0)
-            time.sleep(duration)
+            self._sleep(duration, context)
             return True
             
         except Exception as e:
             print(f"Wait hatası: {e}")
             return False
     
+    @staticmethod
+    def _sleep(duration: float, context: Optional[MacroExecutionContext] = None):
+        """Bekle (makro iptal edilirse hemen dön)"""
+        if context is None:
+            time.sleep(duration)
+        else:
+            context.cancel_event.wait(duration)
+    
     def _execute_screenshot(self, params: Dict, context: MacroExecutionContext) -> bool:
         """Screenshot aksiyonu"""
         try:
             filename = params.get("filename", f"screenshot_{int(time.time())}.png")
             
-            screenshot = pyautogui.screenshot()
-            screenshot.save(filename)
+            screenshot = frame_bus.get_image(max_age=0)
+            if screenshot is None or not cv2.imwrite(filename, screenshot):
+                return False
             
             # Context'e ekle
             context.screenshots.append({
@@ -515,10 +570,9 @@ class MacroEngine:
             threshold = params.get("threshold", 0.8)
             save_result = params.get("save_result", True)
             
-            screenshot = pyautogui.screenshot()
-            screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-            
-            matches = self.find_template(screenshot, template_name, threshold)
+            matches = self._find_in_frame(context, template_name, threshold)
+            if matches is None:
+                return False
             
             if save_result:
                 var_name = params.get("variable_name", "template_found")
@@ -533,16 +587,19 @@ class MacroEngine:
             print(f"Template find hatası: {e}")
             return False
     
-    def _execute_template_click(self, params: Dict) -> bool:
+    def _execute_template_click(self, params: Dict, context: Optional[MacroExecutionContext] = None) -> bool:
         """Template click aksiyonu"""
         try:
             template_name = params.get("template")
             threshold = params.get("threshold", 0.8)
             
-            screenshot = pyautogui.screenshot()
-            screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-            
-            matches = self.find_template(screenshot, template_name, threshold)
+            if context is not None:
+                matches = self._find_in_frame(context, template_name, threshold)
+            else:
+                screenshot = frame_bus.get_frame(self.capture_region)
+                matches = self.find_template(screenshot, template_name, threshold) if screenshot is not None else None
+            if matches is None:
+                return False
             
             if matches:
                 x, y, w, h = matches[0]
@@ -553,7 +610,9 @@ class MacroEngine:
                 offset_x = random.randint(-3, 3)
                 offset_y = random.randint(-3, 3)
                 
-                pyautogui.click(center_x + offset_x, center_y + offset_y)
+                with input_lock:
+                    pyautogui.click(center_x + offset_x, center_y + offset_y)
+                    frame_bus.invalidate()
                 
                 delay = params.get("delay", random.uniform(0.1, 0.3))
                 time.sleep(delay)
@@ -566,97 +625,6 @@ class MacroEngine:
             print(f"Template click hatası: {e}")
             return False
     
-    def _execute_loop(self, params: Dict, context: MacroExecutionContext) -> bool:
-        """Loop aksiyonu"""
-        try:
-            loop_type = params.get("type", "count")
-            
-            if loop_type == "count":
-                count = params.get("count", 1)
-                actions = params.get("actions", [])
-                
-                for i in range(count):
-                    context.variables["loop_index"] = i
-                    context.loop_stack.append({"type": "count", "index": i, "count": count})
-                    
-                    # Actions'ları MacroAction objelerine çevir
-                    loop_actions = []
-                    for action_data in actions:
-                        if isinstance(action_data, dict):
-                            loop_actions.append(MacroAction.from_dict(action_data))
-                        else:
-                            loop_actions.append(action_data)
-                    
-                    success = self._execute_actions(loop_actions, context)
-                    context.loop_stack.pop()
-                    
-                    if not success and params.get("break_on_error", False):
-                        return False
-                
-                return True
-            
-            elif loop_type == "while":
-                condition = params.get("condition", {})
-                actions = params.get("actions", [])
-                max_iterations = params.get("max_iterations", 100)
-                
-                iteration = 0
-                while iteration < max_iterations:
-                    # Koşulu kontrol et
-                    if not self._check_condition(condition, context):
-                        break
-                    
-                    context.variables["loop_index"] = iteration
-                    context.loop_stack.append({"type": "while", "index": iteration})
-                    
-                    # Actions'ları çalıştır
-                    loop_actions = []
-                    for action_data in actions:
-                        if isinstance(action_data, dict):
-                            loop_actions.append(MacroAction.from_dict(action_data))
-                        else:
-                            loop_actions.append(action_data)
-                    
-                    success = self._execute_actions(loop_actions, context)
-                    context.loop_stack.pop()
-                    
-                    if not success and params.get("break_on_error", False):
-                        return False
-                    
-                    iteration += 1
-                
-                return True
-            
-        except Exception as e:
-            print(f"Loop hatası: {e}")
-            return False
-    
-    def _execute_condition(self, params: Dict, context: MacroExecutionContext) -> bool:
-        """Condition aksiyonu"""
-        try:
-            condition = params.get("condition", {})
-            true_actions = params.get("true_actions", [])
-            false_actions = params.get("false_actions", [])
-            
-            if self._check_condition(condition, context):
-                actions_to_run = true_actions
-            else:
-                actions_to_run = false_actions
-            
-            # Actions'ları çalıştır
-            condition_actions = []
-            for action_data in actions_to_run:
-                if isinstance(action_data, dict):
-                    condition_actions.append(MacroAction.from_dict(action_data))
-                else:
-                    condition_actions.append(action_data)
-            
-            return self._execute_actions(condition_actions, context)
-            
-        except Exception as e:
-            print(f"Condition hatası: {e}")
-            return False
-    
     def _check_condition(self, condition: Dict, context: MacroExecutionContext) -> bool:
         """Koşulu kontrol et"""
         try:
@@ -666,20 +634,18 @@ class MacroEngine:
                 template_name = condition.get("template")
                 threshold = condition.get("threshold", 0.8)
                 
-                screenshot = pyautogui.screenshot()
-                screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-                
-                matches = self.find_template(screenshot, template_name, threshold)
+                matches = self._find_in_frame(context, template_name, threshold)
+                if matches is None:
+                    return False
                 return len(matches) > 0
             
             elif condition_type == ConditionType.TEMPLATE_NOT_EXISTS:
                 template_name = condition.get("template")
                 threshold = condition.get("threshold", 0.8)
                 
-                screenshot = pyautogui.screenshot()
-                screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-                
-                matches = self.find_template(screenshot, template_name, threshold)
+                matches = self._find_in_frame(context, template_name, threshold)
+                if matches is None:
+                    return False
                 return len(matches) == 0
             
             elif condition_type == ConditionType.VARIABLE_EQUALS:
@@ -759,7 +725,7 @@ class MacroEngine:
                 
                 # Parametreleri hazırla
                 if isinstance(function_params, dict):
-                    result = func(**function_params)
+                    result = func(**{**self._context_arguments(func, context), **function_params})
                 else:
                     result = func(*function_params)
                 
@@ -775,14 +741,25 @@ class MacroEngine:
             print(f"Function hatası: {e}")
             return False
     
-    def _execute_random_delay(self, params: Dict) -> bool:
+    @staticmethod
+    def _context_arguments(func: Callable, context: MacroExecutionContext) -> Dict[str, Any]:
+        """Fonksiyon kabul ediyorsa çalıştırmanın iptal bayrağını ve bölgesini ver"""
+        try:
+            accepted = inspect.signature(func).parameters
+        except (TypeError, ValueError):
+            return {}
+        
+        provided = {"cancel_event": context.cancel_event, "region": context.frame_scope.region}
+        return {name: value for name, value in provided.items() if name in accepted}
+    
+    def _execute_random_delay(self, params: Dict, context: Optional[MacroExecutionContext] = None) -> bool:
         """Random delay aksiyonu"""
         try:
             min_delay = params.get("min", 0.1)
             max_delay = params.get("max", 1.0)
             
             delay = random.uniform(min_delay, max_delay)
-            time.sleep(delay)
+            self._sleep(delay, context)
             
             return True
             
@@ -797,7 +774,8 @@ class MacroEngine:
             y = params.get("y", 0)
             duration = params.get("duration", 0.5)
             
-            pyautogui.moveTo(x, y, duration=duration)
+            with input_lock:
+                pyautogui.moveTo(x, y, duration=duration)
             return True
             
         except Exception as e:
@@ -810,10 +788,12 @@ class MacroEngine:
             key = params.get("key")
             modifier = params.get("modifier")  # ctrl, alt, shift
             
-            if modifier:
-                pyautogui.hotkey(modifier, key)
-            else:
-                pyautogui.press(key)
+            with input_lock:
+                if modifier:
+                    pyautogui.hotkey(modifier, key)
+                else:
+                    pyautogui.press(key)
+                frame_bus.invalidate()
             
             return True
             
@@ -831,10 +811,12 @@ class MacroEngine:
             
             scroll_amount = clicks if direction == "up" else -clicks
             
-            if x and y:
-                pyautogui.scroll(scroll_amount, x=x, y=y)
-            else:
-                pyautogui.scroll(scroll_amount)
+            with input_lock:
+                if x and y:
+                    pyautogui.scroll(scroll_amount, x=x, y=y)
+                else:
+                    pyautogui.scroll(scroll_amount)
+                frame_bus.invalidate()
             
             return True
             
@@ -842,85 +824,135 @@ class MacroEngine:
             print(f"Scroll hatası: {e}")
             return False
     
-    def find_template(self, screenshot, template_name, threshold=0.8):
-        """Template matching"""
+    def find_template(self, screenshot, template_name, threshold=0.8, max_results=MAX_TEMPLATE_MATCHES):
+        """Template matching
+        
+        screenshot bir Frame ise eşleşmeler mutlak ekran koordinatında döner.
+        Sonuç NMS uygulanmış, skora göre sıralı ve max_results ile sınırlı bir
+        MatchResult'tır; matches[0] en iyi eşleşmenin (x, y, w, h) değeridir.
+        """
         try:
+            origin_x, origin_y = 0, 0
+            if isinstance(screenshot, Frame):
+                origin_x, origin_y = screenshot.origin
+                screenshot = screenshot.image
+            
             if isinstance(template_name, str):
                 template_path = template_name
                 if not os.path.exists(template_path):
                     # Relative path dene
                     template_path = os.path.join("templates", template_name)
                     if not os.path.exists(template_path):
-                        return []
+                        return MatchResult()
                 
-                template = cv2.imread(template_path)
+                template = template_store.get(template_path)
+                if template is None:
+                    return MatchResult()
             else:
                 template = template_name
             
             result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            locations = np.where(result >= threshold)
-            
-            if len(locations[0]) > 0:
-                matches = []
-                for pt in zip(*locations[::-1]):
-                    matches.append((pt[0], pt[1], template.shape[1], template.shape[0]))
-                return matches
+            return MatchResult.from_result(result, (template.shape[1], template.shape[0]), threshold,
+                                           (origin_x, origin_y), max_results)
             
         except Exception as e:
             print(f"Template matching hatası: {e}")
         
-        return []
+        return MatchResult()
     
-    def stop_macro(self, macro_id: str):
-        """Makroyu durdur"""
-        self.running_macros[macro_id] = False
+    def stop_macro(self, macro_id: str) -> int:
+        """Makronun tüm çalıştırmalarını durdur (bir sonraki aksiyondan önce durur)"""
+        cancelled = self.runner.cancel_macro(macro_id)
         print(f"🛑 Makro durduruldu: {macro_id}")
+        return cancelled
+    
+    def stop_run(self, run_id: str) -> bool:
+        """Tek bir çalıştırmayı durdur"""
+        return self.runner.cancel(run_id)
+    
+    def wait_for_run(self, run_id: str, timeout: Optional[float] = None) -> Optional[bool]:
+        """Çalıştırmanın bitmesini bekle, sonucunu döndür"""
+        return self.runner.wait(run_id, timeout)
+    
+    def _context_status(self, context: MacroExecutionContext) -> Dict:
+        return {
+            "start_time": context.start_time,
+            "current_action": context.current_action.description if context.current_action else None,
+            "success_count": context.success_count,
+            "error_count": context.error_count,
+            "variables": context.variables
+        }
+    
+    def get_run_status(self, run_id: str) -> Optional[Dict]:
+        """Çalıştırma durumunu al"""
+        run = self.runner.get_run(run_id)
+        if run is None:
+            return None
+        
+        status = run.to_dict()
+        status["context"] = self._context_status(run.context) if run.context is not None else None
+        return status
     
     def get_macro_status(self, macro_id: str) -> Dict:
         """Makro durumunu al"""
+        active_runs = self.runner.active_runs(macro_id)
         status = {
-            "running": self.running_macros.get(macro_id, False),
+            "running": bool(active_runs),
+            "runs": [run.run_id for run in active_runs],
             "context": None
         }
         
         if macro_id in self.execution_contexts:
-            context = self.execution_contexts[macro_id]
-            status["context"] = {
-                "start_time": context.start_time,
-                "current_action": context.current_action.description if context.current_action else None,
-                "success_count": context.success_count,
-                "error_count": context.error_count,
-                "variables": context.variables
-            }
+            status["context"] = self._context_status(self.execution_contexts[macro_id])
         
         return status
     
+    def _mark_dirty(self, macro_id: str):
+        """Değişen makroyu gecikmeli kayda ekle (art arda düzenlemeler tek yazmada toplanır)"""
+        self.macro_store.mark_dirty(macro_id, self.macros[macro_id].to_dict)
+    
     def save_macros(self):
-        """Makroları kaydet"""
+        """Yüklenmiş makroları ve bekleyen değişiklikleri hemen kaydet"""
         try:
-            data = {}
-            for macro_id, macro in self.macros.items():
-                data[macro_id] = macro.to_dict()
-            
-            with open(self.macros_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            for macro_id, macro in self.macros.loaded().items():
+                self.macro_store.mark_dirty(macro_id, macro.to_dict)
+            self.macro_store.flush()
                 
         except Exception as e:
             print(f"Makro kaydetme hatası: {e}")
     
     def load_macros(self):
-        """Makroları yükle"""
+        """Makro dizinini yükle (gövdeler ilk erişimde okunur)"""
         try:
-            if os.path.exists(self.macros_file):
-                with open(self.macros_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                for macro_id, macro_data in data.items():
-                    self.macros[macro_id] = MacroSequence.from_dict(macro_data)
+            self.macro_store = MacroStore(self.macros_dir, legacy_file=self.macros_file)
+            self.macros = LazyMacroDict(self.macro_store, MacroSequence.from_dict)
+            atexit.register(self.macro_store.close)
                     
         except Exception as e:
             print(f"Makro yükleme hatası: {e}")
     
+    def delete_macro(self, macro_id: str) -> bool:
+        """Makroyu sil"""
+        # Gövdesi okunamadığı için listeden çıkarılmış makro da depodan silinebilir
+        if macro_id not in self.macros and macro_id not in self.macro_store.index:
+            return False
+        
+        self.runner.cancel_macro(macro_id)
+        self.macros.pop(macro_id, None)
+        self.invalidate_compiled(macro_id)
+        self.macro_store.delete(macro_id)
+        return True
+    
+    def list_macros(self) -> List[Dict[str, Any]]:
+        """Makro özetleri (gövdeleri yüklemeden)"""
+        summaries = []
+        for macro_id in self.macros:
+            if self.macros.is_loaded(macro_id):
+                summaries.append(macro_summary(self.macros[macro_id].to_dict()))
+            elif macro_id in self.macro_store.index:
+                summaries.append(self.macro_store.index[macro_id])
+        return summaries
+    
     def load_macro_library(self):
         """Makro kütüphanesini yükle"""
         try:
@@ -933,10 +965,11 @@ class MacroEngine:
     def export_macro(self, macro_id: str, filename: str):
         """Makroyu dışa aktar"""
         try:
-            if macro_id not in self.macros:
+            macro = self.macros.get(macro_id)
+            if macro is None:
                 raise ValueError(f"Makro bulunamadı: {macro_id}")
             
-            macro_data = self.macros[macro_id].to_dict()
+            macro_data = macro.to_dict()
             
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(macro_data, f, indent=4, ensure_ascii=False)
@@ -958,7 +991,7 @@ class MacroEngine:
             
             macro = MacroSequence.from_dict(macro_data)
             self.macros[new_macro_id] = macro
-            self.save_macros()
+            self._mark_dirty(new_macro_id)
             
             print(f"✅ Makro içe aktarıldı: {macro.name}")
             return new_macro_id
@@ -22,11 +22,16 @@ from sequences import (
     perform_fetih_sequence, perform_isyanci_sequence
 )
 from version import __version__
+from template_store import template_store
 from update_notes_ui import UpdateNotesUI
-from task_manager import TaskManager, TaskStatus
+from task_manager import TaskManager, TaskStatus, AdvancedTask, POLICY_EDF
+from task_state_store import EDF_STATE_DB, TaskStateStore
 from emulator_manager import EmulatorManager
 from tips_ui import TipsUI
 
+# EDF kipinde config.json'da aralığı olmayan görevlerin aralığı (dakika)
+EDF_DEFAULT_INTERVAL_MINUTES = 1
+
 stats_queue = queue.Queue()
 update_progress_queue = queue.Queue()
 
@@ -152,7 +157,13 @@ class ModernBotUI:
         self.setup_styles()
         self.setup_variables()
         self.emulator_manager = EmulatorManager()
-        self.task_manager = TaskManager(on_stats_update=self.update_stats)
+        # Görevlerin zamanlama durumu ve istatistikleri yeniden başlatmada korunur
+        self.task_state_store = TaskStateStore()
+        self.task_manager = TaskManager(on_stats_update=self.update_stats, state_store=self.task_state_store)
+        # EDF modu ayrı yöneticiyle ve ayrı durum deposuyla çalışır; politika çalışma anında değiştirilmez
+        self.edf_task_state_store = TaskStateStore(EDF_STATE_DB)
+        self.edf_task_manager = TaskManager(on_stats_update=self.update_stats, state_store=self.edf_task_state_store,
+                                            scheduling_policy=POLICY_EDF)
         self.create_main_interface()
         self.setup_logging()
         self.check_license_and_updates()
@@ -743,6 +754,9 @@ class ModernBotUI:
         self.update_status("Bot başlatılıyor...")
         logging.info("Bot başlatıldı")
         
+        # Template'leri arka planda önceden yükle (önbellek varsa PNG çözülmez)
+        threading.Thread(target=template_store.preload, daemon=True).start()
+        
         # Bot thread'i başlat
         self.bot_thread = threading.Thread(target=self.bot_worker, daemon=True)
         self.bot_thread.start()
@@ -762,11 +776,16 @@ class ModernBotUI:
         """Acil durdurma"""
         self.stop_bot()
         self.task_manager.stop()
+        self.edf_task_manager.stop()
         logging.warning("Acil durdurma yapıldı!")
         messagebox.showinfo("Acil Durdurma", "Bot acil olarak durduruldu!")
         
     def bot_worker(self):
         """Bot ana işlem döngüsü"""
+        if load_config().get('scheduling_mode') == POLICY_EDF:
+            self.edf_bot_worker()
+            return
+            
         try:
             while self.is_bot_running:
                 # Aktif görevleri al
@@ -794,6 +813,55 @@ class ModernBotUI:
             logging.error(f"Bot worker hatası: {e}")
             self.root.after(0, self.stop_bot)
             
+    def edf_bot_worker(self):
+        """Son tarihe göre (EDF) bot döngüsü
+        
+        Aktif görevler config.json'daki aralıklarıyla (dakika) zamanlı görev olarak
+        task manager'a eklenir; vakti gelen görevlerden son tarihi en yakın olan
+        önce çalışır. Seçimi kaldırılan görevler duraklatılır, tekrar seçilince
+        kaldığı zamanlamayla devam eder; görevler mod değişimlerinde silinmez.
+        """
+        try:
+            config = load_config()
+            
+            self.edf_task_manager.start()
+            
+            while self.is_bot_running:
+                active_tasks = {name for name, var in self.task_vars.items() if var.get()}
+                
+                for task_name in active_tasks:
+                    task = self.edf_task_manager.tasks.get(task_name)
+                    if task is None:
+                        interval = config.get(f'{task_name}_interval', EDF_DEFAULT_INTERVAL_MINUTES) * 60
+                        self.edf_task_manager.add_task(AdvancedTask(
+                            task_name, self.run_scheduled_task, args=[task_name],
+                            timeout=0, max_retries=0, is_timed=True, interval=interval
+                        ))
+                    elif task.status == TaskStatus.CANCELLED:
+                        self.edf_task_manager.resume_task(task_name)
+                        
+                for task_name, task in list(self.edf_task_manager.tasks.items()):
+                    if task_name not in active_tasks and task.status != TaskStatus.CANCELLED:
+                        self.edf_task_manager.pause_task(task_name)
+                    
+                time.sleep(1)
+                
+        except Exception as e:
+            logging.error(f"EDF bot worker hatası: {e}")
+            self.root.after(0, self.stop_bot)
+        finally:
+            self.edf_task_manager.stop()
+            for task_name, lateness in self.edf_task_manager.get_lateness_report().items():
+                logging.info(f"[EDF] {task_name} gecikme: ortalama {lateness['mean']:.1f}s, "
+                             f"en kötü {lateness['max']:.1f}s ({lateness['count']} çalıştırma)")
+                
+    def run_scheduled_task(self, task_name):
+        """Task manager'ın çalıştırdığı görev"""
+        self.root.after(0, lambda: self.update_status(f"Görev çalıştırılıyor: {task_name}"))
+        success = self.execute_task(task_name)
+        self.update_task_stats(task_name, success)
+        return success
+        
     def execute_task(self, task_name):
         """Görevi çalıştır"""
         try:
@@ -833,26 +901,8 @@ class ModernBotUI:
             return False
             
     def load_image_paths(self):
-        """Image paths'leri yükle"""
-        # Mevcut sistemdeki image path yapısını kullan
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        
-        paths = {}
-        image_folders = [
-            'anaekran', 'anahtar', 'asker', 'askerbas', 'bekcikulesi',
-            'dunyaheal', 'fetih', 'geri', 'heal', 'isyanci', 'ittifak',
-            'kutu', 'mesaj', 'savas', 'suadasi'
-        ]
-        
-        for folder in image_folders:
-            folder_path = os.path.join(base_path, folder)
-            if os.path.exists(folder_path):
-                for file in os.listdir(folder_path):
-                    if file.endswith(('.png', '.jpg', '.jpeg')):
-                        name = os.path.splitext(file)[0]
-                        paths[name] = os.path.join(folder_path, file)
-                        
-        return paths
+        """Image paths'leri yükle (klasörler ortak template deposunda bir kez taranır)"""
+        return template_store.image_paths()
         
     def update_task_stats(self, task_name, success):
         """Görev istatistiklerini güncelle"""
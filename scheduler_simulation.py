@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 King Bot Pro - Zamanlayıcı Simülasyonu
+AdvancedTaskManager'ı gerçek tıklama olmadan sentetik görevlerle sürer ve dispatch
+gecikmesi, görev/sn, sıra derinliği ve thread sayısını raporlar
+
+Kullanım:
+    python scheduler_simulation.py                                # Sanal saat, 1 saatlik oturum
+    python scheduler_simulation.py --tasks 40 --failure-rate 0.2 --dependency-rate 0.3
+    python scheduler_simulation.py --policy edf --seed 7 --horizon 7200
+    python scheduler_simulation.py --realtime --time-scale 0.001  # Gerçek worker havuzu ile
+"""
+
+import argparse
+import heapq
+import itertools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from advanced_task_manager import (AdvancedTask, AdvancedTaskManager, POLICY_PRIORITY,
+                                   RESOURCE_CPU_VISION, RESOURCE_INPUT, SCHEDULING_POLICIES,
+                                   TaskPriority)
+
+
+@dataclass
+class SyntheticTaskSpec:
+    """Sentetik görev tanımı (süreler saniye)"""
+    name: str
+    duration: float
+    failure_rate: float = 0.0
+    interval: float = 0.0
+    dependencies: List[str] = field(default_factory=list)
+    priority: TaskPriority = TaskPriority.NORMAL
+    resources: List[str] = field(default_factory=lambda: [RESOURCE_INPUT])
+
+    @property
+    def is_timed(self) -> bool:
+        return self.interval > 0
+
+
+def make_synthetic_tasks(count: int, seed: int = 0, mean_duration: float = 5.0,
+                         failure_rate: float = 0.1, dependency_rate: float = 0.0,
+                         timed_ratio: float = 0.8, vision_ratio: float = 0.2,
+                         interval_range=(60.0, 1800.0)) -> List[SyntheticTaskSpec]:
+    """Tekrarlanabilir sentetik görev kümesi üret
+
+    Bağımlılıklar sadece önceki görevlere verildiği için grafik döngüsüzdür.
+    """
+    rng = random.Random(seed)
+    specs: List[SyntheticTaskSpec] = []
+
+    for index in range(count):
+        dependencies = []
+        if specs and rng.random() < dependency_rate:
+            dependencies = [rng.choice(specs).name]
+
+        interval = rng.uniform(*interval_range) if rng.random() < timed_ratio else 0.0
+        resources = [RESOURCE_CPU_VISION] if rng.random() < vision_ratio else [RESOURCE_INPUT]
+
+        specs.append(SyntheticTaskSpec(
+            name=f"task_{index:03d}",
+            duration=rng.uniform(0.5, 1.5) * mean_duration,
+            failure_rate=failure_rate,
+            interval=interval,
+            dependencies=dependencies,
+            priority=rng.choice(list(TaskPriority)),
+            resources=resources
+        ))
+
+    return specs
+
+
+class VirtualClock:
+    """Elle ilerletilen sanal saat"""
+
+    def __init__(self, start: float = 1_000_000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance_to(self, timestamp: float):
+        self.now = max(self.now, timestamp)
+
+
+class SimulatedExecutor:
+    """Gönderilen işleri hemen çalıştırmayan executor
+
+    Simülasyon, işin sanal süresi dolunca callable'ı kendisi çalıştırır.
+    """
+
+    def __init__(self):
+        self.submitted: List[tuple] = []
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        self.submitted.append((future, fn, args, kwargs))
+        return future
+
+    def take_submitted(self) -> List[tuple]:
+        submitted, self.submitted = self.submitted, []
+        return submitted
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        pass
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/max özeti"""
+    if not values:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    array = np.asarray(values, dtype=np.float64)
+    return {
+        "p50": float(np.percentile(array, 50)),
+        "p90": float(np.percentile(array, 90)),
+        "p99": float(np.percentile(array, 99)),
+        "max": float(array.max())
+    }
+
+
+def _build_tasks(specs: List[SyntheticTaskSpec], make_func: Callable[[SyntheticTaskSpec], Callable]) -> List[AdvancedTask]:
+    return [
+        AdvancedTask(spec.name, make_func(spec), priority=spec.priority, timeout=0,
+                     max_retries=1, retry_delay=spec.duration, retry_jitter=0,
+                     is_timed=spec.is_timed, interval=spec.interval,
+                     dependencies=spec.dependencies, resources=spec.resources)
+        for spec in specs
+    ]
+
+
+def _summarize(manager: AdvancedTaskManager, elapsed: float, dispatch_latencies: List[float],
+               queue_depths: List[int], pass_times: List[float], peak_threads: int) -> Dict[str, Any]:
+    stats = manager.get_global_stats()
+    completed = stats["total_tasks_executed"]
+    lateness = manager.get_lateness_report()
+    worst = sorted(lateness.items(), key=lambda item: item[1]["max"], reverse=True)[:5]
+
+    return {
+        "elapsed": elapsed,
+        "tasks_completed": completed,
+        "tasks_failed": stats["failed_tasks"],
+        "tasks_per_sec": completed / elapsed if elapsed > 0 else 0.0,
+        "dispatch_latency": percentiles(dispatch_latencies),
+        "queue_depth_max": max(queue_depths) if queue_depths else 0,
+        "queue_depth_mean": float(np.mean(queue_depths)) if queue_depths else 0.0,
+        "scheduler_pass_us": {key: value * 1e6 for key, value in percentiles(pass_times).items()},
+        "peak_threads": peak_threads,
+        "queue_metrics": manager.get_queue_metrics(),
+        "worst_lateness": {name: report["max"] for name, report in worst}
+    }
+
+
+def run_simulation(specs: List[SyntheticTaskSpec], horizon: float = 3600.0, seed: int = 0,
+                   policy: str = POLICY_PRIORITY, max_concurrent_tasks: int = 3) -> Dict[str, Any]:
+    """Sanal saatle ayrık olay simülasyonu
+
+    Yönetici worker thread'i olmadan run_pending() ile sürülür; başlatılan her görev
+    sanal süresi dolunca çalıştırılıp tamamlanır. Aynı tohum aynı sonucu verir
+    (scheduler_pass_us gerçek CPU süresidir ve ölçümden ölçüme değişir).
+    """
+    rng = random.Random(seed)
+    clock = VirtualClock()
+    executor = SimulatedExecutor()
+    manager = AdvancedTaskManager(max_concurrent_tasks=max_concurrent_tasks, scheduling_policy=policy,
+                                  stats_update_interval=float("inf"), clock=clock)
+    manager.executor = executor
+
+    spec_by_name = {spec.name: spec for spec in specs}
+    for task in _build_tasks(specs, lambda spec: (lambda: rng.random() >= spec.failure_rate)):
+        manager.add_task(task)
+
+    start_time = clock()
+    end_time = start_time + horizon
+    completions: List[tuple] = []
+    sequence = itertools.count()
+    dispatch_latencies: List[float] = []
+    queue_depths: List[int] = []
+    pass_times: List[float] = []
+
+    while True:
+        pass_start = time.perf_counter()
+        manager.run_pending()
+        pass_times.append(time.perf_counter() - pass_start)
+
+        # Yeni başlatılan görevlerin bitiş olaylarını planla
+        submitted = executor.take_submitted()
+        if submitted:
+            futures = {id(entry[0]): entry for entry in submitted}
+            for task_name, future in list(manager.running_tasks.items()):
+                entry = futures.get(id(future))
+                if entry is None:
+                    continue
+                task = manager.tasks[task_name]
+                dispatch_latencies.append(clock() - task.due_time)
+                heapq.heappush(completions, (clock() + spec_by_name[task_name].duration,
+                                             next(sequence), entry))
+
+        queue_depths.append(manager.get_queue_metrics()["ready_depth"])
+
+        candidates = [completions[0][0]] if completions else []
+        wakeup = manager.next_wakeup_time()
+        if wakeup is not None:
+            candidates.append(wakeup)
+        if not candidates or min(candidates) > end_time:
+            break
+
+        clock.advance_to(min(candidates))
+        while completions and completions[0][0] <= clock():
+            _, _, (future, fn, args, kwargs) = heapq.heappop(completions)
+            fn(*args, **kwargs)
+            future.set_result(None)
+
+    return _summarize(manager, horizon, dispatch_latencies, queue_depths, pass_times,
+                      threading.active_count())
+
+
+def run_realtime(specs: List[SyntheticTaskSpec], horizon: float = 3600.0, time_scale: float = 0.001,
+                 policy: str = POLICY_PRIORITY, max_concurrent_tasks: int = 3,
+                 sample_interval: float = 0.01) -> Dict[str, Any]:
+    """Gerçek worker havuzuyla ölçekli zamanlı çalıştırma (thread sayısı ölçümü için)
+
+    Süreler ve aralıklar time_scale ile küçültülür; sonuçlar gerçek saniyedir.
+    """
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+
+    def make_func(spec: SyntheticTaskSpec) -> Callable:
+        def run():
+            time.sleep(spec.duration * time_scale)
+            with rng_lock:
+                return rng.random() >= spec.failure_rate
+        return run
+
+    scaled = [SyntheticTaskSpec(spec.name, spec.duration * time_scale, spec.failure_rate,
+                                spec.interval * time_scale, spec.dependencies, spec.priority,
+                                spec.resources) for spec in specs]
+
+    dispatch_latencies: List[float] = []
+    manager = AdvancedTaskManager(max_concurrent_tasks=max_concurrent_tasks, scheduling_policy=policy)
+    manager.add_event_listener("task_started", lambda name, task: dispatch_latencies.append(
+        max(0.0, time.time() - task.due_time)))
+    for task in _build_tasks(scaled, make_func):
+        manager.add_task(task)
+
+    queue_depths: List[int] = []
+    peak_threads = threading.active_count()
+    duration = horizon * time_scale
+
+    manager.start()
+    started = time.perf_counter()
+    try:
+        while time.perf_counter() - started < duration:
+            queue_depths.append(manager.get_queue_metrics()["ready_depth"])
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(sample_interval)
+    finally:
+        manager.stop()
+
+    return _summarize(manager, time.perf_counter() - started, dispatch_latencies,
+                      queue_depths, [], peak_threads)
+
+
+def print_report(report: Dict[str, Any]):
+    """Raporu tablo olarak yazdır"""
+    latency = report["dispatch_latency"]
+    overhead = report["scheduler_pass_us"]
+    print(f"Süre: {report['elapsed']:.1f}s | Tamamlanan: {report['tasks_completed']} "
+          f"(başarısız {report['tasks_failed']}) | Görev/sn: {report['tasks_per_sec']:.3f}")
+    print(f"Dispatch gecikmesi (s): p50 {latency['p50']:.2f}  p90 {latency['p90']:.2f}  "
+          f"p99 {latency['p99']:.2f}  max {latency['max']:.2f}")
+    print(f"Sıra derinliği: max {report['queue_depth_max']}  ortalama {report['queue_depth_mean']:.2f}")
+    if overhead["max"]:
+        print(f"Zamanlayıcı adımı (µs): p50 {overhead['p50']:.1f}  p99 {overhead['p99']:.1f}  "
+              f"max {overhead['max']:.1f}")
+    print(f"Thread sayısı (tepe): {report['peak_threads']}")
+    metrics = report["queue_metrics"]
+    print(f"Sıraya alınan: {metrics['enqueued']}  tekrar atlanan: {metrics['duplicates_skipped']}  "
+          f"eski kayıt: {metrics['stale_entries_skipped']}")
+    if report["worst_lateness"]:
+        print("En geç kalan görevler:")
+        for name, lateness in report["worst_lateness"].items():
+            print(f"  {name:<12}{lateness:>10.2f}s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="AdvancedTaskManager zamanlayıcı simülasyonu")
+    parser.add_argument("--tasks", type=int, default=20, help="Sentetik görev sayısı")
+    parser.add_argument("--horizon", type=float, default=3600.0, help="Simüle edilen süre (saniye)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Ortalama görev süresi (saniye)")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="Görev başarısızlık oranı")
+    parser.add_argument("--dependency-rate", type=float, default=0.0, help="Bağımlılığı olan görev oranı")
+    parser.add_argument("--policy", choices=SCHEDULING_POLICIES, default=POLICY_PRIORITY)
+    parser.add_argument("--workers", type=int, default=3, help="max_concurrent_tasks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--realtime", action="store_true", help="Sanal saat yerine gerçek worker havuzu")
+    parser.add_argument("--time-scale", type=float, default=0.001, help="--realtime için süre ölçeği")
+    parser.add_argument("--verbose", action="store_true", help="Görev loglarını göster")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+
+    specs = make_synthetic_tasks(args.tasks, seed=args.seed, mean_duration=args.duration,
+                                 failure_rate=args.failure_rate, dependency_rate=args.dependency_rate)
+
+    print("🧪 King Bot Pro - Zamanlayıcı Simülasyonu")
+    print("=" * 78)
+    print(f"Görev: {args.tasks} | Politika: {args.policy} | Worker: {args.workers} | "
+          f"Kip: {'gerçek zamanlı' if args.realtime else 'sanal saat'}")
+    print("-" * 78)
+
+    if args.realtime:
+        report = run_realtime(specs, args.horizon, args.time_scale, args.policy, args.workers)
+    else:
+        report = run_simulation(specs, args.horizon, args.seed, args.policy, args.workers)
+
+    print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
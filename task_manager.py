@@ -3,11 +3,20 @@ import logging
 import threading
 import json
 import queue
+import heapq
+import inspect
+import itertools
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
 from collections import deque
 from typing import Dict, List, Callable, Optional, Any
 from dataclasses import dataclass, asdict
 from enum import Enum
 import datetime
+import math
+import bisect
+
+from adaptive_backoff import backoff_delay
+from task_state_store import TaskStateStore
 
 class TaskStatus(Enum):
     """Görev durumları"""
@@ -19,6 +28,19 @@ class TaskStatus(Enum):
     CANCELLED = "CANCELLED"
     TIMEOUT = "TIMEOUT"
 
+# Görevlerin talep edebileceği ortak kaynaklar
+RESOURCE_INPUT = "input"            # Fiziksel fare/klavye (safe_click, pyautogui)
+RESOURCE_CAPTURE = "capture"        # Ekran yakalama
+RESOURCE_CPU_VISION = "cpu-vision"  # Sadece CPU ile görüntü analizi
+
+# Kaynak başına aynı anda çalışabilecek görev sayısı (listede olmayan kaynaklar sınırsız)
+DEFAULT_RESOURCE_LIMITS = {RESOURCE_INPUT: 1}
+
+# Hazır sırası politikaları: öncelik sırası veya en erken son tarih (EDF)
+POLICY_PRIORITY = "priority"
+POLICY_EDF = "edf"
+SCHEDULING_POLICIES = (POLICY_PRIORITY, POLICY_EDF)
+
 class TaskPriority(Enum):
     """Görev öncelik seviyeleri"""
     LOW = 1
@@ -42,9 +64,90 @@ class TaskStats:
     successful_executions: int = 0
     failed_executions: int = 0
     average_execution_time: float = 0.0
+    execution_time_stddev: float = 0.0
     last_execution: Optional[datetime.datetime] = None
     success_rate: float = 0.0
 
+class RunningStats:
+    """Welford yöntemiyle artımlı ortalama/varyans (geçmiş tutmadan O(1) güncelleme)"""
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        
+    def add(self, value: float):
+        """Yeni ölçümü ekle"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        
+    @property
+    def variance(self) -> float:
+        """Örneklem varyansı"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+        
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+        
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "stddev": self.stddev,
+                "min": self.min, "max": self.max}
+        
+    def get_state(self) -> Dict[str, Any]:
+        """Kalıcı saklama için iç durum"""
+        return {"count": self.count, "mean": self.mean, "m2": self._m2, "min": self.min, "max": self.max}
+        
+    def restore_state(self, state: Dict[str, Any]):
+        """get_state ile alınan durumu geri yükle"""
+        self.count = state.get("count", 0)
+        self.mean = state.get("mean", 0.0)
+        self._m2 = state.get("m2", 0.0)
+        self.min = state.get("min")
+        self.max = state.get("max")
+
+class LatencyHistogram:
+    """Sabit kovalı süre histogramı (saniye)"""
+    
+    BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0]
+    
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.buckets = list(buckets or self.BUCKETS)
+        self.counts = [0] * (len(self.buckets) + 1)  # Son kova: en büyük sınırın üstü
+        self.total = 0
+        
+    def add(self, value: float):
+        """Ölçümü kovasına ekle"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += 1
+        
+    def percentile(self, q: float) -> Optional[float]:
+        """Yüzdelik değerin üst kova sınırı (yaklaşık, son kova için inf)"""
+        if not self.total:
+            return None
+        target = max(1, math.ceil(self.total * q / 100.0))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+        
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound}" for bound in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99)
+        }
+
 class AdvancedTask:
     """Gelişmiş görev sınıfı"""
     
@@ -52,7 +155,10 @@ class AdvancedTask:
                  priority: TaskPriority = TaskPriority.NORMAL, timeout: float = 30.0,
                  max_retries: int = 3, retry_delay: float = 5.0,
                  is_timed: bool = False, interval: float = 0,
-                 dependencies: List[str] = None, tags: List[str] = None):
+                 dependencies: List[str] = None, tags: List[str] = None,
+                 resources: List[str] = None, retry_backoff: float = 2.0,
+                 max_retry_delay: float = 300.0, retry_jitter: float = 0.2,
+                 deadline: Optional[float] = None):
         
         self.name = name
         self.func = func
@@ -62,6 +168,9 @@ class AdvancedTask:
         self.timeout = timeout
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.retry_backoff = retry_backoff
+        self.max_retry_delay = max_retry_delay
+        self.retry_jitter = retry_jitter
         self.current_retries = 0
         
         # Zamanlama
@@ -70,18 +179,45 @@ class AdvancedTask:
         self.last_execution_time = 0
         self.next_execution_time = 0
         
+        # EDF: sıraya alındıktan sonra başlaması gereken süre (None = interval)
+        self.deadline = deadline
+        self.due_time = 0.0
+        self.lateness = RunningStats()
+        
         # Bağımlılıklar ve etiketler
         self.dependencies = dependencies if dependencies is not None else []
         self.tags = tags if tags is not None else []
         
+        # Kaynak talepleri (varsayılan: fareyi kullanan görev)
+        self.resources = list(resources) if resources is not None else [RESOURCE_INPUT]
+        
         # Durum bilgileri
         self.status = TaskStatus.PENDING
         self.results_history = deque(maxlen=100)  # Son 100 sonucu sakla
         self.stats = TaskStats()
+        self.latency = RunningStats()
+        self.latency_histogram = LatencyHistogram()
+        
+        # Zaman kaynağı (yönetici eklenirken kendi saatini verir)
+        self.clock: Callable[[], float] = time.time
         
         # Threading
+        # Zaman aşımı ve iptal işbirlikçidir: fonksiyon cancel_event parametresi
+        # alıyorsa olay ona verilir ve fonksiyon bunu kontrol ederek erken döner
         self.is_running = False
         self.cancel_event = threading.Event()
+        self._cancel_requested = False
+        self._deadline_expired = False
+        self._accepts_cancel_event = self._accepts_keyword(func, "cancel_event")
+        
+    @staticmethod
+    def _accepts_keyword(func: Callable, name: str) -> bool:
+        """Fonksiyon verilen anahtar kelime parametresini kabul ediyor mu"""
+        try:
+            parameters = inspect.signature(func).parameters.values()
+        except (TypeError, ValueError):
+            return False
+        return any(p.name == name or p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters)
         
     def can_execute(self, current_time: float, completed_tasks: set) -> bool:
         """Görevin çalıştırılıp çalıştırılamayacağını kontrol et"""
@@ -111,7 +247,7 @@ class AdvancedTask:
             
         self.is_running = True
         self.status = TaskStatus.RUNNING
-        start_time = time.time()
+        start_time = self.clock()
         
         try:
             logging.info(f"[TASK] Başlatılıyor: {self.name}")
@@ -119,7 +255,7 @@ class AdvancedTask:
             # Timeout ile çalıştır
             result = self._execute_with_timeout()
             
-            execution_time = time.time() - start_time
+            execution_time = self.clock() - start_time
             
             if result:
                 self.status = TaskStatus.SUCCESS
@@ -149,7 +285,7 @@ class AdvancedTask:
                 logging.warning(f"[TASK] Başarısız: {self.name} - Süre: {execution_time:.2f}s")
                 
         except TimeoutError:
-            execution_time = time.time() - start_time
+            execution_time = self.clock() - start_time
             self.status = TaskStatus.TIMEOUT
             self.stats.failed_executions += 1
             
@@ -163,7 +299,7 @@ class AdvancedTask:
             logging.error(f"[TASK] Timeout: {self.name} - Süre: {execution_time:.2f}s")
             
         except Exception as e:
-            execution_time = time.time() - start_time
+            execution_time = self.clock() - start_time
             self.status = TaskStatus.FAILURE
             self.stats.failed_executions += 1
             
@@ -185,7 +321,13 @@ class AdvancedTask:
             
         finally:
             self.is_running = False
-            self.last_execution_time = time.time()
+            self.last_execution_time = self.clock()
+            
+            # Zaman aşımı sinyali sadece bu çalıştırma içindir
+            if self._deadline_expired:
+                self._deadline_expired = False
+                if not self._cancel_requested:
+                    self.cancel_event.clear()
             
             # Zamanlı görev için bir sonraki çalıştırma zamanını ayarla
             if self.is_timed:
@@ -195,10 +337,11 @@ class AdvancedTask:
             self.stats.total_executions += 1
             self.stats.last_execution = task_result.timestamp
             
-            # Ortalama çalıştırma süresi
-            total_time = (self.stats.average_execution_time * (self.stats.total_executions - 1) + 
-                         task_result.execution_time)
-            self.stats.average_execution_time = total_time / self.stats.total_executions
+            # Çalıştırma süresi (artımlı ortalama/sapma ve histogram)
+            self.latency.add(task_result.execution_time)
+            self.latency_histogram.add(task_result.execution_time)
+            self.stats.average_execution_time = self.latency.mean
+            self.stats.execution_time_stddev = self.latency.stddev
             
             # Başarı oranı
             if self.stats.total_executions > 0:
@@ -210,34 +353,42 @@ class AdvancedTask:
         return task_result
         
     def _execute_with_timeout(self) -> bool:
-        """Timeout ile görev çalıştırma"""
-        result_queue = queue.Queue()
+        """Timeout ile görev çalıştırma
         
-        def worker():
-            try:
-                result = self.func(*self.args, **self.kwargs)
-                result_queue.put(result)
-            except Exception as e:
-                result_queue.put(e)
-                
-        thread = threading.Thread(target=worker, daemon=True)
-        thread.start()
+        Fonksiyon çağıran thread'de çalışır (ek thread açılmaz). Süre aşımında
+        yönetici cancel_event'i işaretler; fonksiyon döndüğünde süre aşılmışsa
+        sonuç TimeoutError olarak raporlanır.
+        """
+        start_time = self.clock()
+        kwargs = self.kwargs
+        if self._accepts_cancel_event and "cancel_event" not in kwargs:
+            kwargs = dict(kwargs, cancel_event=self.cancel_event)
+            
+        result = self.func(*self.args, **kwargs)
         
-        try:
-            result = result_queue.get(timeout=self.timeout)
-            if isinstance(result, Exception):
-                raise result
-            return result
-        except queue.Empty:
+        if self._deadline_expired or (self.timeout and self.clock() - start_time > self.timeout):
             raise TimeoutError(f"Görev {self.timeout} saniye içinde tamamlanamadı")
+        return result
+        
+    def expire(self):
+        """Süresi dolan çalıştırmaya durma sinyali gönder"""
+        self._deadline_expired = True
+        self.cancel_event.set()
+        logging.warning(f"[TASK] Süre doldu, durdurma sinyali gönderildi: {self.name}")
             
     def should_retry(self) -> bool:
         """Retry yapılıp yapılmayacağını kontrol et"""
         return (self.status in [TaskStatus.FAILURE, TaskStatus.TIMEOUT] and 
                 self.current_retries < self.max_retries)
                 
+    def next_retry_delay(self) -> float:
+        """Sıradaki retry'a kadar bekleme (her denemede üstel artar, jitter'lı)"""
+        return backoff_delay(self.retry_delay, self.current_retries, self.retry_backoff,
+                             self.max_retry_delay, self.retry_jitter)
+        
     def cancel(self):
         """Görevi iptal et"""
+        self._cancel_requested = True
         self.cancel_event.set()
         self.status = TaskStatus.CANCELLED
         logging.info(f"[TASK] İptal edildi: {self.name}")
@@ -246,9 +397,44 @@ class AdvancedTask:
         """Görevi sıfırla"""
         self.status = TaskStatus.PENDING
         self.current_retries = 0
+        self._cancel_requested = False
+        self._deadline_expired = False
         self.cancel_event.clear()
         self.is_running = False
         
+    def get_state(self) -> Dict[str, Any]:
+        """Yeniden başlatmada geri yüklenecek zamanlama ve istatistik durumu"""
+        stats = asdict(self.stats)
+        stats["last_execution"] = self.stats.last_execution.isoformat() if self.stats.last_execution else None
+        return {
+            "status": self.status.value,
+            "next_execution_time": self.next_execution_time,
+            "last_execution_time": self.last_execution_time,
+            "current_retries": self.current_retries,
+            "stats": stats,
+            "latency": self.latency.get_state()
+        }
+        
+    def restore_state(self, state: Dict[str, Any]):
+        """Kaydedilmiş durumu geri yükle (çalışma durumu PENDING olarak başlar)"""
+        self.next_execution_time = state.get("next_execution_time", 0) or 0
+        self.last_execution_time = state.get("last_execution_time", 0) or 0
+        self.current_retries = state.get("current_retries", 0) or 0
+        
+        stats = dict(state.get("stats") or {})
+        if stats.get("last_execution"):
+            stats["last_execution"] = datetime.datetime.fromisoformat(stats["last_execution"])
+        self.stats = TaskStats(**{key: value for key, value in stats.items() if key in TaskStats.__dataclass_fields__})
+        self.latency.restore_state(state.get("latency") or {})
+        
+        for item in state.get("history", []):
+            self.results_history.append(TaskResult(
+                status=TaskStatus(item["status"]),
+                message=item["message"],
+                execution_time=item["execution_time"],
+                timestamp=datetime.datetime.fromisoformat(item["timestamp"])
+            ))
+            
     def get_info(self) -> Dict[str, Any]:
         """Görev bilgilerini al"""
         return {
@@ -259,35 +445,90 @@ class AdvancedTask:
             "interval": self.interval,
             "dependencies": self.dependencies,
             "tags": self.tags,
+            "resources": self.resources,
             "stats": asdict(self.stats),
+            "latency_histogram": self.latency_histogram.to_dict(),
+            "lateness": self.lateness.to_dict(),
             "last_result": asdict(self.results_history[-1]) if self.results_history else None
         }
 
 class AdvancedTaskManager:
     """Gelişmiş görev yöneticisi"""
     
-    def __init__(self, on_stats_update: Optional[Callable] = None, max_concurrent_tasks: int = 3):
+    def __init__(self, on_stats_update: Optional[Callable] = None, max_concurrent_tasks: int = 3,
+                 resource_limits: Optional[Dict[str, int]] = None, stats_update_interval: float = 0.5,
+                 state_store: Optional[TaskStateStore] = None, scheduling_policy: str = POLICY_PRIORITY,
+                 clock: Callable[[], float] = time.time):
         self.tasks: Dict[str, AdvancedTask] = {}
         self.task_queue = queue.PriorityQueue()
-        self.running_tasks: Dict[str, threading.Thread] = {}
+        self.running_tasks: Dict[str, Future] = {}
+        self._run_deadlines: Dict[str, float] = {}
         self.completed_tasks = set()
         
         self.is_running = False
         self.worker_thread: Optional[threading.Thread] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
         self.lock = threading.Lock()
         
+        # Olay güdümlü zamanlayıcı: zamanlı görevler (next_execution_time, sıra, isim, nesil)
+        # min-heap'inde tutulur; worker en yakın zamana veya yeni bir olaya kadar uyur
+        self._wakeup = threading.Condition(self.lock)
+        self._timer_heap: List[tuple] = []
+        self._timer_seq = itertools.count()
+        
+        # Sıra üyeliği: her görev hazır sırasında en fazla bir kez bulunur;
+        # heap kayıtları nesil numarasıyla doğrulanır (eski kayıtlar atlanır)
+        self._queued: set = set()
+        self._timer_generation: Dict[str, int] = {}
+        self.queue_metrics = {
+            "enqueued": 0,
+            "duplicates_skipped": 0,
+            "stale_entries_skipped": 0,
+            "max_ready_depth": 0
+        }
+        
         self.max_concurrent_tasks = max_concurrent_tasks
+        
+        # Zaman kaynağı: simülasyonda sanal saat verilir
+        self.clock = clock
+        
+        if scheduling_policy not in SCHEDULING_POLICIES:
+            raise ValueError(f"Bilinmeyen zamanlama politikası: {scheduling_policy}")
+        self.scheduling_policy = scheduling_policy
+        
+        # Kaynak kabulü: "input" gibi kaynaklar sınırlı sayıda göreve verilir,
+        # sadece CPU kullanan görevler kalan worker'ları doldurur
+        self.resource_limits = dict(DEFAULT_RESOURCE_LIMITS if resource_limits is None else resource_limits)
+        self._resources_in_use: Dict[str, int] = {}
+        
+        # Bağımlılık grafiği: bağımlılık -> ona bağlı görevler ve görev -> henüz
+        # tamamlanmamış bağımlılıkları. Bağımlılığı bekleyen görev sırada durmaz,
+        # bağımlılıkları bu döngüde tamamlanınca sıraya alınır.
+        self._dependents: Dict[str, set] = {}
+        self._pending_dependencies: Dict[str, set] = {}
+        
+        # Kalıcı durum: açılışta bir kez yüklenir, görev eklenirken geri verilir
+        self.state_store = state_store
+        self._saved_states: Dict[str, Dict[str, Any]] = state_store.load_all() if state_store else {}
+        
         self.on_stats_update = on_stats_update
         
-        # İstatistikler
+        # İstatistikler: görev bitiminde artımlı güncellenir; UI bildirimi sadece
+        # değişiklik olduğunda ve en fazla stats_update_interval aralıkla yapılır
         self.global_stats = {
             "total_tasks_executed": 0,
             "successful_tasks": 0,
             "failed_tasks": 0,
             "average_task_time": 0.0,
+            "task_time_stddev": 0.0,
             "uptime": 0.0,
             "start_time": None
         }
+        self.latency = RunningStats()
+        self.latency_histogram = LatencyHistogram()
+        self.stats_update_interval = stats_update_interval
+        self._stats_dirty = False
+        self._last_stats_notify = 0.0
         
         # Event callbacks
         self.event_callbacks = {
@@ -307,11 +548,22 @@ class AdvancedTaskManager:
                     logging.warning(f"Görev zaten mevcut: {task.name}")
                     return False
                     
+                if self._creates_cycle(task):
+                    logging.error(f"Görev eklenemedi, döngüsel bağımlılık: {task.name} -> {task.dependencies}")
+                    return False
+                    
+                # Önceki oturumdan kalan zamanlama durumunu geri yükle
+                saved_state = self._saved_states.pop(task.name, None)
+                if saved_state:
+                    task.restore_state(saved_state)
+                    
+                task.clock = self.clock
                 self.tasks[task.name] = task
-                
-                # Önceliğe göre sıraya ekle (negatif çünkü PriorityQueue min-heap)
-                priority = -task.priority.value
-                self.task_queue.put((priority, time.time(), task.name))
+                for dependency in task.dependencies:
+                    self._dependents.setdefault(dependency, set()).add(task.name)
+                    
+                self._arm_task(task.name)
+                self._wakeup.notify()
                 
                 logging.info(f"Görev eklendi: {task.name} (Öncelik: {task.priority.name})")
                 return True
@@ -323,22 +575,41 @@ class AdvancedTaskManager:
     def remove_task(self, task_name: str) -> bool:
         """Görev kaldır"""
         try:
+            with self.lock:
+                if task_name not in self.tasks:
+                    return False
+                self.tasks[task_name].cancel()
+                future = self.running_tasks.get(task_name)
+                
+            # Çalışan görevse bitmesini bekle (runner kilidi alabilsin diye kilit dışında)
+            if future is not None:
+                wait_futures([future], timeout=5.0)
+                
             with self.lock:
                 if task_name in self.tasks:
-                    task = self.tasks[task_name]
-                    task.cancel()
-                    
-                    # Çalışan görevse thread'i bekle
-                    if task_name in self.running_tasks:
-                        thread = self.running_tasks[task_name]
-                        thread.join(timeout=5.0)
-                        del self.running_tasks[task_name]
-                        
-                    del self.tasks[task_name]
+                    if self.running_tasks.pop(task_name, None) is not None:
+                        self._release_resources(self.tasks[task_name])
+                    self._run_deadlines.pop(task_name, None)
+                    task = self.tasks.pop(task_name)
                     self.completed_tasks.discard(task_name)
+                    self._queued.discard(task_name)
+                    self._timer_generation.pop(task_name, None)
+                    self._pending_dependencies.pop(task_name, None)
+                    for dependency in task.dependencies:
+                        dependents = self._dependents.get(dependency)
+                        if dependents:
+                            dependents.discard(task_name)
+                            if not dependents:
+                                del self._dependents[dependency]
+                else:
+                    return False
                     
-                    logging.info(f"Görev kaldırıldı: {task_name}")
-                    return True
+            # Kaldırılan görevin kalıcı kayıtları bir sonraki açılışta geri yüklenmesin
+            if self.state_store is not None:
+                self.state_store.delete(task_name)
+                
+            logging.info(f"Görev kaldırıldı: {task_name}")
+            return True
                     
         except Exception as e:
             logging.error(f"Görev kaldırılamadı: {e}")
@@ -353,7 +624,11 @@ class AdvancedTaskManager:
             
         try:
             self.is_running = True
-            self.global_stats["start_time"] = time.time()
+            self.global_stats["start_time"] = self.clock()
+            
+            # Sabit boyutlu worker havuzu: thread sayısı uzun çalışmalarda sabit kalır
+            self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent_tasks,
+                                               thread_name_prefix="task-worker")
             
             self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
             self.worker_thread.start()
@@ -375,20 +650,37 @@ class AdvancedTaskManager:
         try:
             self.is_running = False
             
-            # Tüm görevleri iptal et
+            # Tüm görevleri iptal et ve uyuyan worker'ı uyandır
             with self.lock:
                 for task in self.tasks.values():
                     task.cancel()
+                self._wakeup.notify_all()
                     
-            # Çalışan thread'leri bekle
-            for thread in list(self.running_tasks.values()):
-                thread.join(timeout=5.0)
+            # Çalışan görevleri bekle
+            with self.lock:
+                futures = list(self.running_tasks.values())
+            if futures:
+                wait_futures(futures, timeout=5.0)
                 
             # Worker thread'i bekle
             if self.worker_thread:
                 self.worker_thread.join(timeout=5.0)
                 
+            if self.executor:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+                
             self.running_tasks.clear()
+            self._run_deadlines.clear()
+            self._resources_in_use.clear()
+            
+            # Ertelenmiş istatistik bildirimini gönder
+            with self.lock:
+                stats_snapshot = self.global_stats.copy() if self._stats_dirty else None
+                self._stats_dirty = False
+            if stats_snapshot is not None:
+                self._notify_stats(stats_snapshot)
+                
             self._trigger_event("manager_stopped")
             
             logging.info("Task manager durduruldu")
@@ -399,74 +691,261 @@ class AdvancedTaskManager:
             return False
             
     def _worker_loop(self):
-        """Ana çalışma döngüsü"""
+        """Ana çalışma döngüsü (olay güdümlü)
+        
+        Worker sabit aralıklarla uyanmaz; en yakın zamanlı görevin vaktine, yeni
+        bir görev eklenmesine veya çalışan bir görevin bitmesine kadar bekler.
+        """
         while self.is_running:
             try:
-                current_time = time.time()
-                
-                # Zamanlı görevleri kontrol et ve sıraya ekle
-                self._schedule_timed_tasks(current_time)
+                queue_empty = False
                 
-                # Yeni görev al
-                if len(self.running_tasks) < self.max_concurrent_tasks:
-                    task_name = self._get_next_task(current_time)
+                with self._wakeup:
+                    current_time = self.clock()
                     
-                    if task_name:
-                        self._execute_task(task_name)
+                    # Süresi dolan çalıştırmalara durma sinyali gönder
+                    self._expire_overdue_tasks(current_time)
+                    
+                    # Vakti gelen zamanlı görevleri sıraya al
+                    self._scheduling_pass(current_time)
+                    
+                    # Kapasite kadar görevi başlat
+                    dispatched = self._dispatch_ready_tasks(current_time)
+                    
+                    # Ertelenmiş istatistik bildirimi
+                    stats_snapshot = self._take_stats_snapshot(current_time)
+                    
+                    if not dispatched and self.is_running and stats_snapshot is None:
+                        queue_empty = self.task_queue.empty() and not self.running_tasks
+                        self._wakeup.wait(self._next_wakeup_delay(current_time))
                         
-                # Tamamlanan thread'leri temizle
-                self._cleanup_completed_threads()
-                
-                # İstatistikleri güncelle
-                self._update_global_stats()
-                
-                # Kısa bekleme
-                time.sleep(0.1)
-                
+                if stats_snapshot is not None:
+                    self._notify_stats(stats_snapshot)
+                    
+                if queue_empty:
+                    self._trigger_event("queue_empty")
+                    
             except Exception as e:
                 logging.error(f"Worker loop hatası: {e}")
                 time.sleep(1.0)
                 
-    def _schedule_timed_tasks(self, current_time: float):
-        """Zamanlı görevleri planla"""
+    def run_pending(self) -> int:
+        """Zamanlama ve dispatch adımını bir kez çalıştır, başlatılan görev sayısını döndür
+        
+        Worker döngüsü olmadan (ör. sanal saatli simülasyonda) yöneticiyi sürmek için.
+        """
+        with self._wakeup:
+            current_time = self.clock()
+            self._expire_overdue_tasks(current_time)
+            self._scheduling_pass(current_time)
+            return self._dispatch_ready_tasks(current_time)
+            
+    def next_wakeup_time(self) -> Optional[float]:
+        """Bir sonraki zamanlayıcı olayının zamanı (yoksa None)"""
         with self.lock:
-            for task in self.tasks.values():
-                if (task.is_timed and 
-                    not task.is_running and 
-                    task.status != TaskStatus.CANCELLED and
-                    current_time >= task.next_execution_time):
-                    
-                    # Sıraya ekle
-                    priority = -task.priority.value
-                    self.task_queue.put((priority, current_time, task.name))
-                    
-    def _get_next_task(self, current_time: float) -> Optional[str]:
-        """Sıradaki görevi al"""
-        try:
-            # Sıradan görev al (5 saniye timeout)
-            priority, queued_time, task_name = self.task_queue.get(timeout=5.0)
+            current_time = self.clock()
+            delay = self._next_wakeup_delay(current_time)
+            return None if delay is None else current_time + delay
+            
+    def _schedule_at(self, task_name: str, due_time: float):
+        """Görevi zamanlayıcı heap'ine ekle; önceki bekleyen kaydı geçersiz kılar (kilit tutulurken çağrılır)"""
+        generation = self._timer_generation.get(task_name, 0) + 1
+        self._timer_generation[task_name] = generation
+        heapq.heappush(self._timer_heap, (due_time, next(self._timer_seq), task_name, generation))
+        
+    def _enqueue(self, task_name: str, queued_time: float) -> bool:
+        """Görevi hazır sırasına ekle; zaten sıradaysa ekleme (kilit tutulurken çağrılır)"""
+        if task_name in self._queued:
+            self.queue_metrics["duplicates_skipped"] += 1
+            return False
+            
+        task = self.tasks[task_name]
+        task.due_time = queued_time
+        self.task_queue.put(self._queue_key(task, queued_time))
+        self._queued.add(task_name)
+        
+        self.queue_metrics["enqueued"] += 1
+        self.queue_metrics["max_ready_depth"] = max(self.queue_metrics["max_ready_depth"], len(self._queued))
+        return True
+        
+    def _creates_cycle(self, task: AdvancedTask) -> bool:
+        """Görev eklenirse bağımlılık grafiğinde döngü oluşur mu (kilit tutulurken çağrılır)"""
+        stack = list(task.dependencies)
+        visited = set()
+        
+        while stack:
+            name = stack.pop()
+            if name == task.name:
+                return True
+            if name in visited:
+                continue
+            visited.add(name)
             
-            # Görev hala mevcut mu?
-            if task_name not in self.tasks:
-                return None
+            dependency = self.tasks.get(name)
+            if dependency is not None:
+                stack.extend(dependency.dependencies)
                 
-            task = self.tasks[task_name]
+        return False
+        
+    def _wait_for_dependencies(self, task_name: str) -> bool:
+        """Tamamlanmamış bağımlılık varsa görevi bekleme kümesine al (kilit tutulurken çağrılır)"""
+        pending = {dependency for dependency in self.tasks[task_name].dependencies
+                   if dependency not in self.completed_tasks}
+        if pending:
+            self._pending_dependencies[task_name] = pending
+            return True
+        self._pending_dependencies.pop(task_name, None)
+        return False
+        
+    def _arm_task(self, task_name: str, due_time: Optional[float] = None):
+        """Görevi bağımlılıkları hazırsa sıraya veya zamanlayıcıya al (kilit tutulurken çağrılır)"""
+        if self._wait_for_dependencies(task_name):
+            return
             
-            # Görev çalıştırılabilir mi?
-            if task.can_execute(current_time, self.completed_tasks):
-                return task_name
-            else:
-                # Geri sıraya koy
-                self.task_queue.put((priority, queued_time, task_name))
-                return None
+        task = self.tasks[task_name]
+        if due_time is not None:
+            self._schedule_at(task_name, due_time)
+        elif task.is_timed:
+            # Zamanlı görev vakti gelince zamanlayıcı tarafından sıraya alınır
+            self._schedule_at(task_name, task.next_execution_time or self.clock())
+        else:
+            self._enqueue(task_name, self.clock())
+            
+    def _on_task_completed(self, task_name: str):
+        """Başarılı görevin bekleyen bağımlılarını hazırla (kilit tutulurken çağrılır)"""
+        self.completed_tasks.add(task_name)
+        
+        for dependent in self._dependents.get(task_name, ()):
+            pending = self._pending_dependencies.get(dependent)
+            if pending is None or dependent not in self.tasks:
+                continue
+            pending.discard(task_name)
+            if not pending:
+                self._arm_task(dependent)
                 
-        except queue.Empty:
-            # Sıra boş
-            self._trigger_event("queue_empty")
+    def _queue_key(self, task: AdvancedTask, queued_time: float) -> tuple:
+        """Hazır sırası anahtarı (görev adı her zaman üçüncü eleman)"""
+        if self.scheduling_policy == POLICY_EDF:
+            # Son tarih = vakit + göreli son tarih (varsayılan: aralık); kısa aralıklı
+            # görevler uzun süren görevlerin arkasında beklemez
+            relative_deadline = task.deadline if task.deadline is not None else task.interval
+            return (queued_time + (relative_deadline or 0.0), -task.priority.value, task.name)
+        # Önceliğe göre (negatif çünkü PriorityQueue min-heap)
+        return (-task.priority.value, queued_time, task.name)
+        
+    def _next_wakeup_delay(self, current_time: float) -> Optional[float]:
+        """En yakın zamanlı göreve veya çalışma süresi sınırına kalan süre (yoksa süresiz bekle)"""
+        deadlines = list(self._run_deadlines.values())
+        if self._timer_heap:
+            deadlines.append(self._timer_heap[0][0])
+        if self._stats_dirty:
+            deadlines.append(self._last_stats_notify + self.stats_update_interval)
+        if not deadlines:
             return None
+        return max(0.0, min(deadlines) - current_time)
+        
+    def _expire_overdue_tasks(self, current_time: float):
+        """Süresi dolan çalışan görevlerin cancel_event'ini işaretle (kilit tutulurken çağrılır)"""
+        for task_name, deadline in list(self._run_deadlines.items()):
+            if deadline <= current_time:
+                del self._run_deadlines[task_name]
+                task = self.tasks.get(task_name)
+                if task is not None:
+                    task.expire()
+        
+    def _scheduling_pass(self, current_time: float):
+        """Vakti gelen zamanlı görevleri heap'ten sıraya taşı (kilit tutulurken çağrılır)"""
+        while self._timer_heap and self._timer_heap[0][0] <= current_time:
+            due_time, _, task_name, generation = heapq.heappop(self._timer_heap)
+            
+            # Yeniden planlanmış görevin eski kaydı
+            if self._timer_generation.get(task_name) != generation:
+                self.queue_metrics["stale_entries_skipped"] += 1
+                continue
+            del self._timer_generation[task_name]
+            
+            task = self.tasks.get(task_name)
+            
+            # Kaldırılmış, iptal edilmiş veya çalışan görevler atlanır
+            # (çalışan görev bittiğinde yeniden planlanır)
+            if task is None or task.status == TaskStatus.CANCELLED or task_name in self.running_tasks:
+                continue
+                
+            if not self._wait_for_dependencies(task_name):
+                self._enqueue(task_name, due_time)
+            
+    def _resources_available(self, task: AdvancedTask) -> bool:
+        """Görevin talep ettiği kaynaklar boşta mı (kilit tutulurken çağrılır)"""
+        for resource in task.resources:
+            limit = self.resource_limits.get(resource)
+            if limit is not None and self._resources_in_use.get(resource, 0) >= limit:
+                return False
+        return True
+        
+    def _acquire_resources(self, task: AdvancedTask):
+        """Kaynakları göreve ayır (kilit tutulurken çağrılır)"""
+        for resource in task.resources:
+            self._resources_in_use[resource] = self._resources_in_use.get(resource, 0) + 1
             
+    def _release_resources(self, task: AdvancedTask):
+        """Göreve ayrılan kaynakları bırak (kilit tutulurken çağrılır)"""
+        for resource in task.resources:
+            remaining = self._resources_in_use.get(resource, 0) - 1
+            if remaining > 0:
+                self._resources_in_use[resource] = remaining
+            else:
+                self._resources_in_use.pop(resource, None)
+                
+    def get_resource_usage(self) -> Dict[str, int]:
+        """Kaynak başına çalışan görev sayısı"""
+        with self.lock:
+            return dict(self._resources_in_use)
+            
+    def _dispatch_ready_tasks(self, current_time: float) -> int:
+        """Sıradaki çalıştırılabilir görevleri kapasite kadar başlat (kilit tutulurken çağrılır)"""
+        dispatched = 0
+        blocked = []
+        
+        while len(self.running_tasks) < self.max_concurrent_tasks:
+            try:
+                entry = self.task_queue.get_nowait()
+            except queue.Empty:
+                break
+                
+            task_name = entry[2]
+            task = self.tasks.get(task_name)
+            
+            # Görev hala mevcut mu? (kaldırılan görevin kaydı sırada kalmış olabilir)
+            if task is None or task_name not in self._queued:
+                self.queue_metrics["stale_entries_skipped"] += 1
+                continue
+            self._queued.discard(task_name)
+            
+            # İptal edilen görev resume_task ile tekrar sıraya alınır; bağımlılığı
+            # yeniden çalışmaya başlayan görev bekleme kümesine geçer
+            if task.status == TaskStatus.CANCELLED or self._wait_for_dependencies(task_name):
+                continue
+                
+            # Görev çalıştırılabilir mi? (kaynağı meşgulse daha düşük öncelikli
+            # ama başka kaynak kullanan görevler boş worker'ları doldurur)
+            if (task_name not in self.running_tasks and self._resources_available(task)
+                    and task.can_execute(current_time, self.completed_tasks)):
+                # Yeni döngü: önceki başarı bağımlılar için artık geçerli değil
+                self.completed_tasks.discard(task_name)
+                self._execute_task(task_name)
+                dispatched += 1
+            else:
+                blocked.append(entry)
+                
+        # Bekleyenleri geri sıraya koy (bir görev bitince tekrar denenir)
+        for entry in blocked:
+            self.task_queue.put(entry)
+            self._queued.add(entry[2])
+            
+        return dispatched
+        
     def _execute_task(self, task_name: str):
-        """Görevi çalıştır"""
+        """Görevi çalıştır (kilit tutulurken çağrılır)"""
         task = self.tasks[task_name]
         
         def task_runner():
@@ -476,78 +955,95 @@ class AdvancedTaskManager:
                 result = task.execute()
                 
                 with self.lock:
+                    # Global süre istatistikleri (O(1))
+                    self.latency.add(result.execution_time)
+                    self.latency_histogram.add(result.execution_time)
+                    self.global_stats["average_task_time"] = self.latency.mean
+                    self.global_stats["task_time_stddev"] = self.latency.stddev
+                    
                     if result.status == TaskStatus.SUCCESS:
-                        self.completed_tasks.add(task_name)
+                        self._on_task_completed(task_name)
                         self.global_stats["successful_tasks"] += 1
                         self._trigger_event("task_completed", task_name, task, result)
                     else:
                         self.global_stats["failed_tasks"] += 1
                         self._trigger_event("task_failed", task_name, task, result)
                         
-                        # Retry kontrolü
-                        if task.should_retry():
+                        # Retry kontrolü: artan retry delay sonrası zamanlayıcı heap'inden tekrar sıraya alınır
+                        if task.should_retry() and task_name in self.tasks:
                             task.current_retries += 1
                             task.status = TaskStatus.RETRY
                             
-                            # Retry delay sonrası tekrar sıraya ekle
-                            def retry_later():
-                                time.sleep(task.retry_delay)
-                                if self.is_running and task_name in self.tasks:
-                                    priority = -task.priority.value
-                                    self.task_queue.put((priority, time.time(), task_name))
-                                    
-                            threading.Thread(target=retry_later, daemon=True).start()
+                            retry_time = self.clock() + task.next_retry_delay()
+                            if task.is_timed:
+                                task.next_execution_time = retry_time
+                            self._arm_task(task_name, retry_time)
                             
+                    # Zamanlı görevi bir sonraki çalıştırma zamanına planla
+                    if (task.is_timed and task.status not in (TaskStatus.CANCELLED, TaskStatus.RETRY)
+                            and task_name in self.tasks):
+                        self._arm_task(task_name)
+                        
                     self.global_stats["total_tasks_executed"] += 1
+                    state = task.get_state()
                     
+                # Durumu kilit dışında kaydet
+                self._persist_task(task_name, state, result)
+                
             except Exception as e:
                 logging.error(f"Task runner hatası: {e}")
             finally:
-                # Running tasks listesinden çıkar
-                with self.lock:
-                    if task_name in self.running_tasks:
-                        del self.running_tasks[task_name]
+                # Running tasks listesinden çıkar ve worker'ı uyandır
+                with self._wakeup:
+                    if self.running_tasks.pop(task_name, None) is not None:
+                        self._release_resources(task)
+                    self._run_deadlines.pop(task_name, None)
+                    
+                    # İstatistik bildirimi (aralık dolmadıysa worker'a ertelenir)
+                    self._stats_dirty = True
+                    stats_snapshot = self._take_stats_snapshot(self.clock())
+                    self._wakeup.notify()
+                    
+                if stats_snapshot is not None:
+                    self._notify_stats(stats_snapshot)
                         
-        # Thread başlat
-        thread = threading.Thread(target=task_runner, daemon=True)
-        thread.start()
-        
-        with self.lock:
-            self.running_tasks[task_name] = thread
+        # Gecikme: vaktinden ne kadar sonra başlatıldı
+        if task.due_time is not None:
+            task.lateness.add(max(0.0, self.clock() - task.due_time))
             
-    def _cleanup_completed_threads(self):
-        """Tamamlanan thread'leri temizle"""
-        with self.lock:
-            completed = []
-            for task_name, thread in self.running_tasks.items():
-                if not thread.is_alive():
-                    completed.append(task_name)
-                    
-            for task_name in completed:
-                del self.running_tasks[task_name]
-                
-    def _update_global_stats(self):
-        """Global istatistikleri güncelle"""
-        if self.global_stats["start_time"]:
-            self.global_stats["uptime"] = time.time() - self.global_stats["start_time"]
+        # Havuza gönder (havuz dolu değil: dispatch kapasiteyi zaten sınırlıyor)
+        if task.timeout:
+            self._run_deadlines[task_name] = self.clock() + task.timeout
+        self._acquire_resources(task)
+        self.running_tasks[task_name] = self.executor.submit(task_runner)
             
-        # Ortalama görev süresi
-        total_time = 0.0
-        total_tasks = 0
+    def _persist_task(self, task_name: str, state: Dict[str, Any], result: TaskResult):
+        """Görev durumunu ve sonucunu kalıcı depoya yaz"""
+        if self.state_store is None:
+            return
+        self.state_store.save(task_name, state, {
+            "status": result.status.value,
+            "message": result.message,
+            "execution_time": result.execution_time,
+            "timestamp": result.timestamp.isoformat()
+        })
         
-        with self.lock:
-            for task in self.tasks.values():
-                if task.stats.total_executions > 0:
-                    total_time += task.stats.average_execution_time * task.stats.total_executions
-                    total_tasks += task.stats.total_executions
-                    
-        if total_tasks > 0:
-            self.global_stats["average_task_time"] = total_time / total_tasks
+    def _take_stats_snapshot(self, current_time: float) -> Optional[Dict[str, Any]]:
+        """Değişiklik varsa ve aralık dolduysa bildirilecek kopyayı al (kilit tutulurken çağrılır)"""
+        if not self._stats_dirty or current_time - self._last_stats_notify < self.stats_update_interval:
+            return None
             
-        # Callback çağır
+        self._stats_dirty = False
+        self._last_stats_notify = current_time
+        if self.global_stats["start_time"]:
+            self.global_stats["uptime"] = current_time - self.global_stats["start_time"]
+        return self.global_stats.copy()
+        
+    def _notify_stats(self, stats: Dict[str, Any]):
+        """on_stats_update callback'ini kilit dışında çağır"""
         if self.on_stats_update:
             try:
-                self.on_stats_update(self.global_stats)
+                self.on_stats_update(stats)
             except Exception as e:
                 logging.error(f"Stats update callback hatası: {e}")
                 
@@ -581,9 +1077,32 @@ class AdvancedTaskManager:
         with self.lock:
             return {name: task.get_info() for name, task in self.tasks.items()}
             
+    def get_queue_metrics(self) -> Dict[str, Any]:
+        """Sıra derinliği metrikleri"""
+        with self.lock:
+            metrics = dict(self.queue_metrics)
+            metrics["ready_depth"] = len(self._queued)
+            metrics["timed_pending"] = len(self._timer_generation)
+            metrics["waiting_on_dependencies"] = len(self._pending_dependencies)
+            metrics["heap_size"] = len(self._timer_heap)
+            metrics["running"] = len(self.running_tasks)
+            metrics["resources_in_use"] = dict(self._resources_in_use)
+            return metrics
+            
+    def get_lateness_report(self) -> Dict[str, Dict[str, Any]]:
+        """Görev başına başlatma gecikmesi (saniye: ortalama, sapma, en kötü)"""
+        with self.lock:
+            return {name: task.lateness.to_dict() for name, task in self.tasks.items()
+                    if task.lateness.count}
+            
     def get_global_stats(self) -> Dict[str, Any]:
         """Global istatistikleri al"""
-        return self.global_stats.copy()
+        with self.lock:
+            if self.global_stats["start_time"]:
+                self.global_stats["uptime"] = self.clock() - self.global_stats["start_time"]
+            stats = self.global_stats.copy()
+            stats["task_time_histogram"] = self.latency_histogram.to_dict()
+            return stats
         
     def pause_task(self, task_name: str) -> bool:
         """Görevi duraklat"""
@@ -599,9 +1118,14 @@ class AdvancedTaskManager:
             task = self.tasks[task_name]
             task.reset()
             
-            # Sıraya tekrar ekle
-            priority = -task.priority.value
-            self.task_queue.put((priority, time.time(), task_name))
+            # Sıraya tekrar ekle: zamanlı görev vakti gelmediyse kendi vaktine,
+            # vakti geçtiyse hemen planlanır
+            with self._wakeup:
+                due_time = None
+                if task.is_timed:
+                    due_time = max(task.next_execution_time or 0.0, self.clock())
+                self._arm_task(task_name, due_time)
+                self._wakeup.notify()
             return True
         return False
         
@@ -621,6 +1145,7 @@ class AdvancedTaskManager:
             stats_data = {
                 "global_stats": self.get_global_stats(),
                 "task_stats": self.get_all_tasks_info(),
+                "queue_metrics": self.get_queue_metrics(),
                 "export_time": datetime.datetime.now().isoformat()
             }
             
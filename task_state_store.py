@@ -0,0 +1,147 @@
+"""
+💾 King Bot Pro - Görev Durumu Deposu
+Zamanlayıcı durumunu SQLite (WAL) ile saklar; yeniden başlatmada program kaldığı yerden devam eder
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+
+DEFAULT_STATE_DB = "task_state.db"
+EDF_STATE_DB = "task_state_edf.db"  # EDF yöneticisi aynı görev isimlerini kullandığı için ayrı dosya
+HISTORY_LIMIT = 100  # AdvancedTask.results_history ile aynı
+
+
+class TaskStateStore:
+    """Görev durumlarını saklayan SQLite deposu
+
+    Her görev bitiminde tek bir işlemle görev satırı güncellenir ve sonuç
+    geçmişine bir satır eklenir (O(1) yazma). WAL kipinde yazma okuyucuları
+    bloklamaz; açılışta tüm durum tek sorguyla belleğe alınır.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_STATE_DB):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._writes: Dict[str, int] = {}
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_database()
+
+    def _init_database(self):
+        """Tabloları oluştur"""
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS task_state (
+                    name TEXT PRIMARY KEY,
+                    status TEXT,
+                    next_execution_time REAL,
+                    last_execution_time REAL,
+                    current_retries INTEGER,
+                    stats TEXT,
+                    latency TEXT,
+                    updated_at REAL
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS task_results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT,
+                    status TEXT,
+                    message TEXT,
+                    execution_time REAL,
+                    timestamp TEXT
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_task_results_name ON task_results (name, id)")
+
+    def save(self, name: str, state: Dict[str, Any], result: Optional[Dict[str, Any]] = None):
+        """Görev durumunu ve (varsa) son sonucu tek işlemde yaz"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO task_state VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (name, state["status"], state["next_execution_time"], state["last_execution_time"],
+                     state["current_retries"], json.dumps(state["stats"]), json.dumps(state["latency"]),
+                     time.time())
+                )
+
+                if result is not None:
+                    self._conn.execute(
+                        "INSERT INTO task_results (name, status, message, execution_time, timestamp) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (name, result["status"], result["message"], result["execution_time"], result["timestamp"])
+                    )
+
+                    # Geçmişi ara sıra budayarak yazma maliyetini sabit tut
+                    writes = self._writes.get(name, 0) + 1
+                    if writes >= HISTORY_LIMIT:
+                        writes = 0
+                        self._conn.execute(
+                            "DELETE FROM task_results WHERE name = ? AND id <= "
+                            "(SELECT id FROM task_results WHERE name = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                            (name, name, HISTORY_LIMIT)
+                        )
+                    self._writes[name] = writes
+        except Exception as e:
+            logging.error(f"Görev durumu kaydedilemedi ({name}): {e}")
+
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        """Tüm görev durumlarını {isim: durum} olarak yükle"""
+        states: Dict[str, Dict[str, Any]] = {}
+        try:
+            with self._lock:
+                for row in self._conn.execute("SELECT name, status, next_execution_time, last_execution_time, "
+                                              "current_retries, stats, latency FROM task_state"):
+                    states[row[0]] = {
+                        "status": row[1],
+                        "next_execution_time": row[2],
+                        "last_execution_time": row[3],
+                        "current_retries": row[4],
+                        "stats": json.loads(row[5]),
+                        "latency": json.loads(row[6]),
+                        "history": []
+                    }
+
+                rows = self._conn.execute(
+                    "SELECT name, status, message, execution_time, timestamp FROM task_results ORDER BY id"
+                ).fetchall()
+
+            for name, status, message, execution_time, timestamp in rows:
+                if name in states:
+                    states[name]["history"].append({
+                        "status": status,
+                        "message": message,
+                        "execution_time": execution_time,
+                        "timestamp": timestamp
+                    })
+
+            for state in states.values():
+                del state["history"][:-HISTORY_LIMIT]
+        except Exception as e:
+            logging.error(f"Görev durumu yüklenemedi: {e}")
+        return states
+
+    def delete(self, name: str):
+        """Görevin kayıtlarını sil"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM task_state WHERE name = ?", (name,))
+                self._conn.execute("DELETE FROM task_results WHERE name = ?", (name,))
+                self._writes.pop(name, None)
+        except Exception as e:
+            logging.error(f"Görev durumu silinemedi ({name}): {e}")
+
+    def close(self):
+        """Bağlantıyı kapat"""
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
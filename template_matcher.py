@@ -0,0 +1,504 @@
+"""
+🎯 King Bot Pro - Toplu Template Eşleştirme
+Tek kare üzerinde birden fazla template'i tek geçişte eşleştirir
+"""
+
+import os
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from frame_bus import Frame
+
+
+Match = Tuple[int, int, float]
+
+# Paylaşılan eşleştirme havuzu (cv2.matchTemplate GIL'i bıraktığı için thread yeterli)
+_executor: Optional[ThreadPoolExecutor] = None
+MAX_MATCH_WORKERS = min(4, os.cpu_count() or 1)
+
+# Eşleştirme modları: "exact" tam çözünürlük, "pyramid" kabadan inceye
+MATCH_MODES = ("exact", "pyramid")
+
+# Piramit ayarları
+PYRAMID_MAX_LEVEL = 2            # En fazla 1/4 ölçek
+PYRAMID_MIN_TEMPLATE_SIDE = 12   # Kaba seviyede template'in en kısa kenarı
+PYRAMID_TOP_K = 5                # Doğrulanacak aday sayısı
+PYRAMID_COARSE_MARGIN = 0.25     # Kaba ölçekte güven eşiği gevşetmesi
+PYRAMID_REFINE_PAD = 2           # Tam çözünürlükte doğrulama penceresi payı
+
+# Toplu eşleştirme: aynı boyuttaki en az bu kadar template ortak kare spektrumuyla eşleştirilir
+BATCH_MIN_TEMPLATES = 2
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Eşleştirme thread havuzunu al (ilk kullanımda oluştur)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_MATCH_WORKERS,
+                                       thread_name_prefix="template-match")
+    return _executor
+
+
+def prepare_frame(image: np.ndarray) -> np.ndarray:
+    """Kareyi eşleştirme için bir kez hazırla (BGR, uint8, bitişik bellek)"""
+    if image.ndim == 3 and image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    if image.dtype != np.uint8:
+        image = image.astype(np.uint8)
+    return np.ascontiguousarray(image)
+
+
+def find_peaks(result: np.ndarray, template_size: Tuple[int, int], confidence: float,
+               max_matches: int = 1, offset: Tuple[int, int] = (0, 0)) -> List[Match]:
+    """Eşleştirme sonucundan en iyi tepe noktalarını (merkez koordinatıyla) çıkar"""
+    matches = []
+    w, h = template_size
+
+    for _ in range(max_matches):
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+
+        if max_val < confidence:
+            break
+
+        x, y = max_loc
+        matches.append((x + offset[0] + w // 2, y + offset[1] + h // 2, max_val))
+
+        # Bu alanı maskele ki tekrar bulunmasın
+        cv2.rectangle(result, (x - w // 2, y - h // 2), (x + w // 2, y + h // 2), 0, -1)
+
+    return matches
+
+
+def build_pyramid(image: np.ndarray, levels: int) -> List[np.ndarray]:
+    """Görüntü piramidi oluştur (0 = orijinal, her seviye yarı boyut)"""
+    pyramid = [image]
+    for _ in range(levels):
+        if min(pyramid[-1].shape[:2]) < 2:
+            break
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+def pyramid_level_for(template: np.ndarray) -> int:
+    """Template boyutuna göre kaba arama seviyesini seç (0 = piramit kullanma)"""
+    level = 0
+    min_side = min(template.shape[:2])
+    while level < PYRAMID_MAX_LEVEL and (min_side >> (level + 1)) >= PYRAMID_MIN_TEMPLATE_SIDE:
+        level += 1
+    return level
+
+
+def match_pyramid(image: np.ndarray, template: np.ndarray, confidence: float,
+                  max_matches: int = 1, offset: Tuple[int, int] = (0, 0),
+                  frame_pyramid: Optional[List[np.ndarray]] = None,
+                  template_pyramid: Optional[List[np.ndarray]] = None) -> List[Match]:
+    """Kabadan inceye piramit eşleştirme
+
+    Önce 1/2 veya 1/4 ölçekte aday tepe noktaları bulunur, sonra sadece bu
+    adayların çevresindeki küçük pencereler tam çözünürlükte yeniden skorlanır.
+    Sonuç find_peaks ile aynı (x, y, güven) biçimindedir ve güven değeri tam
+    çözünürlük TM_CCOEFF_NORMED skorudur.
+    """
+    h, w = template.shape[:2]
+    image_h, image_w = image.shape[:2]
+    level = pyramid_level_for(template)
+
+    if level == 0:
+        result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+        return find_peaks(result, (w, h), confidence, max_matches, offset)
+
+    if frame_pyramid is None or len(frame_pyramid) <= level:
+        frame_pyramid = build_pyramid(image, level)
+    if template_pyramid is None or len(template_pyramid) <= level or template_pyramid[level] is None:
+        template_pyramid = build_pyramid(template, level)
+
+    coarse_image = frame_pyramid[level]
+    coarse_template = template_pyramid[level]
+    coarse_h, coarse_w = coarse_template.shape[:2]
+    if coarse_h > coarse_image.shape[0] or coarse_w > coarse_image.shape[1]:
+        return []
+
+    # Kaba ölçekte aday tepe noktaları
+    coarse_result = cv2.matchTemplate(coarse_image, coarse_template, cv2.TM_CCOEFF_NORMED)
+    top_k = max(PYRAMID_TOP_K, max_matches * 3)
+    coarse_threshold = max(0.0, confidence - PYRAMID_COARSE_MARGIN)
+    candidates = find_peaks(coarse_result, (coarse_w, coarse_h), coarse_threshold, top_k)
+
+    # Adayları tam çözünürlükte küçük pencerelerde doğrula
+    scale = 1 << level
+    pad = scale + PYRAMID_REFINE_PAD
+    refined = []
+    for center_x, center_y, _ in candidates:
+        x = (center_x - coarse_w // 2) * scale
+        y = (center_y - coarse_h // 2) * scale
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(image_w - w, x + pad), min(image_h - h, y + pad)
+        if x1 < x0 or y1 < y0:
+            continue
+
+        window = image[y0:y1 + h, x0:x1 + w]
+        result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val >= confidence:
+            refined.append((x0 + max_loc[0], y0 + max_loc[1], max_val))
+
+    # find_peaks ile aynı bastırma: en iyi tepenin çevresindeki adaylar elenir
+    matches = []
+    for x, y, score in sorted(refined, key=lambda match: match[2], reverse=True):
+        if any(abs(x - mx) <= w // 2 and abs(y - my) <= h // 2 for mx, my, _ in matches):
+            continue
+        matches.append((x, y, score))
+        if len(matches) >= max_matches:
+            break
+
+    return [(x + offset[0] + w // 2, y + offset[1] + h // 2, score) for x, y, score in matches]
+
+
+class FrameSpectrum:
+    """Karenin kanal başına DFT'si ve integral görüntüleri
+
+    Bir kez hesaplanır ve karedeki tüm template grupları tarafından (thread'ler
+    arasında salt okunur olarak) paylaşılır.
+    """
+
+    __slots__ = ("height", "width", "channels", "dft_size", "spectra", "sums", "squares")
+
+    def __init__(self, image: np.ndarray):
+        self.height, self.width = image.shape[:2]
+        self.channels = 1 if image.ndim == 2 else image.shape[2]
+        self.dft_size = (cv2.getOptimalDFTSize(self.height), cv2.getOptimalDFTSize(self.width))
+
+        pixels = image.astype(np.float32)
+        planes = cv2.split(pixels) if self.channels > 1 else [pixels]
+        self.spectra = [self.transform(plane) for plane in planes]
+
+        # Tam sayı toplamları (float64'te kesin): düz pencerelerde varyans tam 0 olur
+        self.sums, self.squares = cv2.integral2(image, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+    def transform(self, plane: np.ndarray) -> np.ndarray:
+        """Düzlemi DFT boyutuna sıfırla doldurup dönüştür (CCS paketli spektrum)"""
+        padded = np.zeros(self.dft_size, np.float32)
+        padded[:plane.shape[0], :plane.shape[1]] = plane
+        return cv2.dft(padded, nonzeroRows=plane.shape[0])
+
+    def window_variance(self, w: int, h: int) -> np.ndarray:
+        """Her (w, h) penceresi için alan * kanallar toplamı varyans toplamı"""
+        out_h, out_w = self.height - h + 1, self.width - w + 1
+        window = []
+        for integral in (self.sums, self.squares):
+            window.append(integral[h:h + out_h, w:w + out_w] - integral[:out_h, w:w + out_w]
+                          - integral[h:h + out_h, :out_w] + integral[:out_h, :out_w])
+        variance = (w * h) * window[1] - window[0] * window[0]
+        if variance.ndim == 3:
+            variance = variance.sum(axis=2)
+        return np.maximum(variance, 0.0)
+
+
+def match_template_batch(image: np.ndarray, templates: Sequence[np.ndarray],
+                         spectrum: Optional[FrameSpectrum] = None) -> List[np.ndarray]:
+    """Aynı boyuttaki template'lerin TM_CCOEFF_NORMED haritalarını tek geçişte hesapla
+
+    cv2.matchTemplate her çağrıda kareyi yeniden dönüştürür ve pencere
+    istatistiklerini yeniden hesaplar. Burada kare spektrumu ve pencere
+    varyansları bir kez hesaplanır; template başına sadece kendi DFT'si, kanal
+    spektrumlarının çarpımı ve tek bir ters DFT kalır. Sonuç haritaları
+    cv2.matchTemplate ile float32 hassasiyetinde aynıdır.
+    """
+    if spectrum is None:
+        spectrum = FrameSpectrum(image)
+
+    h, w = templates[0].shape[:2]
+    out_h, out_w = spectrum.height - h + 1, spectrum.width - w + 1
+    window_variance = spectrum.window_variance(w, h)
+
+    results = []
+    for template in templates:
+        if template.shape[:2] != (h, w) or (1 if template.ndim == 2 else template.shape[2]) != spectrum.channels:
+            raise ValueError(f"Template boyutu/kanalı grupla uyuşmuyor: {template.shape}")
+
+        # Ortalaması çıkarılmış template: pay kare ortalamasından bağımsız olur
+        centered = template.astype(np.float32)
+        centered -= centered.reshape(-1, spectrum.channels).mean(axis=0)
+        planes = cv2.split(centered) if spectrum.channels > 1 else [centered]
+
+        product = None
+        for frame_spectrum, plane in zip(spectrum.spectra, planes):
+            term = cv2.mulSpectrums(frame_spectrum, spectrum.transform(plane), 0, conjB=True)
+            product = term if product is None else cv2.add(product, term)
+        correlation = cv2.idft(product, flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE,
+                               nonzeroRows=out_h)[:out_h, :out_w]
+
+        template_norm = float(np.dot(centered.ravel(), centered.ravel()))
+        denominator = np.sqrt(window_variance * (template_norm / (w * h)))
+        scores = np.zeros((out_h, out_w), np.float32)
+        np.divide(correlation, denominator, out=scores, where=denominator > 0)
+        results.append(np.clip(scores, -1.0, 1.0, out=scores))
+
+    return results
+
+
+def _match_group(image: np.ndarray, group: List[Tuple[str, np.ndarray]], confidence: float,
+                 max_matches: int, offset: Tuple[int, int], mode: str = "exact",
+                 frame_pyramid: Optional[List[np.ndarray]] = None,
+                 template_pyramids: Optional[Dict[str, List[np.ndarray]]] = None,
+                 spectrum: Optional[FrameSpectrum] = None) -> Dict[str, List[Match]]:
+    """Aynı boyuttaki template grubunu eşleştir
+
+    "exact" modunda grup yeterince büyükse kare spektrumu paylaşılarak tek
+    geçişte (match_template_batch) eşleştirilir; piramit modu template başına
+    aday pencereleri doğruladığı için tek tek çalışır.
+    """
+    if mode != "pyramid" and len(group) >= BATCH_MIN_TEMPLATES:
+        try:
+            h, w = group[0][1].shape[:2]
+            maps = match_template_batch(image, [template for _, template in group], spectrum)
+            return {name: find_peaks(result, (w, h), confidence, max_matches, offset)
+                    for (name, _), result in zip(group, maps)}
+        except Exception as e:
+            logging.error(f"Toplu eşleştirme hatası, template'ler tek tek eşleştirilecek: {e}")
+
+    results = {}
+    for name, template in group:
+        try:
+            if mode == "pyramid":
+                results[name] = match_pyramid(image, template, confidence, max_matches, offset,
+                                              frame_pyramid, (template_pyramids or {}).get(name))
+            else:
+                result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+                results[name] = find_peaks(result, (template.shape[1], template.shape[0]),
+                                           confidence, max_matches, offset)
+        except Exception as e:
+            logging.error(f"Toplu eşleştirme hatası ({name}): {e}")
+            results[name] = []
+    return results
+
+
+def match_many(frame: Union[Frame, np.ndarray], templates: Dict[str, np.ndarray],
+               confidence: float = 0.8, max_matches: int = 1,
+               offset: Tuple[int, int] = (0, 0), mode: str = "exact",
+               template_pyramids: Optional[Dict[str, List[np.ndarray]]] = None) -> Dict[str, List[Match]]:
+    """Birden fazla template'i tek karede eşleştir
+
+    Kare bir kez hazırlanır, template'ler boyutlarına göre gruplanır ve gruplar
+    paralel eşleştirilir. Sonuç {isim: [(x, y, skor)]} biçimindedir; koordinatlar
+    template merkezidir ve Frame verilirse mutlak ekran koordinatındadır.
+    "exact" modunda karenin spektrumu, "pyramid" modunda kare piramidi bir kez
+    kurulur ve tüm gruplarca paylaşılır.
+    """
+    if isinstance(frame, Frame):
+        offset = frame.origin
+        frame = frame.image
+
+    results: Dict[str, List[Match]] = {name: [] for name in templates}
+    if frame is None or not templates:
+        return results
+
+    image = prepare_frame(frame)
+    image_h, image_w = image.shape[:2]
+
+    # Boyuta göre grupla (ekrandan büyük template'ler atlanır)
+    groups = defaultdict(list)
+    for name, template in templates.items():
+        if template is None:
+            continue
+        h, w = template.shape[:2]
+        if h > image_h or w > image_w:
+            continue
+        groups[(w, h)].append((name, template))
+
+    if not groups:
+        return results
+
+    frame_pyramid = None
+    if mode == "pyramid":
+        levels = max(pyramid_level_for(group[0][1]) for group in groups.values())
+        frame_pyramid = build_pyramid(image, levels)
+
+    spectrum = None
+    if mode != "pyramid" and any(len(group) >= BATCH_MIN_TEMPLATES for group in groups.values()):
+        spectrum = FrameSpectrum(image)
+
+    args = (confidence, max_matches, offset, mode, frame_pyramid, template_pyramids, spectrum)
+    if len(groups) == 1:
+        results.update(_match_group(image, next(iter(groups.values())), *args))
+        return results
+
+    futures = [
+        _get_executor().submit(_match_group, image, group, *args)
+        for group in groups.values()
+    ]
+    for future in futures:
+        results.update(future.result())
+
+    return results
+
+
+# --- Ölçek uzayı eşleştirme ---
+
+# Ölçekli eşleşme kaydı: sol üst köşe, boyut, skor ve ölçek
+SCALE_MATCH_DTYPE = np.dtype([
+    ("x", np.int32), ("y", np.int32), ("w", np.int32), ("h", np.int32),
+    ("score", np.float32), ("scale", np.float32)
+])
+
+DEFAULT_SCALES = (0.5, 0.75, 1.0, 1.25, 1.5)
+NMS_IOU_THRESHOLD = 0.3
+MAX_PEAKS_PER_SCALE = 64
+MAX_TEMPLATE_MATCHES = 10
+
+
+def extract_peaks(result: np.ndarray, template_size: Tuple[int, int], threshold: float,
+                  max_peaks: int = MAX_PEAKS_PER_SCALE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Eşik üstündeki yerel maksimumları (x, y, skor) dizileri olarak çıkar
+
+    Komşuluk template boyutunun yarısıdır; maliyet eşik üstündeki piksel
+    sayısına değil sonuç haritasının boyutuna bağlıdır.
+    """
+    w, h = template_size
+    kernel = np.ones((max(3, (h // 2) | 1), max(3, (w // 2) | 1)), np.uint8)
+    local_max = cv2.dilate(result, kernel)
+    ys, xs = np.nonzero((result >= threshold) & (result >= local_max))
+    scores = result[ys, xs]
+
+    if len(scores) > max_peaks:
+        keep = np.argpartition(scores, -max_peaks)[-max_peaks:]
+        xs, ys, scores = xs[keep], ys[keep], scores[keep]
+
+    return xs, ys, scores
+
+
+def non_max_suppression(matches: np.ndarray, iou_threshold: float = NMS_IOU_THRESHOLD,
+                        max_results: Optional[int] = None) -> np.ndarray:
+    """Örtüşen kutuları bastır, skora göre azalan sırada döndür"""
+    if len(matches) == 0:
+        return matches
+
+    order = np.argsort(matches["score"])[::-1]
+    x1 = matches["x"].astype(np.float32)
+    y1 = matches["y"].astype(np.float32)
+    x2 = x1 + matches["w"]
+    y2 = y1 + matches["h"]
+    areas = (x2 - x1) * (y2 - y1)
+
+    keep = []
+    while order.size > 0:
+        best = order[0]
+        keep.append(best)
+        if max_results is not None and len(keep) >= max_results:
+            break
+
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        intersection = inter_w * inter_h
+        iou = intersection / (areas[best] + areas[rest] - intersection)
+        order = rest[iou <= iou_threshold]
+
+    return matches[np.array(keep, dtype=np.intp)]
+
+
+def match_scales(image: np.ndarray, template: np.ndarray, scales=DEFAULT_SCALES,
+                 threshold: float = 0.8, iou_threshold: float = NMS_IOU_THRESHOLD,
+                 max_results: Optional[int] = None) -> np.ndarray:
+    """Template'i birden fazla ölçekte eşleştir
+
+    Her ölçekte yerel tepe noktaları NumPy ile çıkarılır, tüm ölçeklerin
+    adayları tek bir NMS'den geçirilir. Sonuç SCALE_MATCH_DTYPE yapılı dizisidir
+    (x, y, w, h, skor, ölçek) ve skora göre azalan sıradadır.
+    """
+    # Renk kanallarını eşitle (gri template, renkli görüntü vb.)
+    if template.ndim == 2 and image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    elif template.ndim == 3 and image.ndim == 2:
+        template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+
+    image_h, image_w = image.shape[:2]
+    chunks = []
+
+    for scale in scales:
+        scaled = template if scale == 1.0 else cv2.resize(template, None, fx=scale, fy=scale)
+        h, w = scaled.shape[:2]
+        if h == 0 or w == 0 or h > image_h or w > image_w:
+            continue
+
+        result = cv2.matchTemplate(image, scaled, cv2.TM_CCOEFF_NORMED)
+        xs, ys, scores = extract_peaks(result, (w, h), threshold)
+        if len(scores) == 0:
+            continue
+
+        chunk = np.empty(len(scores), dtype=SCALE_MATCH_DTYPE)
+        chunk["x"], chunk["y"] = xs, ys
+        chunk["w"], chunk["h"] = w, h
+        chunk["score"], chunk["scale"] = scores, scale
+        chunks.append(chunk)
+
+    if not chunks:
+        return np.empty(0, dtype=SCALE_MATCH_DTYPE)
+
+    return non_max_suppression(np.concatenate(chunks), iou_threshold, max_results)
+
+
+class MatchResult:
+    """NumPy dizileriyle tutulan, skora göre sıralı ve sınırlı eşleşme sonucu
+
+    Elemanlar eski find_template listesiyle uyumlu (x, y, w, h) tuple'larıdır;
+    ilk eleman her zaman en yüksek skorlu eşleşmedir.
+    """
+
+    __slots__ = ("matches",)
+
+    def __init__(self, matches: Optional[np.ndarray] = None):
+        self.matches = matches if matches is not None else np.empty(0, dtype=SCALE_MATCH_DTYPE)
+
+    @classmethod
+    def from_result(cls, result: np.ndarray, template_size: Tuple[int, int], threshold: float,
+                    origin: Tuple[int, int] = (0, 0), max_results: int = MAX_TEMPLATE_MATCHES,
+                    iou_threshold: float = NMS_IOU_THRESHOLD) -> "MatchResult":
+        """matchTemplate sonuç haritasından NMS uygulanmış sonuç oluştur"""
+        w, h = template_size
+        xs, ys, scores = extract_peaks(result, (w, h), threshold, max(MAX_PEAKS_PER_SCALE, max_results * 4))
+        if len(scores) == 0:
+            return cls()
+
+        matches = np.empty(len(scores), dtype=SCALE_MATCH_DTYPE)
+        matches["x"], matches["y"] = xs + origin[0], ys + origin[1]
+        matches["w"], matches["h"] = w, h
+        matches["score"], matches["scale"] = scores, 1.0
+        return cls(non_max_suppression(matches, iou_threshold, max_results))
+
+    def __len__(self) -> int:
+        return len(self.matches)
+
+    def __bool__(self) -> bool:
+        return len(self.matches) > 0
+
+    def __getitem__(self, index: int) -> Tuple[int, int, int, int]:
+        match = self.matches[index]
+        return (int(match["x"]), int(match["y"]), int(match["w"]), int(match["h"]))
+
+    def __iter__(self):
+        for index in range(len(self.matches)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f"MatchResult({list(self)})"
+
+    @property
+    def scores(self) -> np.ndarray:
+        """Skorlar (azalan sırada)"""
+        return self.matches["score"]
+
+    @property
+    def best(self) -> Optional[Tuple[int, int, int, int]]:
+        """En iyi eşleşme (yoksa None)"""
+        return self[0] if len(self.matches) else None
+
+    def center(self, index: int = 0) -> Tuple[int, int]:
+        """Eşleşmenin merkez koordinatı"""
+        x, y, w, h = self[index]
+        return (x + w // 2, y + h // 2)
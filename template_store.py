@@ -0,0 +1,397 @@
+"""
+🗂️ King Bot Pro - Kalıcı Template Deposu
+Template görsellerini bir kez çözer, varyantlarını hazırlar ve diske önbellekler
+"""
+
+import hashlib
+import json
+import os
+import threading
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+
+# Görev görselleri (UI'ların load_image_paths ile taradığı klasörler)
+IMAGE_FOLDERS = [
+    'anaekran', 'anahtar', 'asker', 'askerbas', 'bekcikulesi',
+    'dunyaheal', 'fetih', 'geri', 'heal', 'isyanci', 'ittifak',
+    'kutu', 'mesaj', 'savas', 'suadasi'
+]
+
+# Ön yüklemede ek olarak taranan klasörler
+TEMPLATE_FOLDERS = IMAGE_FOLDERS + ['kings_mobile_templates']
+
+TEMPLATE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+CACHE_DIR_NAME = ".template_cache"
+INDEX_FILE_NAME = "index.json"
+CACHE_FORMAT_VERSION = 1
+
+# Kaydedilen varyantlar: renkli, gri, kenar ve küçültülmüş piramit seviyeleri
+PYRAMID_LEVELS = 2
+VARIANTS = ["bgr", "gray", "edges"] + [f"pyr{level}" for level in range(1, PYRAMID_LEVELS + 1)]
+
+
+def build_variants(image: np.ndarray) -> Dict[str, np.ndarray]:
+    """Çözülmüş BGR görselden tüm eşleştirme varyantlarını üret"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    variants = {
+        "bgr": image,
+        "gray": gray,
+        "edges": cv2.Canny(gray, 50, 150),
+    }
+
+    level = image
+    for index in range(1, PYRAMID_LEVELS + 1):
+        if min(level.shape[:2]) < 2:
+            break
+        level = cv2.pyrDown(level)
+        variants[f"pyr{index}"] = level
+
+    return {name: np.ascontiguousarray(array) for name, array in variants.items()}
+
+
+def file_sha1(path: str) -> str:
+    """Dosya içeriğinin SHA1 özeti"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class TemplateEntry:
+    """Depodaki tek template kaydı"""
+    path: str
+    mtime: float
+    size: int
+    sha1: str
+    variants: Dict[str, np.ndarray] = field(default_factory=dict)
+
+
+class TemplateStore:
+    """Süreç genelinde paylaşılan template deposu
+
+    Her görsel bir kez çözülür; renkli, gri, kenar ve piramit varyantları
+    cache klasörüne .npy olarak yazılır ve sonraki açılışlarda bellek eşlemeli
+    (mmap) okunur. Kayıtlar dosyanın mtime/boyutu ile doğrulanır; mtime değişip
+    içerik özeti aynı kaldıysa varyantlar yeniden üretilmez. Görsel çözme ve
+    disk G/Ç kilit dışında yapılır; içeriği değişen veya silinen görsellerin
+    artık kullanılmayan .npy dosyaları önbellekten silinir.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, cache_dir: Optional[str] = None,
+                 folders: Sequence[str] = TEMPLATE_FOLDERS):
+        self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+        self.cache_dir = cache_dir or os.path.join(self.base_dir, CACHE_DIR_NAME)
+        self.folders = list(folders)
+
+        self._lock = threading.RLock()
+        self._entries: Dict[str, TemplateEntry] = {}
+        self._index: Dict[str, Dict] = self._load_index()
+        self._image_paths: Dict[tuple, Dict[str, str]] = {}
+
+        # Dosyaları yazılmakta olan özetler (henüz dizinde değil, silinmemeli)
+        self._in_flight: Dict[str, int] = {}
+
+        # İstatistikler
+        self.stats = {
+            "hits": 0,
+            "disk_loads": 0,
+            "decodes": 0,
+            "invalidations": 0
+        }
+
+    # --- Disk önbelleği ---
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILE_NAME)
+
+    def _load_index(self) -> Dict[str, Dict]:
+        """Önbellek dizinini yükle (sürüm uyuşmazsa boş başla)"""
+        try:
+            if os.path.exists(self._index_path()):
+                with open(self._index_path(), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_FORMAT_VERSION:
+                    return data.get("entries", {})
+        except Exception as e:
+            logging.warning(f"Template önbellek dizini okunamadı: {e}")
+        return {}
+
+    def _save_index(self):
+        """Önbellek dizinini atomik olarak kaydet"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = self._index_path() + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": CACHE_FORMAT_VERSION, "entries": self._index}, f)
+            os.replace(temp_path, self._index_path())
+        except Exception as e:
+            logging.warning(f"Template önbellek dizini kaydedilemedi: {e}")
+
+    def _variant_path(self, sha1: str, variant: str) -> str:
+        return os.path.join(self.cache_dir, f"{sha1}_{variant}.npy")
+
+    def _load_cached_variants(self, sha1: str) -> Optional[Dict[str, np.ndarray]]:
+        """Varyantları diskten bellek eşlemeli olarak aç"""
+        variants = {}
+        try:
+            for variant in VARIANTS:
+                variant_path = self._variant_path(sha1, variant)
+                if os.path.exists(variant_path):
+                    variants[variant] = np.load(variant_path, mmap_mode='r')
+                elif variant in ("bgr", "gray", "edges"):
+                    return None
+        except Exception as e:
+            logging.warning(f"Template önbelleği okunamadı ({sha1}): {e}")
+            return None
+        return variants
+
+    def _remove_unused_variants(self, sha1s) -> int:
+        """Dizinde kullanılmayan özetlerin .npy dosyalarını sil (kilit tutulurken çağrılır)"""
+        in_use = {cached.get("sha1") for cached in self._index.values()}
+        removed = 0
+        for sha1 in set(sha1s) - in_use:
+            if sha1 in self._in_flight:
+                continue
+            for variant in VARIANTS:
+                variant_path = self._variant_path(sha1, variant)
+                try:
+                    if os.path.exists(variant_path):
+                        os.remove(variant_path)
+                        removed += 1
+                except OSError as e:
+                    # Hala eşlenmiş olabilir (Windows); bir sonraki temizlikte tekrar denenir
+                    logging.debug(f"Template önbellek dosyası silinemedi ({variant_path}): {e}")
+        return removed
+
+    def prune_cache(self) -> int:
+        """Kaynağı silinmiş kayıtları ve kullanılmayan varyant dosyalarını temizle, silinen dosya sayısını döndür"""
+        with self._lock:
+            missing = [index_key for index_key in self._index
+                       if not os.path.exists(self._source_path(index_key))]
+            for index_key in missing:
+                del self._index[index_key]
+            if missing:
+                self._save_index()
+
+            try:
+                names = os.listdir(self.cache_dir)
+            except OSError:
+                return 0
+            sha1s = {name.split("_", 1)[0] for name in names if name.endswith(".npy")}
+            return self._remove_unused_variants(sha1s)
+
+    def _write_cached_variants(self, sha1: str, variants: Dict[str, np.ndarray]):
+        """Varyantları diske yaz (yarım dosya kalmaması için geçici dosya ile)"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for variant, array in variants.items():
+                variant_path = self._variant_path(sha1, variant)
+                temp_path = variant_path + ".tmp"
+                with open(temp_path, 'wb') as f:
+                    np.save(f, array)
+                os.replace(temp_path, variant_path)
+        except Exception as e:
+            logging.warning(f"Template önbelleği yazılamadı ({sha1}): {e}")
+
+    # --- Yükleme ---
+
+    def _key(self, path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def _index_key(self, path: str) -> str:
+        """Dizin anahtarı (taşınabilir olması için base_dir'e göre)"""
+        try:
+            return os.path.relpath(path, self.base_dir).replace(os.sep, "/")
+        except ValueError:
+            return path.replace(os.sep, "/")
+
+    def _source_path(self, index_key: str) -> str:
+        """Dizin anahtarından görselin yolu"""
+        return os.path.join(self.base_dir, index_key.replace("/", os.sep))
+
+    def _load_entry(self, path: str, stat: os.stat_result, save_index: bool = True) -> Optional[TemplateEntry]:
+        """Kaydı önbellekten aç veya görseli çözüp önbelleğe yaz (kilit dışında çağrılır)"""
+        index_key = self._index_key(path)
+        with self._lock:
+            cached = self._index.get(index_key)
+
+        if cached and cached.get("mtime") == stat.st_mtime and cached.get("size") == stat.st_size:
+            variants = self._load_cached_variants(cached["sha1"])
+            if variants is not None:
+                with self._lock:
+                    self.stats["disk_loads"] += 1
+                return TemplateEntry(path, stat.st_mtime, stat.st_size, cached["sha1"], variants)
+
+        sha1 = file_sha1(path)
+        with self._lock:
+            self._in_flight[sha1] = self._in_flight.get(sha1, 0) + 1
+
+        try:
+            # Sadece mtime değiştiyse (içerik aynı) mevcut varyantları kullan
+            variants = self._load_cached_variants(sha1)
+            if variants is not None:
+                with self._lock:
+                    self.stats["disk_loads"] += 1
+            else:
+                image = cv2.imread(path, cv2.IMREAD_COLOR)
+                if image is None:
+                    logging.warning(f"Template çözülemedi: {path}")
+                    return None
+                variants = build_variants(image)
+                self._write_cached_variants(sha1, variants)
+                with self._lock:
+                    self.stats["decodes"] += 1
+
+            with self._lock:
+                previous = self._index.get(index_key)
+                self._index[index_key] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha1": sha1}
+                # İçerik değiştiyse eski varyant dosyaları artık kullanılmıyor
+                if previous and previous.get("sha1") != sha1:
+                    self._remove_unused_variants([previous.get("sha1")])
+                if save_index:
+                    self._save_index()
+        finally:
+            with self._lock:
+                remaining = self._in_flight.pop(sha1) - 1
+                if remaining:
+                    self._in_flight[sha1] = remaining
+
+        return TemplateEntry(path, stat.st_mtime, stat.st_size, sha1, variants)
+
+    def _forget_source(self, path: str):
+        """Silinmiş görselin kaydını ve varyant dosyalarını kaldır"""
+        with self._lock:
+            self._entries.pop(self._key(path), None)
+            cached = self._index.pop(self._index_key(path), None)
+            if cached:
+                self._remove_unused_variants([cached.get("sha1")])
+                self._save_index()
+
+    def get_entry(self, path: str) -> Optional[TemplateEntry]:
+        """Template kaydını al (dosya değiştiyse yeniden yükle)"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._forget_source(path)
+            return None
+
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+                self.stats["hits"] += 1
+                return entry
+
+            if entry:
+                self.stats["invalidations"] += 1
+
+        # Çözme kilit dışında: diğer thread'lerin önbellek isabetleri beklemez
+        try:
+            entry = self._load_entry(path, stat)
+        except Exception as e:
+            logging.error(f"Template yüklenemedi {path}: {e}")
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self._entries.pop(key, None)
+            else:
+                self._entries[key] = entry
+        return entry
+
+    def get(self, path: str, variant: str = "bgr") -> Optional[np.ndarray]:
+        """Template'in istenen varyantını al (salt okunur dizi)"""
+        entry = self.get_entry(path)
+        if entry is None:
+            return None
+        return entry.variants.get(variant)
+
+    def gray(self, path: str) -> Optional[np.ndarray]:
+        """Gri tonlamalı varyant"""
+        return self.get(path, "gray")
+
+    def edges(self, path: str) -> Optional[np.ndarray]:
+        """Canny kenar varyantı"""
+        return self.get(path, "edges")
+
+    def pyramid(self, path: str, level: int) -> Optional[np.ndarray]:
+        """Piramit seviyesi (0 = orijinal, her seviye yarı boyut)"""
+        return self.get(path, "bgr" if level == 0 else f"pyr{level}")
+
+    # --- Klasör tarama ---
+
+    def image_paths(self, folders: Sequence[str] = IMAGE_FOLDERS, refresh: bool = False) -> Dict[str, str]:
+        """Klasörlerdeki görselleri {isim: yol} olarak döndür (tarama bir kez yapılır)"""
+        cache_key = tuple(folders)
+        with self._lock:
+            if not refresh and cache_key in self._image_paths:
+                return dict(self._image_paths[cache_key])
+
+            paths = {}
+            for folder in folders:
+                folder_path = os.path.join(self.base_dir, folder)
+                if os.path.exists(folder_path):
+                    for file in sorted(os.listdir(folder_path)):
+                        if file.lower().endswith(TEMPLATE_EXTENSIONS):
+                            name = os.path.splitext(file)[0]
+                            paths[name] = os.path.join(folder_path, file)
+
+            self._image_paths[cache_key] = paths
+            return dict(paths)
+
+    def preload(self, folders: Optional[Sequence[str]] = None) -> int:
+        """Klasörlerdeki tüm template'leri önceden yükle, yüklenen sayıyı döndür
+
+        Kilit sadece kayıt okunurken/yazılırken tutulur; arka planda ön yükleme
+        sürerken eşleştirme yapan thread'ler get() çağrılarında beklemez.
+        """
+        loaded = 0
+        for folder in folders or self.folders:
+            folder_path = os.path.join(self.base_dir, folder)
+            if not os.path.isdir(folder_path):
+                continue
+            for file in sorted(os.listdir(folder_path)):
+                if not file.lower().endswith(TEMPLATE_EXTENSIONS):
+                    continue
+                path = os.path.join(folder_path, file)
+                key = self._key(path)
+                try:
+                    stat = os.stat(path)
+                    with self._lock:
+                        entry = self._entries.get(key)
+                    if not (entry and entry.mtime == stat.st_mtime and entry.size == stat.st_size):
+                        entry = self._load_entry(path, stat, save_index=False)
+                        if entry is None:
+                            continue
+                        with self._lock:
+                            self._entries[key] = entry
+                    loaded += 1
+                except Exception as e:
+                    logging.error(f"Template ön yükleme hatası {path}: {e}")
+
+        with self._lock:
+            self._save_index()
+        self.prune_cache()
+        return loaded
+
+    def clear(self):
+        """Bellek içi kayıtları ve klasör taramasını temizle (disk önbelleği kalır)"""
+        with self._lock:
+            self._entries.clear()
+            self._image_paths.clear()
+
+    def loaded_paths(self) -> List[str]:
+        """Bellekteki template yolları"""
+        with self._lock:
+            return [entry.path for entry in self._entries.values()]
+
+
+# Global template store instance
+template_store = TemplateStore()
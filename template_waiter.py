@@ -0,0 +1,145 @@
+"""
+⏱️ King Bot Pro - Template Bekleyici
+Kare akışı üzerinden bir veya birden fazla template'in görünmesini düşük gecikme ve düşük CPU ile bekler
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import cv2
+
+from frame_bus import Frame, FrameBus, Region, frame_bus, frame_changed
+from template_matcher import MatchResult
+from template_store import template_store
+
+
+DEFAULT_POLL_INTERVAL = 0.1  # ~100 ms görünme gecikmesi
+DEFAULT_WAIT_TIMEOUT = 30.0
+
+WAIT_ANY = "any"  # İlk görünen template yeterli
+WAIT_ALL = "all"  # Tüm template'ler aynı karede görünmeli
+WAIT_MODES = (WAIT_ANY, WAIT_ALL)
+
+
+def match_template_file(frame: Frame, template_name: str, threshold: float = 0.8) -> MatchResult:
+    """Template dosyasını (templates/ klasörüne de bakarak) karede ara"""
+    template_path = template_name
+    if not os.path.exists(template_path):
+        template_path = os.path.join("templates", template_name)
+
+    template = template_store.get(template_path)
+    if template is None:
+        return MatchResult()
+
+    result = cv2.matchTemplate(frame.image, template, cv2.TM_CCOEFF_NORMED)
+    return MatchResult.from_result(result, (template.shape[1], template.shape[0]), threshold, frame.origin)
+
+
+@dataclass
+class WaitResult:
+    """Bekleme sonucu (bool olarak kullanılabilir)"""
+    found: bool
+    matches: Dict[str, MatchResult] = field(default_factory=dict)
+    first: Optional[str] = None
+    elapsed: float = 0.0
+    frames: int = 0           # İncelenen kare sayısı
+    unchanged_frames: int = 0  # Değişmediği için eşleştirme yapılmayan kare sayısı
+    match_calls: int = 0
+
+    def __bool__(self) -> bool:
+        return self.found
+
+
+class TemplateWaiter:
+    """Kare akışında template bekleyici
+
+    Her poll_interval'da veriyolundan (varsa taze kare yeniden kullanılarak)
+    sadece ROI bölgesi alınır. Kare bir öncekiyle aynıysa (aynı sürüm veya
+    karo imzası değişmemiş) eşleştirme yapılmaz; template görününce hemen döner.
+    """
+
+    def __init__(self, bus: FrameBus = frame_bus,
+                 matcher: Callable[[Frame, str, float], MatchResult] = match_template_file,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.bus = bus
+        self.matcher = matcher
+        self.poll_interval = poll_interval
+
+    def wait(self, templates: Union[str, Sequence[str]], timeout: float = DEFAULT_WAIT_TIMEOUT,
+             mode: str = WAIT_ANY, threshold: float = 0.8, region: Optional[Region] = None,
+             poll_interval: Optional[float] = None,
+             cancel_event: Optional[threading.Event] = None) -> WaitResult:
+        """Template(ler) görünene, timeout dolana veya cancel_event set edilene kadar bekle"""
+        if mode not in WAIT_MODES:
+            raise ValueError(f"Bilinmeyen bekleme modu: {mode}")
+
+        names: List[str] = [templates] if isinstance(templates, str) else list(templates)
+        poll_interval = self.poll_interval if poll_interval is None else poll_interval
+        result = WaitResult(found=False)
+        start = time.time()
+        last_version = None
+        last_signature = None
+
+        while True:
+            frame = self.bus.get_frame(region, max_age=poll_interval)
+            if frame is not None:
+                result.frames += 1
+                if frame.version == last_version or (
+                        last_signature is not None and not frame_changed(last_signature, frame.signature)):
+                    # Kare değişmedi: önceki eşleştirme sonucu geçerli
+                    result.unchanged_frames += 1
+                else:
+                    last_version = frame.version
+                    last_signature = frame.signature
+                    if self._check(frame, names, mode, threshold, result):
+                        result.found = True
+                        break
+
+            elapsed = time.time() - start
+            if elapsed >= timeout:
+                break
+
+            delay = min(poll_interval, timeout - elapsed)
+            if cancel_event is not None:
+                if cancel_event.wait(delay):
+                    break
+            else:
+                time.sleep(delay)
+
+        result.elapsed = time.time() - start
+        return result
+
+    def _check(self, frame: Frame, names: List[str], mode: str, threshold: float, result: WaitResult) -> bool:
+        """Karede template'leri ara; mod koşulu sağlandıysa True"""
+        matches: Dict[str, MatchResult] = {}
+        for name in names:
+            result.match_calls += 1
+            found = self.matcher(frame, name, threshold)
+            if found:
+                matches[name] = found
+                if mode == WAIT_ANY:
+                    break
+            elif mode == WAIT_ALL:
+                return False
+
+        if not matches:
+            return False
+
+        result.matches = matches
+        result.first = next(iter(matches))
+        return True
+
+    def wait_any(self, templates: Sequence[str], timeout: float = DEFAULT_WAIT_TIMEOUT, **kwargs) -> WaitResult:
+        """Template'lerden herhangi biri görünene kadar bekle"""
+        return self.wait(templates, timeout, WAIT_ANY, **kwargs)
+
+    def wait_all(self, templates: Sequence[str], timeout: float = DEFAULT_WAIT_TIMEOUT, **kwargs) -> WaitResult:
+        """Tüm template'ler aynı karede görünene kadar bekle"""
+        return self.wait(templates, timeout, WAIT_ALL, **kwargs)
+
+
+# Global template waiter instance
+template_waiter = TemplateWaiter()
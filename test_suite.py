@@ -9,6 +9,7 @@ import os
 import unittest
 import logging
 import time
+import threading
 from unittest.mock import Mock, patch, MagicMock
 
 # Ana dizini path'e ekle
@@ -60,6 +61,22 @@ class TestAdvancedSequences(unittest.TestCase):
         )
         self.assertTrue(result)
 
+    def test_backoff_never_shorter_than_cooldown(self):
+        """Genelde başarılı sequence'in başarısızlıktan sonra cooldown'dan erken denenmemesi testi"""
+        from adaptive_backoff import BackoffPolicy
+        from advanced_sequences import AdvancedSequenceManager
+
+        manager = AdvancedSequenceManager(BackoffPolicy(base_delay=300, jitter=0))
+        for _ in range(19):
+            manager.update_sequence_stats("gather", True, 1.0)
+        manager.update_sequence_stats("gather", False, 1.0)
+        self.assertLess(manager.backoff_delays["gather"], 300)
+
+        manager.last_execution_times["gather"] = time.time() - 200
+        self.assertTrue(manager.should_skip_sequence("gather", cooldown_minutes=5))
+        manager.last_execution_times["gather"] = time.time() - 301
+        self.assertFalse(manager.should_skip_sequence("gather", cooldown_minutes=5))
+
 class TestAdvancedTaskManager(unittest.TestCase):
     """Gelişmiş görev yöneticisi testleri"""
     
@@ -90,6 +107,562 @@ class TestAdvancedTaskManager(unittest.TestCase):
         self.assertTrue(result)
         self.assertNotIn("test_task", self.task_manager.tasks)
 
+    def test_event_driven_dispatch(self):
+        """Yeni göreve anında geçiş ve boşta uyuma testi"""
+        import threading
+        from advanced_task_manager import AdvancedTask
+
+        passes = []
+        scheduling_pass = self.task_manager._scheduling_pass
+        self.task_manager._scheduling_pass = lambda now: (passes.append(now), scheduling_pass(now))
+        self.task_manager.start()
+        self.addCleanup(self.task_manager.stop)
+
+        # Boşta iken worker uyumaz-uyanır döngüsüne girmez
+        time.sleep(0.3)
+        self.assertLessEqual(len(passes), 2)
+
+        done = threading.Event()
+        submitted = time.time()
+        self.task_manager.add_task(AdvancedTask("instant", lambda: done.set() or True))
+        self.assertTrue(done.wait(1.0))
+        self.assertLess(time.time() - submitted, 0.1)
+
+    def test_timed_task_heap_schedule(self):
+        """Zamanlı görevin heap ile periyodik çalışması testi"""
+        from advanced_task_manager import AdvancedTask
+
+        runs = []
+        self.task_manager.add_task(AdvancedTask("timed", lambda: runs.append(time.time()) or True,
+                                                is_timed=True, interval=0.1))
+        self.task_manager.start()
+        self.addCleanup(self.task_manager.stop)
+
+        time.sleep(0.45)
+        self.assertGreaterEqual(len(runs), 3)
+        self.assertLessEqual(len(runs), 6)
+        self.assertTrue(all(b - a >= 0.09 for a, b in zip(runs, runs[1:])))
+
+    def test_queue_deduplication(self):
+        """Görevin sıraya yalnızca bir kez alınması testi"""
+        from advanced_task_manager import AdvancedTask
+
+        runs = []
+        self.task_manager.add_task(AdvancedTask("once", lambda: runs.append(1) or True))
+        self.task_manager.resume_task("once")
+        self.task_manager.resume_task("once")
+
+        metrics = self.task_manager.get_queue_metrics()
+        self.assertEqual(metrics["ready_depth"], 1)
+        self.assertEqual(metrics["duplicates_skipped"], 2)
+
+        # Yeniden planlanan zamanlı görevin eski heap kaydı atlanır
+        self.task_manager.add_task(AdvancedTask("timed", lambda: True, is_timed=True, interval=60))
+        self.task_manager.resume_task("timed")
+        self.assertEqual(self.task_manager.get_queue_metrics()["timed_pending"], 1)
+
+        self.task_manager.start()
+        self.addCleanup(self.task_manager.stop)
+        time.sleep(0.3)
+
+        self.assertEqual(runs, [1])
+        metrics = self.task_manager.get_queue_metrics()
+        self.assertEqual(metrics["ready_depth"], 0)
+        self.assertEqual(metrics["stale_entries_skipped"], 1)
+
+    def test_resume_keeps_next_execution_time(self):
+        """Vakti gelmemiş zamanlı görevin devam ettirilince kendi vaktine planlanması testi"""
+        from advanced_task_manager import AdvancedTaskManager, AdvancedTask
+
+        now = [100.0]
+        manager = AdvancedTaskManager(clock=lambda: now[0])
+        task = AdvancedTask("timed", lambda: True, is_timed=True, interval=60)
+        task.next_execution_time = 160.0
+        manager.add_task(task)
+        manager.pause_task("timed")
+        manager.resume_task("timed")
+
+        self.assertEqual(manager.next_wakeup_time(), 160.0)
+        self.assertEqual(manager.get_queue_metrics()["ready_depth"], 0)
+
+    def test_worker_pool_cooperative_timeout(self):
+        """Sabit worker havuzu ve işbirlikçi zaman aşımı testi"""
+        from advanced_task_manager import AdvancedTask, TaskStatus
+
+        def slow(cancel_event):
+            cancel_event.wait(5.0)
+            return True
+
+        for index in range(6):
+            self.task_manager.add_task(AdvancedTask(f"quick_{index}", lambda: True))
+        self.task_manager.add_task(AdvancedTask("slow", slow, timeout=0.2, max_retries=1, retry_delay=0.1))
+        self.task_manager.start()
+        self.addCleanup(self.task_manager.stop)
+
+        time.sleep(0.8)
+        workers = [t for t in threading.enumerate() if t.name.startswith("task-worker")]
+        self.assertLessEqual(len(workers), self.task_manager.max_concurrent_tasks)
+
+        slow_task = self.task_manager.tasks["slow"]
+        self.assertEqual(slow_task.stats.total_executions, 2)
+        self.assertEqual(slow_task.status, TaskStatus.TIMEOUT)
+        self.assertFalse(slow_task.cancel_event.is_set())
+        self.assertTrue(all(self.task_manager.tasks[f"quick_{i}"].status == TaskStatus.SUCCESS for i in range(6)))
+
+    def test_resource_admission(self):
+        """Fare kullanan görevlerin tek tek, CPU görevlerinin paralel çalışması testi"""
+        from advanced_task_manager import AdvancedTask, RESOURCE_CPU_VISION
+
+        active = {"input": 0, "vision": 0}
+        peaks = {"input": 0, "vision": 0, "overlap": 0}
+        lock = threading.Lock()
+
+        def work(kind):
+            with lock:
+                active[kind] += 1
+                peaks[kind] = max(peaks[kind], active[kind])
+                if active["input"] and active["vision"]:
+                    peaks["overlap"] += 1
+            time.sleep(0.1)
+            with lock:
+                active[kind] -= 1
+            return True
+
+        for index in range(3):
+            self.task_manager.add_task(AdvancedTask(f"click_{index}", work, args=["input"]))
+        for index in range(2):
+            self.task_manager.add_task(AdvancedTask(f"vision_{index}", work, args=["vision"],
+                                                    resources=[RESOURCE_CPU_VISION]))
+        self.task_manager.start()
+        self.addCleanup(self.task_manager.stop)
+
+        time.sleep(0.6)
+        self.assertEqual(peaks["input"], 1)
+        self.assertEqual(peaks["vision"], 2)
+        self.assertGreater(peaks["overlap"], 0)
+        self.assertEqual(self.task_manager.get_resource_usage(), {})
+
+    def test_dependency_graph_dispatch(self):
+        """Bağımlılık grafiğine göre sıralama ve döngü tespiti testi"""
+        from advanced_task_manager import AdvancedTask
+
+        order = []
+        self.task_manager.add_task(AdvancedTask("c", lambda: order.append("c") or True, dependencies=["b"]))
+        self.task_manager.add_task(AdvancedTask("b", lambda: order.append("b") or True, dependencies=["a"]))
+
+        # Bağımlılığı bekleyen görevler hazır sırasında durmaz
+        metrics = self.task_manager.get_queue_metrics()
+        self.assertEqual(metrics["ready_depth"], 0)
+        self.assertEqual(metrics["waiting_on_dependencies"], 2)
+
+        # a -> c bağımlılığı döngü oluşturur
+        self.assertFalse(self.task_manager.add_task(AdvancedTask("a", lambda: True, dependencies=["c"])))
+        self.assertFalse(self.task_manager.add_task(AdvancedTask("self", lambda: True, dependencies=["self"])))
+
+        self.task_manager.add_task(AdvancedTask("a", lambda: order.append("a") or True))
+        self.task_manager.start()
+        self.addCleanup(self.task_manager.stop)
+        time.sleep(0.3)
+
+        self.assertEqual(order, ["a", "b", "c"])
+        metrics = self.task_manager.get_queue_metrics()
+        self.assertEqual(metrics["waiting_on_dependencies"], 0)
+        self.assertEqual(metrics["enqueued"], 3)
+
+    def test_incremental_stats(self):
+        """Artımlı istatistikler ve seyreltilmiş UI bildirimi testi"""
+        import numpy as np
+        from advanced_task_manager import AdvancedTaskManager, AdvancedTask, RunningStats, LatencyHistogram
+
+        samples = [0.02, 0.3, 0.07, 1.2, 0.5]
+        running = RunningStats()
+        histogram = LatencyHistogram()
+        for value in samples:
+            running.add(value)
+            histogram.add(value)
+        self.assertAlmostEqual(running.mean, np.mean(samples))
+        self.assertAlmostEqual(running.variance, np.var(samples, ddof=1))
+        self.assertEqual(histogram.percentile(50), 0.5)
+        self.assertEqual(histogram.percentile(100), 2.5)
+
+        updates = []
+        manager = AdvancedTaskManager(on_stats_update=updates.append, stats_update_interval=10.0)
+        for index in range(20):
+            manager.add_task(AdvancedTask(f"task_{index}", lambda: True, resources=[]))
+        manager.start()
+        time.sleep(0.3)
+        manager.stop()
+
+        # İlk bildirim hemen, kalanlar aralık dolmadan tek bildirimde birleşir
+        self.assertLessEqual(len(updates), 2)
+        self.assertEqual(updates[-1]["total_tasks_executed"], 20)
+        self.assertEqual(manager.get_global_stats()["task_time_histogram"]["buckets"]["<=0.05"], 20)
+
+    def test_state_store_warm_restart(self):
+        """Kalıcı görev durumu ile kaldığı yerden devam testi"""
+        import tempfile
+        from advanced_task_manager import AdvancedTaskManager, AdvancedTask, TaskStatus
+        from task_state_store import TaskStateStore
+
+        db_path = os.path.join(tempfile.mkdtemp(), "state.db")
+        runs = []
+
+        store = TaskStateStore(db_path)
+        manager = AdvancedTaskManager(state_store=store)
+        manager.add_task(AdvancedTask("timed", lambda: runs.append(1) or True, is_timed=True, interval=60))
+        manager.start()
+        time.sleep(0.2)
+        manager.stop()
+        store.close()
+        self.assertEqual(runs, [1])
+        next_time = manager.tasks["timed"].next_execution_time
+
+        # Yeniden başlatma: görev hemen tekrar çalışmaz, geçmiş korunur
+        store = TaskStateStore(db_path)
+        self.addCleanup(store.close)
+        manager = AdvancedTaskManager(state_store=store)
+        task = AdvancedTask("timed", lambda: runs.append(2) or True, is_timed=True, interval=60)
+        manager.add_task(task)
+        manager.start()
+        self.addCleanup(manager.stop)
+        time.sleep(0.2)
+
+        self.assertEqual(runs, [1])
+        self.assertAlmostEqual(task.next_execution_time, next_time)
+        self.assertEqual(task.stats.total_executions, 1)
+        self.assertEqual(task.results_history[-1].status, TaskStatus.SUCCESS)
+        self.assertEqual(manager.get_queue_metrics()["timed_pending"], 1)
+
+        # Kaldırılan görevin kayıtları silinir
+        manager.remove_task("timed")
+        self.assertNotIn("timed", store.load_all())
+
+    def test_adaptive_backoff(self):
+        """Jitter'lı üstel geri çekilme ve başarı oranına göre ölçekleme testi"""
+        import random
+        from adaptive_backoff import BackoffPolicy, backoff_delay, record_hourly_result
+        from advanced_task_manager import AdvancedTask
+
+        self.assertEqual([backoff_delay(1.0, attempt, jitter=0) for attempt in (1, 2, 3)], [1.0, 2.0, 4.0])
+        self.assertEqual(backoff_delay(1.0, 10, max_delay=30, jitter=0), 30)
+        for _ in range(20):
+            self.assertTrue(1.6 <= backoff_delay(1.0, 2, jitter=0.2) <= 2.4)
+
+        policy = BackoffPolicy(base_delay=60, max_delay=3600, jitter=0, rng=random.Random(1))
+        rare = {'total_runs': 10, 'successful_runs': 1}
+        common = {'total_runs': 10, 'successful_runs': 9}
+        self.assertGreater(policy.next_delay(2, rare), policy.next_delay(2, common))
+        self.assertEqual(policy.next_delay(0, rare), 0.0)
+
+        # Bu saatte yeterli veri varsa genel orandan önceliklidir
+        hourly = dict(common)
+        for _ in range(5):
+            record_hourly_result(hourly, False, hour=3)
+        self.assertAlmostEqual(policy.next_delay(1, hourly, hour=3), 90.0)
+        self.assertAlmostEqual(policy.next_delay(1, hourly, hour=4), 60 * 0.6)
+
+        task = AdvancedTask("retry", lambda: False, retry_delay=1.0, retry_jitter=0)
+        task.current_retries = 3
+        self.assertEqual(task.next_retry_delay(), 4.0)
+
+    def test_edf_policy_and_lateness(self):
+        """En erken son tarih politikası ve gecikme raporu testi"""
+        from advanced_task_manager import AdvancedTaskManager, AdvancedTask, POLICY_EDF
+
+        order = []
+
+        def run(name):
+            order.append(name)
+            time.sleep(0.05)
+            return True
+
+        manager = AdvancedTaskManager(scheduling_policy=POLICY_EDF)
+        for name, interval in (("bekcikulesi", 720), ("ittifak", 120), ("healing", 60)):
+            manager.add_task(AdvancedTask(name, run, args=[name], is_timed=True, interval=interval))
+        manager.start()
+        self.addCleanup(manager.stop)
+        time.sleep(0.4)
+
+        self.assertEqual(order, ["healing", "ittifak", "bekcikulesi"])
+        report = manager.get_lateness_report()
+        self.assertEqual(set(report), {"healing", "ittifak", "bekcikulesi"})
+        self.assertGreater(report["bekcikulesi"]["max"], report["healing"]["max"])
+        self.assertRaises(ValueError, AdvancedTaskManager, scheduling_policy="fifo")
+
+    def test_lateness_counts_zero_due_time(self):
+        """Sanal saatte 0 anında sıraya alınan görevin gecikmesinin ölçülmesi testi"""
+        from advanced_task_manager import AdvancedTaskManager, AdvancedTask
+
+        now = [0.0]
+        done = threading.Event()
+        manager = AdvancedTaskManager(clock=lambda: now[0])
+        manager.add_task(AdvancedTask("zero", done.set))
+        now[0] = 2.0
+        manager.start()
+        self.addCleanup(manager.stop)
+
+        self.assertTrue(done.wait(1.0))
+        self.assertEqual(manager.get_lateness_report()["zero"]["max"], 2.0)
+
+class TestSchedulerSimulation(unittest.TestCase):
+    """Sanal saatli zamanlayıcı simülasyonu testleri"""
+
+    def test_simulation_is_deterministic(self):
+        """Aynı tohumla aynı sonuç ve sabit thread sayısı testi"""
+        from scheduler_simulation import make_synthetic_tasks, run_simulation
+
+        specs = make_synthetic_tasks(15, seed=3, failure_rate=0.2, dependency_rate=0.3)
+        threads_before = threading.active_count()
+        first = run_simulation(specs, horizon=1800, seed=3)
+        second = run_simulation(specs, horizon=1800, seed=3)
+
+        for report in (first, second):
+            report.pop("scheduler_pass_us")
+        self.assertEqual(first, second)
+        self.assertGreater(first["tasks_completed"], len(specs))
+        self.assertEqual(first["queue_metrics"]["duplicates_skipped"], 0)
+        self.assertEqual(threading.active_count(), threads_before)
+
+    def test_simulation_respects_dependencies(self):
+        """Bağımlı görevin hazır sırasında beklemeden bağımlılığından sonra başlaması testi"""
+        from scheduler_simulation import SyntheticTaskSpec, run_simulation
+
+        specs = [
+            SyntheticTaskSpec("child", duration=5, dependencies=["parent"]),
+            SyntheticTaskSpec("parent", duration=30),
+        ]
+        report = run_simulation(specs, horizon=100)
+
+        self.assertEqual(report["tasks_completed"], 2)
+        self.assertEqual(report["dispatch_latency"]["max"], 0.0)
+        self.assertEqual(report["queue_metrics"]["max_ready_depth"], 1)
+        self.assertEqual(report["queue_metrics"]["waiting_on_dependencies"], 0)
+
+class TestMacroCompiler(unittest.TestCase):
+    """Makro derleyici testleri"""
+
+    def setUp(self):
+        from macro_compiler import MacroCompiler
+
+        self.compiler = MacroCompiler(["click", "wait", "variable"],
+                                      ["variable_equals", "variable_less", "template_exists"])
+        self.calls = []
+
+    def run_macro(self, actions, variables=None, fail_types=(), **run_kwargs):
+        from types import SimpleNamespace
+
+        context = SimpleNamespace(variables=dict(variables or {}), loop_stack=[], execution_log=[],
+                                  current_action=None, error_count=0, success_count=0)
+
+        def run_action(action_type, params, ctx):
+            self.calls.append((action_type, params))
+            if action_type == "variable":
+                ctx.variables[params["name"]] = ctx.variables.get(params["name"], 0) + params["value"]
+            return action_type not in fail_types
+
+        def check_condition(condition, ctx):
+            value = ctx.variables.get(condition["variable"], 0)
+            if condition["type"] == "variable_less":
+                return value < condition["value"]
+            return value == condition["value"]
+
+        result = self.compiler.compile(actions).run(context, run_action, check_condition, **run_kwargs)
+        return result, context
+
+    def test_loops_and_conditions(self):
+        """Düz komut listesinde döngü ve koşul akışı testi"""
+        actions = [
+            {"id": "loop", "action_type": "loop", "parameters": {"type": "count", "count": 3, "actions": [
+                {"id": "inc", "action_type": "variable", "parameters": {"name": "n", "value": 1}},
+                {"id": "click", "action_type": "click", "parameters": {"x": "{loop_index}", "y": 5}},
+            ]}},
+            {"id": "while", "action_type": "loop", "parameters": {
+                "type": "while", "condition": {"type": "variable_less", "variable": "n", "value": 5},
+                "actions": [{"id": "inc2", "action_type": "variable", "parameters": {"name": "n", "value": 1}}]}},
+            {"id": "cond", "action_type": "condition", "parameters": {
+                "condition": {"type": "variable_equals", "variable": "n", "value": 5},
+                "true_actions": [{"id": "yes", "action_type": "wait", "parameters": {"duration": 0}}],
+                "false_actions": [{"id": "no", "action_type": "click", "parameters": {}}]}},
+        ]
+        result, context = self.run_macro(actions)
+
+        self.assertTrue(result)
+        self.assertEqual(context.variables["n"], 5)
+        self.assertEqual([params["x"] for kind, params in self.calls if kind == "click"], ["0", "1", "2"])
+        self.assertEqual(self.calls[-1][0], "wait")
+        self.assertEqual(context.loop_stack, [])
+        self.assertEqual(context.success_count, 3 * 2 + 2 + 1 + 3)
+
+    def test_loop_test_hook(self):
+        """Her while koşulu değerlendirmesinden önce kanca çağrılması testi"""
+        tests = []
+        actions = [{"id": "while", "action_type": "loop", "parameters": {
+            "type": "while", "condition": {"type": "variable_less", "variable": "n", "value": 3},
+            "actions": [{"id": "inc", "action_type": "variable", "parameters": {"name": "n", "value": 1}}]}}]
+        result, context = self.run_macro(actions, on_loop_test=lambda ctx: tests.append(ctx.variables.get("n", 0)))
+
+        self.assertTrue(result)
+        self.assertEqual(tests, [0, 1, 2, 3])
+
+    def test_static_params_and_validation(self):
+        """Yer tutucusuz parametrelerin kopyalanmaması ve derleme doğrulaması testi"""
+        from macro_compiler import MacroCompileError, ParamTemplate
+
+        static = ParamTemplate({"x": 10, "keys": ["a", "b"]})
+        self.assertTrue(static.is_static)
+        self.assertIs(static.resolve({"x": 1}), static.params)
+
+        dynamic = ParamTemplate({"text": "{name}-{unknown}"})
+        self.assertFalse(dynamic.is_static)
+        self.assertEqual(dynamic.resolve({"name": "kral"}), {"text": "kral-{unknown}"})
+
+        with self.assertRaises(MacroCompileError):
+            self.compiler.compile([{"id": "x", "action_type": "teleport", "parameters": {}}])
+        with self.assertRaises(MacroCompileError):
+            self.compiler.compile([{"id": "c", "action_type": "condition",
+                                    "parameters": {"condition": {"type": "moon_phase"}}}])
+
+    def test_critical_failure_and_retry(self):
+        """Kritik hatanın bloğu, break_on_error'ın döngüyü bitirmesi testi"""
+        actions = [
+            {"id": "loop", "action_type": "loop", "parameters": {
+                "type": "count", "count": 5, "break_on_error": True, "critical": True, "actions": [
+                    {"id": "fail", "action_type": "click", "parameters": {"critical": True}, "max_retries": 1}]}},
+            {"id": "after", "action_type": "wait", "parameters": {}},
+        ]
+        result, context = self.run_macro(actions, fail_types=("click",))
+
+        self.assertFalse(result)
+        self.assertEqual([kind for kind, params in self.calls], ["click", "click"])
+        self.assertEqual(context.error_count, 2)
+        self.assertEqual(context.loop_stack, [])
+
+    def test_retry_budget_per_iteration(self):
+        """Döngü gövdesindeki aksiyonun her turda yeniden deneme hakkı olması testi"""
+        actions = [{"id": "loop", "action_type": "loop", "parameters": {"type": "count", "count": 6, "actions": [
+            {"id": "fail", "action_type": "click", "parameters": {}, "max_retries": 3}]}}]
+        result, context = self.run_macro(actions, fail_types=("click",))
+
+        self.assertTrue(result)
+        self.assertEqual(len(self.calls), 12)
+
+    def test_template_names_resolved_at_compile_time(self):
+        """Sabit template isimlerinin derlemede yola çevrilmesi testi"""
+        from macro_compiler import MacroCompiler
+
+        resolved = []
+        compiler = MacroCompiler(["template_find"], ["template_exists"],
+                                 resolve_template=lambda name: resolved.append(name) or f"templates/{name}")
+        compiled = compiler.compile([
+            {"id": "a", "action_type": "template_find", "parameters": {"template": "ok.png"}},
+            {"id": "b", "action_type": "template_find", "parameters": {"template": "{button}.png"}},
+            {"id": "w", "action_type": "loop", "parameters": {
+                "type": "while", "condition": {"type": "template_exists", "template": "hp.png"}, "actions": []}},
+        ])
+
+        self.assertEqual(resolved, ["ok.png", "hp.png"])
+        self.assertEqual(compiled.instructions[0].params.params["template"], "templates/ok.png")
+        self.assertEqual(compiled.instructions[1].params.params["template"], "{button}.png")
+        loop_start = compiled.instructions[2]
+        self.assertEqual(loop_start.params.params["condition"]["template"], "templates/hp.png")
+
+    def test_compile_state_is_per_call(self):
+        """Aynı derleyicide iç içe/eşzamanlı derlemenin birbirini bozmaması testi"""
+        from macro_compiler import MacroCompiler
+
+        def loop(count, name):
+            return {"id": name, "action_type": "loop", "parameters": {"type": "count", "count": count, "actions": [
+                {"id": f"{name}_inc", "action_type": "variable", "parameters": {"name": name, "value": 1}}]}}
+
+        inner = []
+
+        def resolve(template):
+            # Dış derleme ortasında ikinci bir derleme
+            inner.append(self.compiler.compile([loop(4, "z")]))
+            return template
+
+        self.compiler = MacroCompiler(["variable", "template_find"], [], resolve_template=resolve)
+        result, context = self.run_macro([
+            loop(2, "x"),
+            {"id": "find", "action_type": "template_find", "parameters": {"template": "ok.png"}},
+            loop(3, "y"),
+        ])
+
+        self.assertTrue(result)
+        self.assertEqual((context.variables["x"], context.variables["y"]), (2, 3))
+        self.assertEqual(inner[0].slot_count, 1)
+        self.assertTrue(inner[0].run(context, lambda *args: True, lambda *args: True))
+
+
+class TestMacroRunner(unittest.TestCase):
+    """Makro çalıştırma kaydı testleri"""
+
+    def setUp(self):
+        from macro_runner import MacroRunner
+
+        self.runner = MacroRunner(max_concurrent=2)
+        self.addCleanup(self.runner.shutdown)
+
+    def test_bindings_serialize_and_parallelize(self):
+        """Aynı emülatörde sıralı, farklı emülatörlerde paralel çalışma testi"""
+        from macro_runner import RUN_COMPLETED
+
+        active = {}
+        peaks = {}
+        lock = threading.Lock()
+
+        def work(run):
+            with lock:
+                active[run.binding] = active.get(run.binding, 0) + 1
+                peaks[run.binding] = max(peaks.get(run.binding, 0), active[run.binding])
+                peaks["total"] = max(peaks.get("total", 0), sum(active.values()))
+            time.sleep(0.1)
+            with lock:
+                active[run.binding] -= 1
+            return True
+
+        runs = [self.runner.submit("macro", work, binding=binding) for binding in ("A", "A", "B")]
+        self.assertEqual(len({run.run_id for run in runs}), 3)
+        for run in runs:
+            self.assertTrue(self.runner.wait(run.run_id, 2.0))
+
+        self.assertEqual(peaks["A"], 1)
+        self.assertEqual(peaks["total"], 2)
+
+        # Sırada bekleyen ikinci A havuz thread'i tutmaz: B ilk A ile birlikte başlar
+        first_a, second_a, b = runs
+        self.assertLess(b.started_at, first_a.finished_at)
+        self.assertGreaterEqual(second_a.started_at, first_a.finished_at)
+        self.assertTrue(all(run.status == RUN_COMPLETED for run in runs))
+        self.assertEqual(self.runner.active_runs(), [])
+
+    def test_cooperative_cancellation(self):
+        """İptalin çalışan ve bekleyen çalıştırmaları durdurması testi"""
+        from macro_runner import RUN_CANCELLED
+
+        steps = []
+
+        def work(run):
+            for step in range(50):
+                if run.cancel_event.wait(0.02):
+                    return False
+                steps.append(step)
+            return True
+
+        running = self.runner.submit("macro", work, binding="A")
+        queued = self.runner.submit("macro", work, binding="A")
+        time.sleep(0.1)
+
+        self.assertEqual(self.runner.cancel_macro("macro"), 2)
+        self.runner.wait(running.run_id, 2.0)
+        self.runner.wait(queued.run_id, 2.0)
+
+        self.assertEqual(running.status, RUN_CANCELLED)
+        self.assertEqual(queued.status, RUN_CANCELLED)
+        self.assertIsNone(queued.started_at)
+        self.assertLess(len(steps), 50)
+        self.assertFalse(self.runner.cancel(running.run_id))
+
 class TestEnhancedUtils(unittest.TestCase):
     """Gelişmiş yardımcı fonksiyon testleri"""
     
@@ -156,6 +729,682 @@ class TestImageRecognition(unittest.TestCase):
         screenshot = self.image_recognition.get_fresh_screenshot()
         self.assertIsNotNone(screenshot)
 
+    def test_match_cache_gated_by_search_tiles(self):
+        """Eşleşme önbelleğinin sadece arama bölgesinin karoları değişince yenilenmesi testi"""
+        import enhanced_utils
+        from frame_bus import FrameBus
+
+        template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "savas", "savas1.png")
+        scene, _ = compose_test_scene({"savas/savas1.png": (50, 60)}, size=(300, 400))
+        bus = FrameBus(tick=60.0)
+
+        def show(image):
+            bus.invalidate()
+            bus.publish(image)
+
+        def find(**kwargs):
+            return self.image_recognition.find_template_matches(template_path, confidence=0.95, **kwargs)
+
+        search_region = (0, 0, 200, 200)
+        with patch.object(enhanced_utils, "frame_bus", bus):
+            show(scene)
+            first = find(search_region=search_region)
+            self.assertEqual(first[0][:2], (50 + 91 // 2, 60 + 89 // 2))
+            self.assertEqual(find(), first)
+
+            # Arama bölgesi dışında değişiklik: bölgeli kayıt önbellekten, tam kare kaydı yeniden
+            changed = scene.copy()
+            changed[250:, 300:] = 0
+            show(changed)
+            self.assertEqual(find(search_region=search_region), first)
+            self.assertEqual(self.image_recognition.get_match_cache_stats()["hits"], 1)
+            self.assertEqual(find(), first)
+            self.assertEqual(self.image_recognition.get_match_cache_stats()["misses"], 3)
+
+            # Arama bölgesi içinde değişiklik: yeniden eşleştirilir
+            changed = changed.copy()
+            changed[60:149, 50:141] = 0
+            show(changed)
+            self.assertEqual(find(search_region=search_region), [])
+            self.assertEqual(self.image_recognition.get_match_cache_stats()["misses"], 4)
+
+class TestFrameBus(unittest.TestCase):
+    """Ortak kare veriyolu testleri"""
+
+    def setUp(self):
+        import numpy as np
+        from frame_bus import FrameBus
+
+        self.grab_count = 0
+
+        def fake_grab(region=None):
+            self.grab_count += 1
+            time.sleep(0.01)
+            if region:
+                return np.zeros((region[3], region[2], 3), dtype=np.uint8)
+            return np.zeros((40, 60, 3), dtype=np.uint8)
+
+        self.bus = FrameBus(tick=1.0, grab_func=fake_grab)
+
+    def test_frames_shared_within_tick(self):
+        """Aynı tick içinde tek yakalama testi"""
+        first = self.bus.get_frame()
+        second = self.bus.get_frame()
+
+        self.assertIs(first, second)
+        self.assertEqual(self.grab_count, 1)
+
+    def test_concurrent_requests_single_capture(self):
+        """Eşzamanlı isteklerin tek yakalamayı paylaşması testi"""
+        import threading
+
+        frames = []
+        threads = [threading.Thread(target=lambda: frames.append(self.bus.get_frame())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.grab_count, 1)
+        self.assertEqual(len({frame.version for frame in frames}), 1)
+
+    def test_frame_is_immutable_and_versioned(self):
+        """Kare değiştirilemezlik ve sürüm testi"""
+        first = self.bus.get_frame()
+        second = self.bus.get_frame(max_age=0)
+
+        self.assertFalse(first.image.flags.writeable)
+        self.assertEqual(second.version, first.version + 1)
+        self.assertEqual(first.crop((10, 5, 20, 15)).shape, (15, 20, 3))
+
+    def test_region_capture_keeps_screen_coordinates(self):
+        """Bölge yakalama ve mutlak koordinat testi"""
+        from frame_bus import game_area_to_region
+
+        region = game_area_to_region([1227, 30, 1797, 1040])
+        self.assertEqual(region, (1227, 30, 570, 1010))
+
+        frame = self.bus.get_frame(region)
+        self.assertEqual(frame.image.shape, (1010, 570, 3))
+        self.assertEqual(frame.to_screen(10, 20), (1237, 50))
+        self.assertEqual(frame.crop((1237, 50, 30, 40)).shape, (40, 30, 3))
+
+    def test_region_cache_crop_and_invalidate(self):
+        """Bölge önbelleği, üst kareden kesme ve girdi sonrası geçersiz kılma testi"""
+        game_area = (1227, 30, 570, 1010)
+        full = self.bus.get_frame(game_area)
+        button = self.bus.get_frame((1300, 100, 50, 40))
+
+        # Alt bölge yeni yakalama olmadan büyük kareden kesilir
+        self.assertEqual(self.grab_count, 1)
+        self.assertEqual(self.bus.stats["crops"], 1)
+        self.assertEqual(button.version, full.version)
+        self.assertEqual(button.origin, (1300, 100))
+        self.assertEqual(button.image.shape, (40, 50, 3))
+
+        # Kapsanmayan bölge ayrı yakalanır
+        self.bus.get_frame((0, 0, 100, 100))
+        self.assertEqual(self.grab_count, 2)
+
+        # Tıklama sonrası yeni kare
+        self.bus.invalidate()
+        self.assertGreater(self.bus.get_frame(game_area).version, full.version)
+        self.assertEqual(self.grab_count, 3)
+
+    def test_invalidate_during_capture_and_ttl(self):
+        """Yakalama sırasında geçersiz kılma ve bölge TTL testi"""
+        import numpy as np
+        from frame_bus import FrameBus
+
+        bus = FrameBus(tick=10.0, ttls={(0, 0, 10, 10): 0})
+
+        def grab(region=None):
+            # Yakalama sürerken girdi geldi
+            bus.invalidate()
+            return np.zeros((10, 10, 3), dtype=np.uint8)
+
+        bus._grab_func = grab
+        self.assertIsNotNone(bus.get_frame())
+        self.assertIsNone(bus.latest())
+
+        bus._grab_func = lambda region=None: np.zeros((10, 10, 3), dtype=np.uint8)
+        first = bus.get_frame((0, 0, 10, 10))
+        self.assertNotEqual(bus.get_frame((0, 0, 10, 10)).version, first.version)
+        self.assertEqual(bus.ttl_for((5, 5, 1, 1)), 10.0)
+
+    def test_crop_not_cached_after_input(self):
+        """Kesit alınırken girdi olursa kesitin önbelleğe yazılmaması testi"""
+        import numpy as np
+        from frame_bus import Frame, FrameBus
+
+        bus = FrameBus(tick=10.0)
+        bus.publish(np.zeros((100, 100, 3), dtype=np.uint8))
+        original_crop = Frame.crop
+
+        def crop_during_input(frame, region):
+            bus.invalidate()
+            return original_crop(frame, region)
+
+        with patch.object(Frame, "crop", crop_during_input):
+            self.assertIsNotNone(bus.get_frame((10, 10, 20, 20)))
+        self.assertIsNone(bus.latest((10, 10, 20, 20)))
+
+    def test_replay_capture_backend(self):
+        """Kayıttan yakalama arka ucu ile frame bus testi"""
+        import numpy as np
+        from capture_backends import CaptureBackend, ReplayBackend, create_backend
+        from frame_bus import FrameBus
+
+        screens = [np.full((200, 300, 3), value, dtype=np.uint8) for value in (10, 20)]
+        screens[0][50:60, 100:120] = 255
+        bus = FrameBus(tick=10.0, backend=ReplayBackend(screens))
+
+        frame = bus.get_frame((100, 50, 20, 10))
+        self.assertEqual(frame.origin, (100, 50))
+        self.assertTrue((frame.image == 255).all())
+
+        bus.invalidate()
+        self.assertEqual(int(bus.get_image()[0, 0, 0]), 20)
+
+        # Kaynak döngüsel oynatılır; arka uç değişince önbellek temizlenir
+        bus.set_backend(create_backend("replay", source=screens[:1]))
+        self.assertEqual(int(bus.get_image()[0, 0, 0]), 10)
+        with self.assertRaises(ValueError):
+            create_backend("unknown")
+        with self.assertRaises(TypeError):
+            CaptureBackend()
+
+    def test_tile_signature_change_detection(self):
+        """Karo imzası ile değişiklik tespiti testi"""
+        import numpy as np
+        from frame_bus import Frame, changed_tiles, frame_changed, frame_signature
+
+        image = np.random.RandomState(3).randint(0, 255, (100, 70, 3), dtype=np.uint8)
+        first = Frame(image=image, version=1, timestamp=time.time())
+        self.assertIs(first.signature, first.signature)
+        self.assertEqual(first.signature.shape[:2], (4, 3))
+
+        # Küçük gürültü değişiklik sayılmaz
+        noisy = (image.astype(np.int16) + 2).clip(0, 255).astype(np.uint8)
+        self.assertFalse(frame_changed(first.signature, frame_signature(noisy)))
+
+        changed = image.copy()
+        changed[70:90, 40:60] = 0
+        mask = changed_tiles(first.signature, frame_signature(changed))
+        self.assertEqual([tuple(int(i) for i in tile) for tile in np.argwhere(mask)], [(2, 1)])
+        self.assertTrue(frame_changed(first.signature, frame_signature(changed)))
+        self.assertFalse(frame_changed(first.signature, frame_signature(changed), (slice(0, 2), slice(None))))
+        self.assertTrue(frame_changed(first.signature, frame_signature(image[:50])))
+
+    def test_frame_scope_shares_frame_and_matches(self):
+        """Kapsam karesinin ve eşleşmelerinin girdiye kadar paylaşılması testi"""
+        from frame_bus import FrameScope
+
+        scope = FrameScope(self.bus, max_age=5.0)
+        matcher_calls = []
+
+        def matcher(frame):
+            matcher_calls.append(frame.version)
+            return [(1, 2, 3, 4)]
+
+        # Koşul + tıklama: tek yakalama, tek eşleştirme
+        self.assertEqual(scope.match(("ok.png", 0.8), matcher), [(1, 2, 3, 4)])
+        self.assertEqual(scope.match(("ok.png", 0.8), matcher), [(1, 2, 3, 4)])
+        self.assertEqual(len(matcher_calls), 1)
+        self.assertEqual(scope.stats["match_reuses"], 1)
+
+        # Girdi kareyi ve sonuçları geçersiz kılar
+        self.bus.invalidate()
+        scope.match(("ok.png", 0.8), matcher)
+        self.assertEqual(self.grab_count, 2)
+        self.assertEqual(len(set(matcher_calls)), 2)
+
+        # release() sonrası veriyolunun TTL'i içindeki kare kullanılır ama eşleşme yeniden yapılır
+        scope.release()
+        scope.match(("ok.png", 0.8), matcher)
+        self.assertEqual(self.grab_count, 2)
+        self.assertEqual(len(matcher_calls), 3)
+
+def compose_test_scene(placements, size=(700, 900), origin=(0, 0)):
+    """Paketteki görselleri rastgele bir arka plana yerleştir"""
+    import cv2
+    import numpy as np
+
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    rng = np.random.RandomState(7)
+    scene = rng.randint(0, 255, (size[0], size[1], 3), dtype=np.uint8)
+    templates = {}
+
+    for name, (x, y) in placements.items():
+        template = cv2.imread(os.path.join(base_path, name), cv2.IMREAD_COLOR)
+        h, w = template.shape[:2]
+        scene[y - origin[1]:y - origin[1] + h, x - origin[0]:x - origin[0] + w] = template
+        templates[name] = template
+
+    return scene, templates
+
+class TestTemplateMatcher(unittest.TestCase):
+    """Toplu template eşleştirme testleri"""
+
+    def test_match_many_finds_all_templates(self):
+        """Tek geçişte çoklu template bulma testi"""
+        import cv2
+        from template_matcher import match_many
+
+        scene, templates = compose_test_scene({
+            "savas/savas1.png": (50, 60),
+            "savas/savas5.png": (300, 400),
+            "geri/b1.png": (600, 100)
+        })
+        # Aynı boyutlu (gruplanan) ve sahnede olmayan template'ler
+        templates["geri/b5.png"] = cv2.imread(os.path.join(os.path.dirname(os.path.abspath(__file__)), "geri/b5.png"))
+        templates["savas/savas3.png"] = cv2.imread(os.path.join(os.path.dirname(os.path.abspath(__file__)), "savas/savas3.png"))
+
+        results = match_many(scene, templates, confidence=0.95)
+
+        self.assertEqual(set(results), set(templates))
+        x, y, score = results["savas/savas1.png"][0]
+        self.assertEqual((x, y), (50 + 91 // 2, 60 + 89 // 2))
+        self.assertGreater(score, 0.99)
+        self.assertEqual(results["savas/savas5.png"][0][:2], (300 + 185 // 2, 400 + 54 // 2))
+        self.assertEqual(results["geri/b1.png"][0][:2], (600 + 76 // 2, 100 + 55 // 2))
+        self.assertEqual(results["savas/savas3.png"], [])
+
+    def test_batch_matches_opencv(self):
+        """Ortak spektrumlu toplu eşleştirmenin cv2.matchTemplate ile eşitliği testi"""
+        import cv2
+        import numpy as np
+        from template_matcher import FrameSpectrum, match_template_batch
+
+        rng = np.random.default_rng(5)
+        scene = cv2.GaussianBlur(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8), (0, 0), 2)
+        scene[150:, 200:] = 40  # Düz bölge: skor 0, FFT gürültüsü eşleşme üretmez
+        templates = [np.ascontiguousarray(scene[y:y + 30, x:x + 40]) for x, y in ((10, 20), (150, 100), (60, 180))]
+
+        spectrum = FrameSpectrum(scene)
+        for image, batch in ((scene, templates),
+                             (cv2.cvtColor(scene, cv2.COLOR_BGR2GRAY),
+                              [cv2.cvtColor(template, cv2.COLOR_BGR2GRAY) for template in templates])):
+            maps = match_template_batch(image, batch, spectrum if image is scene else None)
+            for template, result in zip(batch, maps):
+                expected = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+                self.assertEqual(result.shape, expected.shape)
+                self.assertLess(float(np.abs(result - expected).max()), 1e-3)
+                self.assertEqual(np.unravel_index(result.argmax(), result.shape),
+                                 np.unravel_index(expected.argmax(), expected.shape))
+            self.assertEqual(float(np.abs(maps[0][160:, 210:]).max()), 0.0)
+
+    def test_match_many_uses_frame_origin(self):
+        """Frame origin ile mutlak koordinat testi"""
+        from frame_bus import Frame
+        from template_matcher import match_many
+
+        origin = (1227, 30)
+        scene, templates = compose_test_scene({"heal/heal1.png": (1400, 200)}, origin=origin)
+        frame = Frame(image=scene, version=1, timestamp=time.time(), origin=origin)
+
+        results = match_many(frame, templates, confidence=0.95)
+        self.assertEqual(results["heal/heal1.png"][0][:2], (1400 + 118 // 2, 200 + 136 // 2))
+
+    def test_pyramid_matches_exact_path(self):
+        """Piramit modu ile tam çözünürlük sonuç eşitliği testi"""
+        import cv2
+        from template_matcher import find_peaks, match_many, match_pyramid
+
+        placements = {
+            "heal/heal1.png": (20, 30), "heal/helpme.png": (200, 40), "heal/iyilestir.png": (400, 60),
+            "asker/asker1.png": (30, 250), "asker/asker3.png": (150, 260),
+            "bekcikulesi/bekci1.png": (300, 220), "bekcikulesi/bekci6.png": (500, 300),
+            "savas/savas5.png": (60, 500)
+        }
+        scene, templates = compose_test_scene(placements)
+        scene = cv2.GaussianBlur(scene, (0, 0), 2)
+        for name, (x, y) in placements.items():
+            h, w = templates[name].shape[:2]
+            scene[y:y + h, x:x + w] = templates[name]
+        # Sahnede olmayan template
+        templates["heal/hprec1.png"] = cv2.imread(os.path.join(os.path.dirname(os.path.abspath(__file__)), "heal/hprec1.png"))
+
+        for name, template in templates.items():
+            result = cv2.matchTemplate(scene, template, cv2.TM_CCOEFF_NORMED)
+            exact = find_peaks(result, (template.shape[1], template.shape[0]), 0.8, 1, (1227, 30))
+            pyramid = match_pyramid(scene, template, 0.8, 1, (1227, 30))
+
+            self.assertEqual([m[:2] for m in pyramid], [m[:2] for m in exact], name)
+            for (_, _, exact_score), (_, _, pyramid_score) in zip(exact, pyramid):
+                self.assertAlmostEqual(exact_score, pyramid_score, places=3)
+
+        self.assertEqual(match_pyramid(scene, templates["heal/hprec1.png"], 0.8), [])
+        batched = match_many(scene, templates, confidence=0.8, mode="pyramid")
+        for name, (x, y) in placements.items():
+            h, w = templates[name].shape[:2]
+            self.assertEqual(batched[name][0][:2], (x + w // 2, y + h // 2), name)
+
+    def test_scale_space_matches_are_suppressed(self):
+        """Ölçek uzayı eşleştirme ve NMS testi"""
+        import cv2
+        from template_matcher import SCALE_MATCH_DTYPE, match_scales
+
+        scene, templates = compose_test_scene({"heal/heal1.png": (40, 50)})
+        template = templates["heal/heal1.png"]
+        scaled = cv2.resize(template, None, fx=1.5, fy=1.5)
+        scene[300:300 + scaled.shape[0], 500:500 + scaled.shape[1]] = scaled
+
+        # Gevşek eşikte binlerce piksel eşiği geçse de tek kutu kalmalı
+        found = match_scales(scene, template, threshold=0.5)
+        self.assertEqual(found.dtype, SCALE_MATCH_DTYPE)
+        self.assertEqual(len(found), 2)
+        self.assertEqual({(int(m["x"]), int(m["y"]), float(m["scale"])) for m in found},
+                         {(40, 50, 1.0), (500, 300, 1.5)})
+        self.assertTrue(found[0]["score"] >= found[1]["score"])
+
+    def test_ai_vision_template_match_boundary(self):
+        """AI vision template_match sözlük dönüşümü testi"""
+        from ai_vision import AIVisionSystem
+
+        scene, templates = compose_test_scene({"savas/savas5.png": (120, 200)})
+        vision = AIVisionSystem()
+        matches = vision.template_match(scene, templates["savas/savas5.png"])
+
+        self.assertEqual(len(matches), 1)
+        self.assertEqual((matches[0]["x"], matches[0]["y"], matches[0]["width"]), (120, 200, 185))
+        self.assertIsInstance(matches[0]["confidence"], float)
+
+    def test_match_result_orders_and_caps(self):
+        """MatchResult NMS, sıralama ve sınır testi"""
+        import cv2
+        from template_matcher import MatchResult
+
+        scene, templates = compose_test_scene({"asker/asker1.png": (400, 300)})
+        template = templates["asker/asker1.png"]
+        # Bozulmuş (daha düşük skorlu) bir kopya önce gelsin
+        noisy = cv2.GaussianBlur(template, (5, 5), 0)
+        scene[40:40 + noisy.shape[0], 60:60 + noisy.shape[1]] = noisy
+
+        result = cv2.matchTemplate(scene, template, cv2.TM_CCOEFF_NORMED)
+        self.assertGreater(int((result >= 0.6).sum()), 2)
+
+        matches = MatchResult.from_result(result, (template.shape[1], template.shape[0]), 0.6, origin=(1227, 30))
+        self.assertEqual(len(matches), 2)
+        self.assertEqual(matches[0], (1627, 330, 51, 49))
+        self.assertEqual(matches.center(), (1627 + 25, 330 + 24))
+        self.assertGreater(matches.scores[0], matches.scores[1])
+
+        capped = MatchResult.from_result(result, (template.shape[1], template.shape[0]), 0.6, max_results=1)
+        self.assertEqual(list(capped), [(400, 300, 51, 49)])
+        self.assertFalse(MatchResult())
+
+class TestTemplateStore(unittest.TestCase):
+    """Kalıcı template deposu testleri"""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        os.makedirs(os.path.join(self.temp_dir, "savas"))
+        for name in ("savas1.png", "savas5.png"):
+            shutil.copy(os.path.join(base_path, "savas", name), os.path.join(self.temp_dir, "savas", name))
+        self.path = os.path.join(self.temp_dir, "savas", "savas1.png")
+
+    def test_variants_and_disk_cache(self):
+        """Varyant üretimi ve mmap önbellekten yükleme testi"""
+        import cv2
+        import numpy as np
+        from template_store import TemplateStore
+
+        store = TemplateStore(base_dir=self.temp_dir, folders=["savas"])
+        self.assertEqual(store.preload(), 2)
+        self.assertEqual(store.stats["decodes"], 2)
+
+        expected = cv2.imread(self.path, cv2.IMREAD_COLOR)
+        self.assertTrue(np.array_equal(store.get(self.path), expected))
+        self.assertEqual(store.gray(self.path).shape, expected.shape[:2])
+        self.assertEqual(store.edges(self.path).shape, expected.shape[:2])
+        self.assertEqual(store.pyramid(self.path, 1).shape[:2], ((expected.shape[0] + 1) // 2, (expected.shape[1] + 1) // 2))
+        self.assertEqual(store.stats["hits"], 4)
+
+        # Yeni süreç: PNG çözülmeden önbellekten açılır
+        reopened = TemplateStore(base_dir=self.temp_dir, folders=["savas"])
+        template = reopened.get(self.path)
+        self.assertIsInstance(template, np.memmap)
+        self.assertTrue(np.array_equal(template, expected))
+        self.assertEqual(reopened.stats["decodes"], 0)
+
+        self.assertEqual(set(store.image_paths(["savas"])), {"savas1", "savas5"})
+
+    def test_mtime_invalidation(self):
+        """Dosya değişince yeniden yükleme testi"""
+        import cv2
+        import numpy as np
+        from template_store import TemplateStore
+
+        store = TemplateStore(base_dir=self.temp_dir, folders=["savas"])
+        self.assertIsNotNone(store.get(self.path))
+
+        # Sadece mtime değişti: içerik özeti aynı, çözme yok
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertIsNotNone(store.get(self.path))
+        self.assertEqual(store.stats["decodes"], 1)
+        self.assertEqual(store.stats["invalidations"], 1)
+
+        # İçerik değişti: yeniden çözülür
+        replacement = np.full((20, 30, 3), 128, dtype=np.uint8)
+        cv2.imwrite(self.path, replacement)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 20))
+        self.assertEqual(store.get(self.path).shape, (20, 30, 3))
+        self.assertEqual(store.stats["decodes"], 2)
+
+        # Eski içeriğin varyantları silinir; kaynak silinince kalanlar da temizlenir
+        cached = lambda: {name.split("_")[0] for name in os.listdir(store.cache_dir) if name.endswith(".npy")}
+        self.assertEqual(cached(), {store.get_entry(self.path).sha1})
+        store.preload()
+        self.assertEqual(len(cached()), 2)
+        os.remove(os.path.join(self.temp_dir, "savas", "savas5.png"))
+        self.assertGreater(store.prune_cache(), 0)
+        self.assertEqual(len(cached()), 1)
+        os.remove(self.path)
+        self.assertIsNone(store.get(self.path))
+        self.assertEqual(cached(), set())
+
+    def test_preload_decodes_outside_lock(self):
+        """Ön yükleme sırasında önbellekteki template'lerin beklemeden okunması testi"""
+        import template_store as template_store_module
+        from template_store import TemplateStore
+
+        store = TemplateStore(base_dir=self.temp_dir, folders=["savas"])
+        self.assertIsNotNone(store.get(self.path))
+
+        decoding = threading.Event()
+        release = threading.Event()
+        original = template_store_module.build_variants
+
+        def slow_build(image):
+            decoding.set()
+            release.wait(2.0)
+            return original(image)
+
+        template_store_module.build_variants = slow_build
+        self.addCleanup(setattr, template_store_module, "build_variants", original)
+        worker = threading.Thread(target=store.preload)
+        worker.start()
+        self.assertTrue(decoding.wait(2.0))
+
+        # savas5 çözülürken savas1 kilitte beklemeden döner
+        started = time.time()
+        self.assertIsNotNone(store.get(self.path))
+        self.assertLess(time.time() - started, 0.5)
+        release.set()
+        worker.join(2.0)
+        self.assertEqual(store.stats["decodes"], 2)
+
+class TestMacroStore(unittest.TestCase):
+    """Makro deposu testleri"""
+
+    def setUp(self):
+        import json
+        import shutil
+        import tempfile
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+        self.macro_dir = os.path.join(self.temp_dir, "macros")
+        self.legacy_file = os.path.join(self.temp_dir, "macros.json")
+        with open(self.legacy_file, 'w', encoding='utf-8') as f:
+            json.dump({f"m{i}": self.macro(f"m{i}", actions=i) for i in range(3)}, f)
+
+    @staticmethod
+    def macro(macro_id, actions=0, name=None):
+        return {"id": macro_id, "name": name or macro_id, "description": "", "enabled": True, "tags": [],
+                "modified_at": "2025-01-01T00:00:00", "actions": [{"id": str(i)} for i in range(actions)]}
+
+    def test_migration_and_lazy_loading(self):
+        """Eski dosyadan taşıma ve gövdelerin ilk erişimde yüklenmesi testi"""
+        from macro_store import LazyMacroDict, MacroStore
+
+        store = MacroStore(self.macro_dir, legacy_file=self.legacy_file)
+        self.assertEqual(sorted(os.listdir(self.macro_dir)), ["index.json", "m0.json", "m1.json", "m2.json"])
+        self.assertEqual(store.index["m2"]["action_count"], 2)
+
+        # Yeni açılışta sadece dizin okunur
+        store = MacroStore(self.macro_dir, legacy_file=self.legacy_file)
+        macros = LazyMacroDict(store, dict)
+        self.assertEqual(len(macros), 3)
+        self.assertIn("m1", macros)
+        self.assertEqual(store.stats["loads"], 0)
+
+        self.assertEqual(len(macros["m1"]["actions"]), 1)
+        self.assertIs(macros["m1"], macros["m1"])
+        self.assertEqual(store.stats["loads"], 1)
+        with self.assertRaises(KeyError):
+            macros["missing"]
+
+    def test_unreadable_body_is_dropped(self):
+        """Gövdesi bozuk/eksik makronun ilk erişimde anahtarlardan çıkarılması testi"""
+        from macro_store import LazyMacroDict, MacroStore
+
+        store = MacroStore(self.macro_dir, legacy_file=self.legacy_file)
+        with open(os.path.join(self.macro_dir, "m1.json"), 'w', encoding='utf-8') as f:
+            f.write("{bozuk")
+        os.remove(os.path.join(self.macro_dir, "m2.json"))
+
+        macros = LazyMacroDict(store, dict)
+        for macro_id in ("m1", "m2"):
+            self.assertIn(macro_id, macros)
+            self.assertIsNone(macros.get(macro_id))
+            self.assertNotIn(macro_id, macros)
+        self.assertEqual(list(macros), ["m0"])
+
+    def test_corrupt_index_is_rebuilt(self):
+        """Bozuk dizin dosyasının makro dosyalarından yeniden oluşturulması testi"""
+        from macro_store import MacroStore
+
+        MacroStore(self.macro_dir, legacy_file=self.legacy_file)
+        with open(os.path.join(self.macro_dir, "index.json"), 'w', encoding='utf-8') as f:
+            f.write('{"version": 1, "mac')
+
+        store = MacroStore(self.macro_dir, legacy_file=self.legacy_file)
+        self.assertEqual(sorted(store.index), ["m0", "m1", "m2"])
+
+        # Sonraki yazma mevcut makroları silmemeli
+        store.mark_dirty("new", lambda: self.macro("new"))
+        store.close()
+        self.assertEqual(sorted(MacroStore(self.macro_dir).index), ["m0", "m1", "m2", "new"])
+
+    def test_debounced_batched_flush(self):
+        """Art arda düzenlemelerin tek atomik yazmada toplanması testi"""
+        from macro_store import MacroStore
+
+        store = MacroStore(self.macro_dir, legacy_file=self.legacy_file, flush_delay=0.2)
+        self.addCleanup(store.close)
+        threads_before = threading.active_count()
+        data = self.macro("m0")
+        for i in range(20):
+            data["actions"].append({"id": str(i)})
+            store.mark_dirty("m0", lambda: data)
+        store.mark_dirty("new", lambda: self.macro("new", name="Yeni"))
+        store.delete("m2")
+
+        # Tek bir flusher thread'i; değişiklikler sadece son tarihi ileri alır
+        self.assertEqual(threading.active_count(), threads_before + 1)
+        self.assertEqual(store.stats["flushes"], 0)
+        time.sleep(0.5)
+        self.assertEqual(store.stats["flushes"], 1)
+        self.assertEqual(store.stats["writes"], 2)
+        self.assertEqual(store.pending, 0)
+
+        reopened = MacroStore(self.macro_dir)
+        self.assertEqual(sorted(reopened.index), ["m0", "m1", "new"])
+        self.assertEqual(reopened.index["m0"]["action_count"], 20)
+        self.assertEqual(reopened.load("new")["name"], "Yeni")
+        self.assertFalse(any(name.endswith(".tmp") for name in os.listdir(self.macro_dir)))
+
+class TestTemplateWaiter(unittest.TestCase):
+    """Kare akışı template bekleyici testleri"""
+
+    def setUp(self):
+        import numpy as np
+        from frame_bus import FrameBus
+        from template_waiter import TemplateWaiter
+
+        self.screen = np.zeros((64, 64, 3), dtype=np.uint8)
+        self.visible = set()
+        self.regions = []
+        self.bus = FrameBus(tick=0.0, grab_func=self.grab)
+        self.waiter = TemplateWaiter(self.bus, self.match, poll_interval=0.02)
+
+    def grab(self, region=None):
+        self.regions.append(region)
+        return self.screen.copy()
+
+    def match(self, frame, name, threshold):
+        return [(0, 0, 5, 5)] if name in self.visible else []
+
+    def show(self, name):
+        self.visible.add(name)
+        self.screen[:32, :32] = 50 * len(self.visible)
+
+    def test_returns_soon_after_template_appears(self):
+        """Template görünür görünmez dönme ve değişmeyen karelerde eşleştirme yapmama testi"""
+        threading.Timer(0.2, self.show, args=("ok.png",)).start()
+
+        start = time.time()
+        result = self.waiter.wait("ok.png", timeout=2.0, region=(0, 0, 64, 64))
+
+        self.assertTrue(result)
+        self.assertEqual(result.first, "ok.png")
+        self.assertLess(time.time() - start, 0.4)
+        self.assertGreater(result.unchanged_frames, 0)
+        self.assertEqual(result.match_calls, 2)
+        self.assertTrue(all(region == (0, 0, 64, 64) for region in self.regions))
+
+    def test_any_all_timeout_and_cancel(self):
+        """İlk görünen / hepsi modları, zaman aşımı ve iptal testi"""
+        from template_waiter import WAIT_ALL
+
+        self.show("b.png")
+        self.assertEqual(self.waiter.wait_any(["a.png", "b.png"], timeout=0.5).first, "b.png")
+
+        result = self.waiter.wait(["a.png", "b.png"], timeout=0.1, mode=WAIT_ALL)
+        self.assertFalse(result)
+        self.assertGreaterEqual(result.elapsed, 0.1)
+
+        threading.Timer(0.1, self.show, args=("a.png",)).start()
+        result = self.waiter.wait_all(["a.png", "b.png"], timeout=2.0)
+        self.assertEqual(set(result.matches), {"a.png", "b.png"})
+
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+        start = time.time()
+        self.assertFalse(self.waiter.wait("never.png", timeout=5.0, cancel_event=cancel))
+        self.assertLess(time.time() - start, 0.5)
+
+        with self.assertRaises(ValueError):
+            self.waiter.wait("a.png", mode="some")
+
 class TestSystemIntegration(unittest.TestCase):
     """Sistem entegrasyon testleri"""
     